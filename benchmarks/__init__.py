@@ -0,0 +1 @@
+# ベンチマークパッケージ
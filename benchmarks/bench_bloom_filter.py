@@ -0,0 +1,126 @@
+"""通知済み判定のブルームフィルターのベンチマーク
+
+保存期間分（8日）の通知履歴を日ごとのブルームフィルターに入れ、
+メモリ上限ごとの偽陽性率と判定スループットを、正確な集合と比較する。
+続けてデータベース全体での重複チェック（filter_unnotified）を
+インメモリ索引・ブルームフィルター・DBのみの3方式で比較する。
+
+実行方法:
+    poetry run python -m benchmarks.bench_bloom_filter [--entries 1000000]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from src.futaba_search.bloom import TimeBucketedBloomFilter
+from src.futaba_search.database import FutabaDatabase
+
+DAYS = 8
+
+
+def make_key(i: int) -> tuple[str, str, int]:
+    return (str(1_200_000_000 + i), f"keyword{i % 500}", 10_000 + i % 200)
+
+
+def bench_filter(entries: int, lookups: int, memory_mb: int) -> None:
+    """メモリ上限ごとの偽陽性率と判定スループット"""
+    today = date.today()
+    per_day = entries // DAYS
+    bloom = TimeBucketedBloomFilter(memory_mb * 1024 * 1024, DAYS - 1, per_day)
+
+    start = time.perf_counter()
+    for i in range(entries):
+        bloom.add(make_key(i), today - timedelta(days=i // per_day))
+    build_time = time.perf_counter() - start
+
+    # 未通知のキー（登録していないキー）で偽陽性率と判定速度を測る
+    absent = [make_key(entries + i) for i in range(lookups)]
+    start = time.perf_counter()
+    false_positives = sum(1 for key in absent if bloom.candidate_days(key))
+    lookup_time = time.perf_counter() - start
+
+    print(
+        f"ブルームフィルター {memory_mb:3d} MiB: "
+        f"偽陽性率 {false_positives / lookups:.5%} "
+        f"(見積もり {bloom.stats()['estimated_fpp']:.5%}), "
+        f"判定 {lookups / lookup_time:10,.0f} 件/s, "
+        f"構築 {entries / build_time:10,.0f} 件/s, "
+        f"メモリ {bloom.memory_bytes / 1024 / 1024:6.1f} MiB"
+    )
+
+
+def bench_exact_set(entries: int, lookups: int) -> None:
+    """比較用: 正確な集合（NotifiedIndex と同じ表現）"""
+    tracemalloc.start()
+    keys = {make_key(i) for i in range(entries)}
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    absent = [make_key(entries + i) for i in range(lookups)]
+    start = time.perf_counter()
+    sum(1 for key in absent if key in keys)
+    lookup_time = time.perf_counter() - start
+
+    print(
+        f"正確な集合          : 偽陽性率 0.00000%, "
+        f"判定 {lookups / lookup_time:10,.0f} 件/s, "
+        f"メモリ {memory / 1024 / 1024:6.1f} MiB"
+    )
+
+
+def bench_database(rows: int, lookups: int, memory_mb: int) -> None:
+    """データベース全体での重複チェック（ほぼ全てが未通知の照会）"""
+    now = datetime.now()
+    per_day = rows // DAYS
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "bench.db"
+        db = FutabaDatabase(path, use_notified_index=False)
+        for day in range(DAYS):
+            db.mark_threads_notified(
+                (make_key(i) for i in range(day * per_day, (day + 1) * per_day)),
+                now - timedelta(days=day),
+            )
+        db.engine.dispose()
+
+        # 1%は通知済み、残りは新しいキー
+        queries = [
+            make_key(i * 100) if i % 100 == 0 else make_key(rows + i)
+            for i in range(lookups)
+        ]
+        modes = {
+            "インメモリ索引      ": {"use_notified_index": True},
+            "ブルームフィルター  ": {"use_notified_filter": True},
+            "DBのみ              ": {"use_notified_index": False},
+        }
+        for label, options in modes.items():
+            db = FutabaDatabase(path, **options)  # type: ignore[arg-type]
+            start = time.perf_counter()
+            db.filter_unnotified(queries)
+            elapsed = time.perf_counter() - start
+            db.engine.dispose()
+            print(f"{label}: {lookups / elapsed:10,.0f} 件/s  {db.dedup_stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--db-rows", type=int, default=200_000)
+    parser.add_argument("--db-lookups", type=int, default=5_000)
+    args = parser.parse_args()
+
+    print(f"通知履歴 {args.entries}件（{DAYS}日分）, 照会 {args.lookups}件")
+    for memory_mb in (1, 2, 4, 16):
+        bench_filter(args.entries, args.lookups, memory_mb)
+    bench_exact_set(args.entries, args.lookups)
+
+    print(f"\nデータベース: 通知履歴 {args.db_rows}件, 照会 {args.db_lookups}件")
+    bench_database(args.db_rows, args.db_lookups, 16)
+
+
+if __name__ == "__main__":
+    main()
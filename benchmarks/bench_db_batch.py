@@ -0,0 +1,88 @@
+"""通知履歴の書き込みベンチマーク
+
+1件ずつの mark_thread_notified（SELECT + INSERT + COMMIT）と、
+1トランザクションでまとめて書き込む mark_threads_notified を比較する。
+
+実行方法:
+    poetry run python -m benchmarks.bench_db_batch [--notifications 1000]
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import event, select
+
+from src.futaba_search.database import FutabaDatabase
+
+
+def count_commits(db: FutabaDatabase) -> list[int]:
+    """エンジン上のCOMMIT回数を数えるカウンタを取り付ける"""
+    counter = [0]
+
+    @event.listens_for(db.engine, "commit")
+    def _on_commit(_conn: object) -> None:
+        counter[0] += 1
+
+    return counter
+
+
+def mark_one_by_one(db: FutabaDatabase, entries: list[tuple[str, str, int]]) -> None:
+    """従来方式: 通知ごとにセッションを開き SELECT + INSERT + COMMIT"""
+    for thread_id, keyword, channel_id in entries:
+        with db.engine.begin() as connection:
+            table = db._notified_table(connection, date.today())
+            existing = connection.execute(
+                select(table.c.thread_id).where(
+                    table.c.thread_id == thread_id,
+                    table.c.keyword == keyword,
+                    table.c.channel_id == channel_id,
+                )
+            ).first()
+            if not existing:
+                connection.execute(
+                    table.insert().values(
+                        thread_id=thread_id,
+                        keyword=keyword,
+                        channel_id=channel_id,
+                        notified_at=datetime.now(),
+                    )
+                )
+
+
+def run(label: str, entries: list[tuple[str, str, int]], batched: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = FutabaDatabase(Path(tmpdir) / "bench.db")
+        commits = count_commits(db)
+
+        start = time.perf_counter()
+        if batched:
+            db.mark_threads_notified(entries)
+        else:
+            mark_one_by_one(db, entries)
+        elapsed = time.perf_counter() - start
+
+        db.engine.dispose()
+
+    print(f"{label}: {elapsed * 1000:10.1f} ms/tick, COMMIT {commits[0]:5d}回/tick")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notifications", type=int, default=1000)
+    args = parser.parse_args()
+
+    entries = [
+        (str(1_000_000 + i), f"keyword{i % 50}", 10_000 + i % 20)
+        for i in range(args.notifications)
+    ]
+
+    print(f"1ティックあたりの通知数: {len(entries)}")
+    run("1件ずつ書き込み", entries, batched=False)
+    run("一括書き込み   ", entries, batched=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""SQLiteチューニングのベンチマーク
+
+通知履歴が大量にあるデータベースで、1ティック分のDB処理時間を比較する。
+
+- 変更前: SQLiteの既定値（ロールバックジャーナル、synchronous=FULL）、
+  muted_until のインデックスなし
+- 変更後: performance プロファイル（WAL等）とマイグレーションで追加したインデックス
+
+データベースは分割前のスキーマで作成し、起動時のマイグレーションで
+通知履歴を日ごとのテーブルに移行する（起動時間に含まれる）。
+
+実行方法:
+    poetry run python -m benchmarks.bench_db_tuning [--rows 1000000] [--ticks 20]
+"""
+
+import argparse
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.futaba_search.database import FutabaDatabase
+
+# 変更前のスキーマ（インデックスなし）
+LEGACY_SCHEMA = """
+CREATE TABLE subscriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id INTEGER NOT NULL,
+    keyword VARCHAR NOT NULL,
+    UNIQUE (channel_id, keyword)
+);
+CREATE TABLE notified_threads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    thread_id VARCHAR NOT NULL,
+    keyword VARCHAR NOT NULL,
+    channel_id INTEGER NOT NULL,
+    notified_at DATETIME,
+    UNIQUE (thread_id, keyword, channel_id)
+);
+CREATE TABLE muted_channels (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id INTEGER NOT NULL UNIQUE,
+    muted_until DATETIME NOT NULL,
+    muted_at DATETIME
+);
+"""
+
+NEW_INDEXES = ("ix_muted_channels_muted_until",)
+
+
+def build_database(path: Path, rows: int, channels: int, seed: int = 0) -> None:
+    """直近7日間に分散した通知履歴を持つ変更前スキーマのDBを作成"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    span = timedelta(days=7).total_seconds()
+
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.executemany(
+        "INSERT INTO subscriptions (channel_id, keyword) VALUES (?, ?)",
+        [(10_000 + i % channels, f"keyword{i}") for i in range(channels * 5)],
+    )
+    connection.executemany(
+        "INSERT INTO muted_channels (channel_id, muted_until, muted_at) "
+        "VALUES (?, ?, ?)",
+        [
+            (10_000 + i, str(now + timedelta(hours=1)), str(now))
+            for i in range(channels // 10)
+        ],
+    )
+    connection.executemany(
+        "INSERT INTO notified_threads (thread_id, keyword, channel_id, notified_at) "
+        "VALUES (?, ?, ?, ?)",
+        (
+            (
+                str(1_000_000_000 + i),
+                f"keyword{rng.randrange(channels * 5)}",
+                10_000 + rng.randrange(channels),
+                # 古い順に並べ、クリーンアップ対象がちょうどない状態にする
+                str(now - timedelta(seconds=span * (1 - i / rows) - 60)),
+            )
+            for i in range(rows)
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+
+def run_tick(db: FutabaDatabase, tick: int, notifications: int) -> None:
+    """bot.monitor_futaba の1ティック分のDB処理"""
+    db.cleanup_expired_mutes()
+    subscriptions = db.get_all_subscriptions()
+    for channel_id in {channel_id for channel_id, _ in subscriptions}:
+        db.is_channel_muted(channel_id)
+    candidates = [
+        (str(2_000_000_000 + tick * notifications + i), keyword, channel_id)
+        for i, (channel_id, keyword) in enumerate(subscriptions[:notifications])
+    ]
+    db.mark_threads_notified(db.filter_unnotified(candidates))
+
+
+def run(label: str, path: Path, tuned: bool, ticks: int, notifications: int) -> None:
+    start = time.perf_counter()
+    db = FutabaDatabase(path, profile="performance" if tuned else "default")
+    open_time = time.perf_counter() - start
+    if not tuned:
+        # 変更前の状態を再現するため、マイグレーションで追加されたインデックスを削除
+        with db.engine.begin() as connection:
+            for index in NEW_INDEXES:
+                connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index}")
+
+    run_tick(db, -1, notifications)  # ウォームアップ
+    samples = []
+    for tick in range(ticks):
+        start = time.perf_counter()
+        run_tick(db, tick, notifications)
+        samples.append(time.perf_counter() - start)
+    db.engine.dispose()
+
+    print(
+        f"{label}: 起動(索引読み込み・マイグレーション込み) {open_time:6.1f} s, "
+        f"中央値 {statistics.median(samples) * 1000:8.1f} ms/tick, "
+        f"最大 {max(samples) * 1000:8.1f} ms/tick"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--notifications", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "source.db"
+        print(f"通知履歴 {args.rows}件のデータベースを作成中...")
+        build_database(source, args.rows, args.channels)
+
+        for label, tuned in (("変更前", False), ("変更後", True)):
+            path = Path(tmpdir) / f"{label}.db"
+            shutil.copy(source, path)
+            run(label, path, tuned, args.ticks, args.notifications)
+
+
+if __name__ == "__main__":
+    main()
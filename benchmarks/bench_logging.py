@@ -0,0 +1,125 @@
+"""ログ出力によるイベントループの停止時間のベンチマーク
+
+DEBUG レベルで、大量のキーワードがマッチした監視1回分（マッチごとの INFO と
+DEBUG の行）を出力したときに、イベントループが止まる時間を比較する。
+
+- sync: 従来どおりハンドラーがロガーの呼び出し元で書き込む
+- queue: 呼び出し側ではメッセージの組み立てだけを行い、書き込みスレッドで整形・書き込みを行う
+
+イベントループの停止は、1ms ごとに起きるタスクの遅れ（ハートビートの遅延）と、
+ロガーの呼び出しにかかった時間の合計で測る。
+
+実行方法:
+    poetry run python -m benchmarks.bench_logging [--matches 20000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.futaba_search.logging_config import (
+    DroppingQueueHandler,
+    setup_logging,
+    stop_logging,
+)
+
+logger = logging.getLogger("futaba_search.bench")
+
+HEARTBEAT = 0.001
+
+
+async def heartbeat(lags: list[float], stop: asyncio.Event) -> None:
+    """一定間隔で起き、予定からの遅れを記録"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - started - HEARTBEAT)
+
+
+async def burst(matches: int, chunk: int) -> float:
+    """マッチごとのログを出力し、ロガーの呼び出しにかかった時間の合計を返す"""
+    spent = 0.0
+    for i in range(matches):
+        started = time.perf_counter()
+        logger.info(
+            "%s: キーワード %s がマッチ: %s", "may", ["猫", "画像"], f"スレッド本文{i}"
+        )
+        logger.debug("通知を送信待ちに追加: チャンネル%s -> %s", i % 50, i)
+        spent += time.perf_counter() - started
+        if i % chunk == chunk - 1:
+            # DB や送信を待つ間に他のタスクへ制御を戻す
+            await asyncio.sleep(0)
+    return spent
+
+
+async def run(matches: int, chunk: int) -> tuple[float, list[float], float]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    task = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0.01)
+    began = time.perf_counter()
+    spent = await burst(matches, chunk)
+    elapsed = time.perf_counter() - began
+    stop.set()
+    await task
+    return spent, lags, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--matches", type=int, default=20_000)
+    parser.add_argument("--chunk", type=int, default=100)
+    parser.add_argument("--queue-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    modes = (
+        ("sync", 0, "text"),
+        ("queue", args.queue_size, "text"),
+        ("queue+json", args.queue_size, "json"),
+    )
+    print(
+        f"{'':12s} {'呼び出し合計':>12s} {'1件あたり':>10s} "
+        f"{'遅延p99':>9s} {'遅延max':>9s} {'書き込み完了':>12s} {'破棄':>6s}"
+    )
+    stdout = sys.stdout
+    with tempfile.TemporaryDirectory() as tmpdir, open(os.devnull, "w") as devnull:
+        for label, queue_size, log_format in modes:
+            log_file = Path(tmpdir) / f"{label}.log"
+            # コンソール出力は捨てる（ファイルへの書き込みだけを比較する）
+            sys.stdout = devnull
+            try:
+                setup_logging(
+                    level="DEBUG",
+                    log_file=str(log_file),
+                    log_format=log_format,
+                    queue_size=queue_size,
+                )
+                spent, lags, elapsed = asyncio.run(run(args.matches, args.chunk))
+                dropped = sum(
+                    handler.dropped
+                    for handler in logging.getLogger().handlers
+                    if isinstance(handler, DroppingQueueHandler)
+                )
+                began = time.perf_counter()
+                stop_logging()
+                drained = elapsed + time.perf_counter() - began
+            finally:
+                sys.stdout = stdout
+            records = args.matches * 2
+            lags.sort()
+            p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+            print(
+                f"{label:12s} {spent * 1000:9.1f} ms {spent / records * 1e6:7.2f} µs "
+                f"{p99 * 1000:6.1f} ms {max(lags, default=0.0) * 1000:6.1f} ms "
+                f"{drained * 1000:9.1f} ms {dropped:6d}"
+            )
+    logging.getLogger().handlers.clear()
+
+
+if __name__ == "__main__":
+    main()
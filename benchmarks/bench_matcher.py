@@ -0,0 +1,144 @@
+"""キーワードマッチングのベンチマーク
+
+従来の「購読 × スレッド」の二重ループと KeywordMatcher を比較する。
+購読には部分一致のほか、AND/OR/NOT の式と正規表現も混ぜる。
+
+実行方法:
+    poetry run python -m benchmarks.bench_matcher [--keywords 10000] [--threads 500]
+        [--expressions 1000] [--regexes 100]
+"""
+
+import argparse
+import random
+import time
+
+from src.futaba_search.matcher import KeywordMatcher
+from src.futaba_search.monitor import FutabaMonitor
+from src.futaba_search.thread import Thread
+
+# ひらがな・カタカナ・英字の混在したそれらしい文字集合
+ALPHABET = (
+    "あいうえおかきくけこさしすせそたちつてとなにぬねの"
+    "アイウエオカキクケコサシスセソタチツテトナニヌネノ"
+    "abcdefghijklmnopqrstuvwxyz"
+)
+
+
+def random_text(rng: random.Random, min_len: int, max_len: int) -> str:
+    """ランダムな文字列を生成"""
+    return "".join(rng.choices(ALPHABET, k=rng.randint(min_len, max_len)))
+
+
+def random_expression(rng: random.Random) -> str:
+    """「expr:語 AND (語 OR 語) AND NOT 語」の形の式を生成"""
+    a, b, c, d = (random_text(rng, 2, 3) for _ in range(4))
+    return f"expr:{a} AND ({b} OR {c}) AND NOT {d}"
+
+
+def random_regex(rng: random.Random) -> str:
+    """「語.{0,5}語」の形の正規表現を生成"""
+    return f"re:{random_text(rng, 2, 3)}.{{0,5}}{random_text(rng, 2, 3)}"
+
+
+def generate(
+    num_keywords: int,
+    num_threads: int,
+    num_channels: int,
+    seed: int,
+    num_expressions: int = 0,
+    num_regexes: int = 0,
+) -> tuple[list[tuple[int, str]], list[Thread]]:
+    """購読とスレッドの合成データを生成"""
+    rng = random.Random(seed)
+    subscriptions = [
+        (rng.randrange(num_channels), random_text(rng, 3, 6))
+        for _ in range(num_keywords)
+    ]
+    subscriptions += [
+        (rng.randrange(num_channels), random_expression(rng))
+        for _ in range(num_expressions)
+    ]
+    subscriptions += [
+        (rng.randrange(num_channels), random_regex(rng)) for _ in range(num_regexes)
+    ]
+    threads = [
+        Thread.from_api(
+            str(1_000_000 + i),
+            {"com": random_text(rng, 20, 200), "sub": random_text(rng, 0, 20)},
+        )
+        for i in range(num_threads)
+    ]
+    return subscriptions, threads
+
+
+def bench_nested_loop(
+    monitor: FutabaMonitor, subscriptions: list[tuple[int, str]], threads: list[Thread]
+) -> set[tuple[int, str, int]]:
+    """従来方式: 購読ごとに全スレッドを走査"""
+    matches = set()
+    for channel_id, keyword in subscriptions:
+        for thread in threads:
+            if monitor.check_keyword_match(thread, keyword):
+                matches.add((thread.id, keyword, channel_id))
+    return matches
+
+
+def bench_matcher(
+    matcher: KeywordMatcher, threads: list[Thread]
+) -> set[tuple[int, str, int]]:
+    """オートマトン方式: スレッドごとに1回だけ走査"""
+    matches = set()
+    for thread in threads:
+        for keyword, channel_ids in matcher.match(thread.search_text).items():
+            for channel_id in channel_ids:
+                matches.add((thread.id, keyword, channel_id))
+    return matches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keywords", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=500)
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--expressions", type=int, default=1000)
+    parser.add_argument("--regexes", type=int, default=100)
+    args = parser.parse_args()
+
+    subscriptions, threads = generate(
+        args.keywords,
+        args.threads,
+        args.channels,
+        args.seed,
+        args.expressions,
+        args.regexes,
+    )
+    monitor = FutabaMonitor()
+
+    start = time.perf_counter()
+    expected = bench_nested_loop(monitor, subscriptions, threads)
+    nested_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(subscriptions)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = bench_matcher(matcher, threads)
+    match_time = time.perf_counter() - start
+
+    assert actual == expected, "マッチング結果が一致しません"
+
+    print(
+        f"購読数: {len(subscriptions)} (式 {args.expressions}, "
+        f"正規表現 {args.regexes}), スレッド数: {len(threads)}"
+    )
+    print(f"マッチ件数: {len(actual)}")
+    print(f"二重ループ:         {nested_time * 1000:10.1f} ms/tick")
+    print(f"マッチャー構築:     {build_time * 1000:10.1f} ms (購読変更時のみ)")
+    print(f"マッチャー照合:     {match_time * 1000:10.1f} ms/tick")
+    print(f"高速化率:           {nested_time / match_time:10.1f} x")
+
+
+if __name__ == "__main__":
+    main()
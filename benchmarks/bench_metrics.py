@@ -0,0 +1,74 @@
+"""計測のオーバーヘッドのベンチマーク
+
+カウンター・ヒストグラムの1回あたりのコストを、計測が無効な場合と
+有効な場合で比較する。あわせて、1回の監視で行う計測（取得・解析・
+マッチング・DB・送信）をまとめた場合のコストと出力にかかる時間を測る。
+
+実行方法:
+    poetry run python -m benchmarks.bench_metrics [--iterations 1000000]
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+from src.futaba_search.metrics import MetricsRegistry
+
+# 1回の監視あたりの計測回数の目安（板・DBメソッド・送信の数から見積もる）
+OBSERVATIONS_PER_TICK = 40
+
+
+def measure(iterations: int, func: Callable[[], None]) -> float:
+    """1回あたりの時間（ns）"""
+    began = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - began) / iterations * 1e9
+
+
+def operations(registry: MetricsRegistry) -> dict[str, Callable[[], None]]:
+    """監視処理で使う計測操作"""
+    counter = registry.counter("bench_total", "ベンチマーク", ("board",))
+    histogram = registry.histogram("bench_seconds", "ベンチマーク", ("board",))
+
+    def timed() -> None:
+        with histogram.time("may"):
+            pass
+
+    return {
+        "counter.inc": lambda: counter.inc(1, "may"),
+        "histogram.observe": lambda: histogram.observe(0.01, "may"),
+        "histogram.time": timed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    baseline = measure(args.iterations, lambda: None)
+    disabled = operations(MetricsRegistry(enabled=False))
+    enabled = operations(MetricsRegistry(enabled=True))
+    print(f"{'':18s} {'無効':>10s} {'有効':>10s}")
+    for name in disabled:
+        off = measure(args.iterations, disabled[name]) - baseline
+        on = measure(args.iterations, enabled[name]) - baseline
+        print(
+            f"{name:18s} {off:8.0f} ns {on:8.0f} ns "
+            f"(1回の監視あたり {on * OBSERVATIONS_PER_TICK / 1000:.1f} µs)"
+        )
+
+    registry = MetricsRegistry(enabled=True)
+    histogram = registry.histogram("bench_seconds", "ベンチマーク", ("method",))
+    for i in range(1000):
+        histogram.observe(i / 1000, f"method{i % 20}")
+    began = time.perf_counter()
+    for _ in range(100):
+        text = registry.render()
+    elapsed = (time.perf_counter() - began) / 100 * 1000
+    print(f"出力: {len(text.splitlines())}行 {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""カタログ解析のメモリ使用量ベンチマーク
+
+response.json() + parse_threads（全体を読み込んでから解析）と、
+CatalogStreamParser による逐次解析のピークメモリを比較する。
+各方式は別プロセスで実行し、ピークRSSの増加量と tracemalloc による
+Pythonヒープのピークを報告する。
+
+実行方法:
+    poetry run python -m benchmarks.bench_stream_parse [--threads 5000]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from src.futaba_search.monitor import FutabaMonitor
+from src.futaba_search.streaming import CatalogStreamParser
+from src.futaba_search.thread import Thread, threads_from_api
+
+CHUNK_SIZE = 64 * 1024
+
+
+def generate_payload(num_threads: int, seed: int = 0) -> bytes:
+    """futaba.php?mode=json を模した合成カタログを生成"""
+    rng = random.Random(seed)
+    res = {}
+    for i in range(num_threads):
+        thread_id = str(1_200_000_000 + i)
+        res[thread_id] = {
+            "now": "24/01/01(月)00:00:00",
+            "name": "としあき",
+            "email": "",
+            "sub": "無念",
+            "com": "".join(rng.choices("あいうえおかきくけこ<br>&gt;", k=300)),
+            "ext": ".jpg",
+            "w": 250,
+            "h": 250,
+            "tim": str(1704034800000 + i),
+            "fsize": 123456,
+            "thumb": f"/b/thumb/{1704034800000 + i}s.jpg",
+            "src": f"/b/src/{1704034800000 + i}.jpg",
+            "rsc": i,
+            "del": "",
+        }
+    catalog = {
+        "die": "10:00頃消えます",
+        "dielong": "Mon, 01 Jan 2024 10:00:00 GMT",
+        "dispname": 1,
+        "dispsod": 1,
+        "maxres": 1_200_000_000 + num_threads,
+        "nowtime": 1704034800,
+        "old": 0,
+        "res": res,
+    }
+    return json.dumps(catalog, ensure_ascii=False).encode()
+
+
+def parse_buffered(chunks: list[bytes]) -> list[Thread]:
+    """従来方式: 本文全体を読み込み、辞書に変換してから解析"""
+    body = b"".join(chunks)
+    data = json.loads(body.decode("utf-8"))
+    return FutabaMonitor().parse_threads(data)
+
+
+def parse_streaming(chunks: list[bytes]) -> list[Thread]:
+    """逐次方式: チャンクごとにスレッドを取り出す"""
+    parser = CatalogStreamParser()
+    threads: list[Thread] = []
+    for chunk in chunks:
+        threads.extend(threads_from_api(parser.feed(chunk)))
+    threads.extend(threads_from_api(parser.close()))
+    return threads
+
+
+MODES = {"buffered": parse_buffered, "streaming": parse_streaming}
+
+
+def max_rss_kib() -> int:
+    """このプロセスのピークRSS（KiB）"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS はバイト単位で返す
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def measure(mode: str, payload: bytes, result: Any) -> None:
+    """子プロセス内で1方式を計測
+
+    合成データの生成でピークRSSが押し上げられないよう、ペイロードは親プロセスで
+    生成して受け取る。
+    """
+    chunks = [payload[i : i + CHUNK_SIZE] for i in range(0, len(payload), CHUNK_SIZE)]
+    del payload
+
+    # 1回目: 時間とピークRSSを計測（tracemalloc のオーバーヘッドを含めない）
+    rss_before = max_rss_kib()
+    start = time.perf_counter()
+    threads = MODES[mode](chunks)
+    elapsed = time.perf_counter() - start
+    rss_after = max_rss_kib()
+    del threads
+
+    # 2回目: Pythonヒープのピークを計測
+    tracemalloc.start()
+    threads = MODES[mode](chunks)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result.put(
+        {
+            "threads": len(threads),
+            "elapsed_ms": elapsed * 1000,
+            "heap_peak_mib": heap_peak / 1024 / 1024,
+            "rss_growth_mib": (rss_after - rss_before) / 1024,
+        }
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=5000)
+    args = parser.parse_args()
+
+    payload = generate_payload(args.threads)
+    print(
+        f"スレッド数: {args.threads}, ペイロード: {len(payload) / 1024 / 1024:.1f} MiB"
+    )
+
+    context = multiprocessing.get_context("spawn")
+    for mode in MODES:
+        result = context.Queue()
+        process = context.Process(target=measure, args=(mode, payload, result))
+        process.start()
+        stats = result.get()
+        process.join()
+        print(
+            f"{mode:9s}: {stats['elapsed_ms']:8.1f} ms/tick, "
+            f"ピークRSS増加 {stats['rss_growth_mib']:6.1f} MiB, "
+            f"ヒープピーク {stats['heap_peak_mib']:6.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
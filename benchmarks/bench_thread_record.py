@@ -0,0 +1,114 @@
+"""スレッドレコードのメモリ・スループットのベンチマーク
+
+従来の dict[str, Any] によるスレッド表現と、__slots__ を持つ Thread レコードを比較する。
+
+実行方法:
+    poetry run python -m benchmarks.bench_thread_record [--threads 5000] [--keywords 200]
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from src.futaba_search.thread import Thread
+
+ALPHABET = "あいうえおかきくけこさしすせそABCDEFGHIJabcdefghij"
+
+
+def build_dict(thread_id: str, thread_data: dict[str, Any]) -> dict[str, Any]:
+    """従来の parse_threads と同じ辞書を作成"""
+    thumb_url = None
+    if thread_data.get("thumb"):
+        thumb_url = f"https://may.2chan.net{thread_data['thumb']}"
+    elif thread_data.get("src"):
+        thumb_url = f"https://may.2chan.net{thread_data['src']}"
+    return {
+        "id": thread_id,
+        "title": thread_data.get("com", ""),
+        "subject": thread_data.get("sub", ""),
+        "name": thread_data.get("name", ""),
+        "timestamp": thread_data.get("now", ""),
+        "thumb_url": thumb_url,
+    }
+
+
+def dict_match(thread: dict[str, Any], keyword: str) -> bool:
+    """従来の check_keyword_match（照合のたびに連結・小文字化）"""
+    searchable_text = f"{thread['title']} {thread['subject']}".lower()
+    return keyword.lower() in searchable_text
+
+
+def record_match(thread: Thread, keyword: str) -> bool:
+    """Thread レコードの照合（解析時に計算済みのテキストを使う）"""
+    return keyword in thread.search_text
+
+
+def measure_memory(build: Callable[[str, dict[str, Any]], Any], raw: dict) -> float:
+    """レコード一覧の保持に必要なメモリ（KiB、文字列を含む）"""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    records = [build(thread_id, data) for thread_id, data in raw.items()]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return (after - before) / 1024
+
+
+def measure_throughput(
+    match: Callable[[Any, str], bool], records: list[Any], keywords: list[str]
+) -> float:
+    """全キーワード × 全スレッドの照合にかかる時間（ミリ秒）"""
+    start = time.perf_counter()
+    for keyword in keywords:
+        for record in records:
+            match(record, keyword)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=5000)
+    parser.add_argument("--keywords", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    raw = {
+        str(1_200_000_000 + i): {
+            "com": "".join(rng.choices(ALPHABET, k=rng.randint(20, 200))),
+            "sub": "無念",
+            "name": "としあき",
+            "now": "24/01/01(月)00:00:00",
+            "thumb": f"/b/thumb/{1704034800000 + i}s.jpg",
+        }
+        for i in range(args.threads)
+    }
+    keywords = ["".join(rng.choices(ALPHABET, k=3)) for _ in range(args.keywords)]
+    lowered = [keyword.lower() for keyword in keywords]
+
+    dict_memory = measure_memory(build_dict, raw)
+    record_memory = measure_memory(Thread.from_api, raw)
+
+    dicts = [build_dict(thread_id, data) for thread_id, data in raw.items()]
+    records = [Thread.from_api(thread_id, data) for thread_id, data in raw.items()]
+    dict_time = measure_throughput(dict_match, dicts, keywords)
+    record_time = measure_throughput(record_match, records, lowered)
+
+    print(f"スレッド数: {args.threads}, キーワード数: {args.keywords}")
+    print(
+        f"dict  : {dict_memory:8.1f} KiB (入れ物 {sys.getsizeof(dicts[0])} B/件), "
+        f"照合 {dict_time:8.1f} ms "
+        f"({args.threads * args.keywords / dict_time / 1000:5.2f} M照合/秒)"
+    )
+    print(
+        f"Thread: {record_memory:8.1f} KiB (入れ物 {sys.getsizeof(records[0])} B/件), "
+        f"照合 {record_time:8.1f} ms "
+        f"({args.threads * args.keywords / record_time / 1000:5.2f} M照合/秒)"
+    )
+
+
+if __name__ == "__main__":
+    main()
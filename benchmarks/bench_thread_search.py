@@ -0,0 +1,108 @@
+"""スレッド検索のベンチマーク
+
+記録済みのスレッドが大量にあるデータベースで、検索（search_threads）の
+レイテンシをトライグラム索引と全件走査で比較する。
+あわせて、監視1回分ずつの一括記録（ingest_threads）のスループットも測る。
+
+実行方法:
+    poetry run python -m benchmarks.bench_thread_search [--threads 1000000]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.futaba_search.database import FutabaDatabase
+from src.futaba_search.thread import Thread
+
+# スレッド本文を組み立てる語（よく出る語とまれな語が混ざるようにする）
+WORDS = (
+    "実況 画像 スレ 猫 犬 車 料理 ゲーム 野球 サッカー アニメ 漫画 映画 音楽 "
+    "ニュース 天気 地震 政治 経済 仕事 学校 旅行 写真 動画 配信 雑談 質問 相談 "
+    "模型 釣り 自転車 カメラ 時計 パソコン スマホ 家電 鉄道 飛行機 宇宙"
+).split()
+
+# (表示名, 検索語, 板)
+QUERIES = (
+    ("よく出る語   ", "ゲーム", None),
+    ("まれな語     ", "飛行機 宇宙", None),
+    ("該当なし     ", "存在しない語", None),
+    ("2文字の語    ", "釣り", None),
+    ("板で絞り込み ", "ゲーム", "img"),
+)
+
+
+def make_threads(start: int, count: int, rng: random.Random) -> list[Thread]:
+    """ランダムな本文のスレッドを作成"""
+    threads = []
+    for thread_id in range(start, start + count):
+        # まれな語の組み合わせは偏らせて、該当件数に差をつける
+        words = rng.choices(WORDS, weights=range(len(WORDS), 0, -1), k=6)
+        threads.append(
+            Thread.from_api(
+                str(thread_id),
+                {"com": " ".join(words), "sub": "無念", "now": "24/01/01(月)"},
+                "img" if thread_id % 10 == 0 else "may",
+            )
+        )
+    return threads
+
+
+def build_database(db: FutabaDatabase, threads: int, batch: int) -> None:
+    """監視1回分ずつスレッドを記録し、記録のスループットを表示"""
+    rng = random.Random(0)
+    start_seen = datetime.now() - timedelta(days=6)
+    step = timedelta(days=6) / max(1, threads // batch)
+
+    elapsed = 0.0
+    for i, start in enumerate(range(0, threads, batch)):
+        records = make_threads(1_000_000_000 + start, min(batch, threads - start), rng)
+        began = time.perf_counter()
+        db.ingest_threads(records, seen_at=start_seen + step * i)
+        elapsed += time.perf_counter() - began
+
+    print(
+        f"記録: {threads}件 {elapsed:6.1f} s "
+        f"({threads / elapsed:,.0f}件/s, {elapsed / (threads / batch) * 1000:.1f} ms/回)"
+    )
+
+
+def measure(db: FutabaDatabase, query: str, board: str | None, page: int) -> float:
+    """検索の中央値レイテンシ（ms）"""
+    samples = []
+    for _ in range(5):
+        began = time.perf_counter()
+        db.search_threads(query, board=board, page=page)
+        samples.append(time.perf_counter() - began)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = FutabaDatabase(Path(tmpdir) / "bench.db")
+        build_database(db, args.threads, args.batch)
+
+        print(f"{'':14s} {'索引 1頁':>10s} {'索引 20頁':>10s} {'走査 1頁':>10s}")
+        for label, query, board in QUERIES:
+            db.fulltext_available = True
+            indexed = measure(db, query, board, 1)
+            indexed_deep = measure(db, query, board, 20)
+            db.fulltext_available = False
+            scanned = measure(db, query, board, 1)
+            print(
+                f"{label}: {indexed:8.1f} ms {indexed_deep:8.1f} ms {scanned:8.1f} ms"
+            )
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
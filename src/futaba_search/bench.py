@@ -0,0 +1,450 @@
+"""記録したカタログを使ったオフラインの再生ベンチマーク（futaba-search bench）
+
+futaba.php?mode=json のスナップショット（記録したもの、または合成したもの）を
+順番に1ティックずつ、ボットの監視処理（FutabaBot.monitor_board）にそのまま流し、
+段階ごとのスループット・ティックのレイテンシ・ピークメモリを JSON で出力する。
+カタログは FutabaMonitor と同じくチャンクごとに逐次解析し、Discord への送信は
+偽の送信先に置き換える。ネットワークは使わない。
+
+スナップショットはディレクトリ内の *.json をファイル名順に読み込む。記録例:
+    curl -o snapshots/0001.json 'https://may.2chan.net/b/futaba.php?mode=json'
+
+実行例:
+    futaba-search bench --subscriptions 10000 --ticks 100
+    futaba-search bench --snapshots snapshots/ --subscriptions 1000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import discord
+
+from .boards import BOARDS, DEFAULT_BOARD, Board
+from .bot import FutabaBot
+from .database import AsyncFutabaDatabase, FutabaDatabase
+from .dispatcher import Notification, NotificationDispatcher
+from .monitor import STREAM_CHUNK_SIZE
+from .streaming import CatalogStreamParser
+from .thread import Thread, threads_from_api
+
+# 計測する段階（出力の順）と items として数えるもの
+# - parse: カタログの逐次解析（デコードを含む）
+# - evaluate: 監視処理のうち解析以外
+#   （差分 → マッチング → 重複チェック → 送信待ちへの追加 → 検索用の記録）
+# - deliver: 送信待ちの通知の送信と通知履歴の記録
+STAGES = {
+    "parse": "スレッド",
+    "evaluate": "スレッド",
+    "deliver": "送信した通知",
+}
+
+# 合成するスレッド本文の語（よく出る語と、番号付きのまれな語を混ぜる）
+COMMON_WORDS = (
+    "実況 画像 スレ 猫 犬 車 料理 ゲーム 野球 サッカー アニメ 漫画 映画 音楽 "
+    "ニュース 天気 地震 仕事 学校 旅行 写真 動画 配信 雑談 質問 相談 模型 釣り"
+).split()
+RARE_WORDS = 5000
+
+
+class FakeSink:
+    """Discord の代わりに送信内容を数える送信先"""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.messages = 0
+        self.notifications = 0
+        # 通知した (スレッド, キーワード, チャンネル) の数
+        self.keys = 0
+
+    async def send(self, notifications: list[Notification]) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.messages += 1
+        self.notifications += len(notifications)
+        self.keys += sum(len(notification.keywords) for notification in notifications)
+
+
+class ReplayCatalog:
+    """記録したカタログのバイト列を返す CatalogSource
+
+    FutabaMonitor.stream_threads と同じく、受信したチャンクごとに
+    CatalogStreamParser で解析する。push したスナップショットを1回だけ返す。
+    """
+
+    def __init__(self, board: Board) -> None:
+        self.board = board
+        self.not_modified = False
+        self.snapshot: bytes | None = None
+        # 直近の解析にかかった時間と解析したスレッド数
+        self.parse_seconds = 0.0
+        self.threads = 0
+
+    def push(self, snapshot: bytes) -> None:
+        self.snapshot = snapshot
+
+    def clear_validators(self) -> None:
+        """記録したカタログは毎回全体を返すため何もしない"""
+
+    async def stream_threads(self) -> list[Thread] | None:
+        snapshot, self.snapshot = self.snapshot, None
+        if snapshot is None:
+            return None
+
+        started = time.perf_counter()
+        board = self.board.name
+        parser = CatalogStreamParser()
+        threads: list[Thread] = []
+        for offset in range(0, len(snapshot), STREAM_CHUNK_SIZE):
+            chunk = snapshot[offset : offset + STREAM_CHUNK_SIZE]
+            threads.extend(threads_from_api(parser.feed(chunk), board))
+        threads.extend(threads_from_api(parser.close(), board))
+        self.parse_seconds = time.perf_counter() - started
+        self.threads = len(threads)
+        return threads
+
+
+class ReplayBot(FutabaBot):
+    """Discord に接続せず、送信を偽の送信先に置き換えたボット"""
+
+    def __init__(self, db: AsyncFutabaDatabase, sink: FakeSink) -> None:
+        super().__init__(db=db)
+        self.sink = sink
+        # 偽の送信先はレート制限の対象にしない
+        self.dispatcher = NotificationDispatcher(
+            self._send_dispatched,
+            batch_size=self.dispatcher.batch_size,
+            max_queue=1_000_000,
+            rate=1_000_000,
+            on_failed=self._notification_failed,
+        )
+        self._channels: dict[int, discord.PartialMessageable] = {}
+
+    def resolve_channel(self, channel_id: int) -> discord.PartialMessageable:
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self.get_partial_messageable(channel_id)
+            self._channels[channel_id] = channel
+        return channel
+
+    async def update_presence(self, active_channels: int) -> None:
+        pass
+
+    async def send_notifications(
+        self, channel: discord.abc.Messageable, notifications: list[Notification]
+    ) -> None:
+        await self.sink.send(notifications)
+
+
+def _random_word(rng: random.Random) -> str:
+    if rng.random() < 0.7:
+        return rng.choice(COMMON_WORDS)
+    return f"語{rng.randrange(RARE_WORDS)}"
+
+
+def _random_thread(rng: random.Random) -> dict[str, str]:
+    words = [_random_word(rng) for _ in range(rng.randint(3, 10))]
+    return {
+        "com": "<br>".join(" ".join(words[i : i + 3]) for i in range(0, len(words), 3)),
+        "sub": "無念",
+        "name": "としあき",
+        "now": "24/01/01(月)00:00:00",
+        "thumb": "/b/thumb/0s.jpg",
+    }
+
+
+def generate_snapshots(
+    ticks: int,
+    threads: int = 500,
+    new_per_tick: int = 10,
+    changed_per_tick: int = 5,
+    seed: int = 0,
+) -> list[bytes]:
+    """合成したカタログのスナップショットを生成
+
+    毎ティック new_per_tick 件のスレッドが立って同じ数の古いスレッドが落ち、
+    changed_per_tick 件のスレッドの本文が変わる。
+    """
+    rng = random.Random(seed)
+    next_id = 1_000_000_000
+    catalog: dict[str, dict[str, str]] = {}
+    for _ in range(threads):
+        catalog[str(next_id)] = _random_thread(rng)
+        next_id += 1
+
+    snapshots = []
+    for _ in range(ticks):
+        for thread_id in list(catalog)[:new_per_tick]:
+            del catalog[thread_id]
+        for _ in range(new_per_tick):
+            catalog[str(next_id)] = _random_thread(rng)
+            next_id += 1
+        for thread_id in rng.sample(list(catalog), min(changed_per_tick, len(catalog))):
+            catalog[thread_id] = _random_thread(rng)
+        snapshots.append(json.dumps({"res": catalog}, ensure_ascii=False).encode())
+    return snapshots
+
+
+def load_snapshots(directory: Path) -> list[bytes]:
+    """ディレクトリ内の *.json をファイル名順に読み込む"""
+    paths = sorted(directory.glob("*.json"))
+    if not paths:
+        raise ValueError(f"スナップショットが見つかりません: {directory}")
+    return [path.read_bytes() for path in paths]
+
+
+def write_snapshots(directory: Path, snapshots: list[bytes]) -> None:
+    """スナップショットを 0001.json から順に保存"""
+    directory.mkdir(parents=True, exist_ok=True)
+    for i, snapshot in enumerate(snapshots, 1):
+        (directory / f"{i:04d}.json").write_bytes(snapshot)
+
+
+def _subscription_word(rng: random.Random) -> str:
+    # 実際の購読と同じく、大半はたまにしか現れない語にする
+    if rng.random() < 0.01:
+        return rng.choice(COMMON_WORDS)
+    return f"語{rng.randrange(RARE_WORDS)}"
+
+
+def generate_subscriptions(
+    count: int, channels: int, expressions: int = 0, seed: int = 0
+) -> list[tuple[int, str]]:
+    """合成スレッドの語を使った (channel_id, keyword) の購読を生成"""
+    rng = random.Random(seed + 1)
+    subscriptions = [
+        (rng.randrange(channels) + 1, _subscription_word(rng)) for _ in range(count)
+    ]
+    subscriptions += [
+        (
+            rng.randrange(channels) + 1,
+            f"expr:{_subscription_word(rng)} AND NOT {_random_word(rng)}",
+        )
+        for _ in range(expressions)
+    ]
+    return subscriptions
+
+
+def _percentile(samples: list[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class ReplayBenchmark:
+    """スナップショットをボットの監視処理にそのまま流して計測する"""
+
+    def __init__(
+        self,
+        db: AsyncFutabaDatabase,
+        subscriptions: list[tuple[int, str]],
+        board: str = DEFAULT_BOARD,
+        sink: FakeSink | None = None,
+    ) -> None:
+        self.db = db
+        self.board = BOARDS[board]
+        self.sink = sink or FakeSink()
+        self.bot = ReplayBot(db, self.sink)
+        self.catalog = ReplayCatalog(self.board)
+        self.db.subscriptions.load(
+            (channel_id, keyword, self.board.name)
+            for channel_id, keyword in subscriptions
+        )
+        _, board_subscriptions = self.db.subscriptions.snapshot(self.board.name)
+        self.subscriptions = len(board_subscriptions)
+
+        # 段階ごとのティック単位の処理時間と処理件数
+        self.stage_seconds: dict[str, list[float]] = {stage: [] for stage in STAGES}
+        self.stage_items: dict[str, int] = dict.fromkeys(STAGES, 0)
+        self.tick_seconds: list[float] = []
+        self.bytes = 0
+        self.threads = 0
+
+    def _record(self, stage: str, seconds: float, items: int) -> None:
+        self.stage_seconds[stage].append(seconds)
+        self.stage_items[stage] += items
+
+    async def tick(self, snapshot: bytes) -> None:
+        """スナップショット1つ分を監視処理に流し、送信し終わるまで待つ"""
+        sent = self.sink.notifications
+        self.catalog.push(snapshot)
+        started = time.perf_counter()
+        await self.bot.monitor_board(self.board, self.catalog)
+        evaluated = time.perf_counter()
+        await self.bot.dispatcher.join()
+        finished = time.perf_counter()
+
+        threads = self.catalog.threads
+        self.bytes += len(snapshot)
+        self.threads += threads
+        self._record("parse", self.catalog.parse_seconds, threads)
+        self._record(
+            "evaluate", evaluated - started - self.catalog.parse_seconds, threads
+        )
+        self._record("deliver", finished - evaluated, self.sink.notifications - sent)
+        self.tick_seconds.append(finished - started)
+
+    async def run(self, snapshots: list[bytes], repeat: int = 1) -> None:
+        self.bot.dispatcher.start()
+        try:
+            for _ in range(repeat):
+                for snapshot in snapshots:
+                    await self.tick(snapshot)
+        finally:
+            await self.bot.dispatcher.stop()
+
+    def report(self) -> dict[str, Any]:
+        """計測結果（JSON にできる辞書）"""
+        stages: dict[str, dict[str, Any]] = {}
+        for stage in STAGES:
+            samples = self.stage_seconds[stage]
+            total = sum(samples)
+            stages[stage] = {
+                "unit": STAGES[stage],
+                "seconds": round(total, 6),
+                "items": self.stage_items[stage],
+                "items_per_second": round(self.stage_items[stage] / total, 1)
+                if total
+                else 0.0,
+                "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+                "p99_ms": round(_percentile(samples, 99) * 1000, 3),
+            }
+        ticks = self.tick_seconds
+        state = self.bot.board_states.get(self.board.name)
+        return {
+            "board": self.board.name,
+            "ticks": len(ticks),
+            "bytes": self.bytes,
+            "threads": self.threads,
+            "subscriptions": self.subscriptions,
+            "keywords": len(state.matcher) if state and state.matcher else 0,
+            "notified": self.sink.keys,
+            "notifications": self.sink.notifications,
+            "messages": self.sink.messages,
+            "tick_ms": {
+                "p50": round(_percentile(ticks, 50) * 1000, 3),
+                "p99": round(_percentile(ticks, 99) * 1000, 3),
+                "max": round(max(ticks, default=0.0) * 1000, 3),
+                "mean": round(statistics.fmean(ticks) * 1000, 3) if ticks else 0.0,
+            },
+            "stages": stages,
+        }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """bench サブコマンドの引数を追加"""
+    parser.add_argument(
+        "--snapshots",
+        type=Path,
+        help="再生するスナップショット（*.json）のディレクトリ（省略時は合成する）",
+    )
+    parser.add_argument(
+        "--write-snapshots",
+        type=Path,
+        help="合成したスナップショットを保存するディレクトリ",
+    )
+    parser.add_argument("--ticks", type=int, default=50, help="合成するティック数")
+    parser.add_argument(
+        "--threads", type=int, default=500, help="合成するカタログのスレッド数"
+    )
+    parser.add_argument(
+        "--new-per-tick", type=int, default=10, help="1ティックで立つスレッド数"
+    )
+    parser.add_argument("--subscriptions", type=int, default=1000, help="購読数")
+    parser.add_argument(
+        "--expressions", type=int, default=0, help="追加する AND/NOT 式の購読数"
+    )
+    parser.add_argument("--channels", type=int, default=50, help="チャンネル数")
+    parser.add_argument("--board", default=DEFAULT_BOARD, choices=sorted(BOARDS))
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="スナップショット全体を繰り返す回数"
+    )
+    parser.add_argument(
+        "--send-latency",
+        type=float,
+        default=0.0,
+        help="偽の送信先での1メッセージあたりの遅延（秒）",
+    )
+    parser.add_argument(
+        "--database", type=Path, help="使用するデータベース（省略時は一時ファイル）"
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="tracemalloc で Python のピークメモリを測る（処理は遅くなる）",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="結果の JSON を保存するファイル")
+
+
+async def replay(
+    args: argparse.Namespace, snapshots: list[bytes], db_path: Path
+) -> dict[str, Any]:
+    """スナップショットを再生して計測結果を返す"""
+    db = AsyncFutabaDatabase(FutabaDatabase(db_path))
+    try:
+        await db.load_notified_index()
+        subscriptions = generate_subscriptions(
+            args.subscriptions, args.channels, args.expressions, args.seed
+        )
+        benchmark = ReplayBenchmark(
+            db, subscriptions, args.board, FakeSink(args.send_latency)
+        )
+        await benchmark.run(snapshots, args.repeat)
+        return benchmark.report()
+    finally:
+        db.close()
+
+
+def run_bench(args: argparse.Namespace) -> dict[str, Any]:
+    """bench サブコマンドを実行し、計測結果を JSON で出力"""
+    if args.snapshots:
+        snapshots = load_snapshots(args.snapshots)
+        source = str(args.snapshots)
+    else:
+        snapshots = generate_snapshots(
+            args.ticks, args.threads, args.new_per_tick, seed=args.seed
+        )
+        source = "synthetic"
+    if args.write_snapshots:
+        write_snapshots(args.write_snapshots, snapshots)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = args.database or Path(tmpdir) / "bench.db"
+        result = asyncio.run(replay(args, snapshots, db_path))
+    result = {
+        "source": source,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        **result,
+    }
+
+    # ru_maxrss は Linux では KiB、macOS ではバイト単位
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_mb"] = round(
+        peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1
+    )
+    if args.trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_traced_mb"] = round(peak / (1024 * 1024), 1)
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    print(output)
+    return result
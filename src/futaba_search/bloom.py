@@ -0,0 +1,166 @@
+"""通知済み判定用のブルームフィルター"""
+
+import hashlib
+import math
+from collections.abc import Iterable
+from datetime import date
+
+from .cache import NotifiedKey
+
+# ハッシュ関数の数の上限（メモリに余裕があっても判定コストを抑える）
+MAX_HASHES = 10
+
+
+def _hash_pair(key: NotifiedKey) -> tuple[int, int]:
+    """キーから2つの64ビットハッシュ値を求める（ダブルハッシュ用）"""
+    thread_id, keyword, channel_id = key
+    digest = hashlib.blake2b(
+        f"{thread_id}\0{keyword}\0{channel_id}".encode(), digest_size=16
+    ).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    # 2つ目は奇数にして、ビット数と互いに素になりやすくする
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return h1, h2
+
+
+class BloomFilter:
+    """固定サイズのブルームフィルター
+
+    「含まれない」という判定は常に正しく、「含まれる」という判定は
+    偽陽性の可能性がある。
+    """
+
+    def __init__(self, num_bits: int, num_hashes: int) -> None:
+        if num_bits < 8 or num_hashes < 1:
+            raise ValueError("ブルームフィルターのサイズが小さすぎます")
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._bits = bytearray((num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def for_memory(cls, num_bytes: int, capacity: int) -> "BloomFilter":
+        """メモリ量と想定要素数から、偽陽性率が最小になるハッシュ数で作成"""
+        num_bits = num_bytes * 8
+        num_hashes = round(num_bits / max(capacity, 1) * math.log(2))
+        num_hashes = min(MAX_HASHES, max(1, num_hashes))
+        return cls(num_bits, num_hashes)
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    def positions(self, key: NotifiedKey) -> list[int]:
+        """キーに対応するビット位置（同じサイズのフィルター間で使い回せる）"""
+        h1, h2 = _hash_pair(key)
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: NotifiedKey) -> None:
+        bits = self._bits
+        for position in self.positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def contains_positions(self, positions: list[int]) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7)) for position in positions
+        )
+
+    def __contains__(self, key: NotifiedKey) -> bool:
+        return self.contains_positions(self.positions(key))
+
+    def estimated_false_positive_rate(self) -> float:
+        """追加済みの要素数から見積もった偽陽性率"""
+        return float(
+            (1 - math.exp(-self.num_hashes * self.count / self.num_bits))
+            ** self.num_hashes
+        )
+
+
+class TimeBucketedBloomFilter:
+    """通知日ごとのブルームフィルターを保存期間に合わせて入れ替える
+
+    日ごとの通知履歴テーブルと同じ単位でフィルターを持ち、保存期間を過ぎた日の
+    フィルターは丸ごと捨てる。全体のメモリ量は memory_bytes を上限とし、
+    保存期間の日数 + 1（当日分）で等分する。
+
+    判定では「含まれる可能性のある日」を返すため、照合するのはその日の
+    テーブルだけでよい。
+    """
+
+    def __init__(
+        self, memory_bytes: int, retention_days: int, expected_per_day: int
+    ) -> None:
+        self.num_buckets = retention_days + 1
+        self.bucket_bytes = max(1, memory_bytes // self.num_buckets)
+        self.expected_per_day = expected_per_day
+        self._buckets: dict[date, BloomFilter] = {}
+        self.loaded = False
+
+        # 計測用カウンタ（フィルターで未通知と判定できた照会数 / DBで照合した照会数
+        # / DBで照合した結果、未通知だった照会数）
+        self.negatives = 0
+        self.positives = 0
+        self.false_positives = 0
+
+    def __len__(self) -> int:
+        return sum(bucket.count for bucket in self._buckets.values())
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(bucket.memory_bytes for bucket in self._buckets.values())
+
+    def load(self, rows: Iterable[tuple[NotifiedKey, date]]) -> None:
+        """(キー, 通知日) のレコードからフィルターを構築"""
+        self._buckets.clear()
+        for key, day in rows:
+            self.add(key, day)
+        self.loaded = True
+
+    def add(self, key: NotifiedKey, day: date) -> None:
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = BloomFilter.for_memory(
+                self.bucket_bytes, self.expected_per_day
+            )
+        bucket.add(key)
+
+    def candidate_days(self, key: NotifiedKey) -> list[date]:
+        """キーが含まれる可能性のある通知日（空なら確実に未通知）"""
+        if not self._buckets:
+            return []
+        # 全ての日のフィルターは同じサイズなので、ハッシュ計算は1回で済む
+        positions = next(iter(self._buckets.values())).positions(key)
+        return [
+            day
+            for day, bucket in self._buckets.items()
+            if bucket.contains_positions(positions)
+        ]
+
+    def expire(self, cutoff: date) -> int:
+        """cutoff より前の日のフィルターを捨て、捨てた数を返す"""
+        expired = [day for day in self._buckets if day < cutoff]
+        for day in expired:
+            del self._buckets[day]
+        return len(expired)
+
+    def stats(self) -> dict[str, float]:
+        """計測カウンタのスナップショットを取得"""
+        return {
+            "entries": len(self),
+            "buckets": len(self._buckets),
+            "memory_bytes": self.memory_bytes,
+            "negatives": self.negatives,
+            "positives": self.positives,
+            "false_positives": self.false_positives,
+            "estimated_fpp": self.estimated_false_positive_rate(),
+        }
+
+    def estimated_false_positive_rate(self) -> float:
+        """未通知のキーがいずれかの日で「含まれる可能性あり」となる確率の見積もり"""
+        miss = 1.0
+        for bucket in self._buckets.values():
+            miss *= 1 - bucket.estimated_false_positive_rate()
+        return 1 - miss
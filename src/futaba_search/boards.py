@@ -0,0 +1,107 @@
+"""監視対象の板の定義"""
+
+from dataclasses import dataclass, replace
+
+from .config import FUTABA_API_URL, FUTABA_BOARDS, MONITOR_INTERVAL, MONITOR_JITTER
+
+# 従来から監視している板（通知履歴のスレッドキーに板名を付けない）
+DEFAULT_BOARD = "may"
+
+
+@dataclass(frozen=True, slots=True)
+class Board:
+    """ふたば☆ちゃんねるの板1つ分の設定
+
+    archive_links は (表示名, URLテンプレート) の組で、テンプレート中の
+    {thread_id} がスレッドIDに置き換えられる。保存先が分からない板では空にする。
+    """
+
+    name: str
+    host: str
+    path: str = "b"
+    interval: float = MONITOR_INTERVAL
+    jitter: float = MONITOR_JITTER
+    archive_links: tuple[tuple[str, str], ...] = ()
+    api_url: str | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"https://{self.host}"
+
+    @property
+    def catalog_url(self) -> str:
+        """カタログ（futaba.php?mode=json）のURL"""
+        return self.api_url or f"{self.base_url}/{self.path}/futaba.php?mode=json"
+
+    def thread_url(self, thread_id: int) -> str:
+        return f"{self.base_url}/{self.path}/res/{thread_id}.htm"
+
+    def archive_urls(self, thread_id: int) -> list[tuple[str, str]]:
+        """スレッドの保存先サイトの (表示名, URL)"""
+        return [
+            (label, template.format(thread_id=thread_id))
+            for label, template in self.archive_links
+        ]
+
+    def thread_key(self, thread_id: int) -> str:
+        """通知履歴に記録するスレッドキー
+
+        既存の通知履歴と互換性を保つため、既定の板ではスレッドIDのみを使う。
+        """
+        if self.name == DEFAULT_BOARD:
+            return str(thread_id)
+        return f"{self.name}:{thread_id}"
+
+
+BOARDS: dict[str, Board] = {
+    "may": Board(
+        name="may",
+        host="may.2chan.net",
+        archive_links=(
+            ("ふたばフォレスト", "http://futabaforest.net/b/res/{thread_id}.htm"),
+            (
+                "FTBucket",
+                "https://may.ftbucket.info/may/cont/"
+                "may.2chan.net_b_res_{thread_id}/index.htm",
+            ),
+        ),
+        api_url=FUTABA_API_URL,
+    ),
+    "img": Board(name="img", host="img.2chan.net"),
+    "dat": Board(name="dat", host="dat.2chan.net"),
+}
+
+
+def parse_boards(spec: str) -> list[Board]:
+    """FUTABA_BOARDS の指定（例: "may,img:120"）から監視する板を取得
+
+    板名の後に ":秒数" を付けるとその板の監視間隔を変更できる。
+
+    Raises:
+        ValueError: 未知の板名や不正な間隔が指定された場合
+    """
+    boards: list[Board] = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, interval = item.partition(":")
+        board = BOARDS.get(name)
+        if board is None:
+            raise ValueError(f"未知の板です: {name}")
+        if interval:
+            board = replace(board, interval=float(interval))
+        boards.append(board)
+    return boards
+
+
+def get_board(name: str) -> Board:
+    """板名から設定を取得（未知の板は ValueError）"""
+    board = BOARDS.get(name)
+    if board is None:
+        raise ValueError(f"未知の板です: {name}")
+    return board
+
+
+# 監視する板
+MONITORED_BOARDS = parse_boards(FUTABA_BOARDS)
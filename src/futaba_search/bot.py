@@ -1,42 +1,214 @@
 """ふたば検索のDiscordボット実装"""
 
+import logging
+import sys
+import time
 from datetime import UTC, datetime
+from multiprocessing.connection import Connection
+from typing import Any
 
 import discord
 from discord.ext import commands, tasks
 
-from .config import DISCORD_TOKEN, MONITOR_INTERVAL
-from .database import FutabaDatabase
-from .logging_config import get_logger
-from .monitor import FutabaMonitor
-from .utils import format_datetime, get_mute_until_datetime
+from .boards import BOARDS, DEFAULT_BOARD, MONITORED_BOARDS, Board
+from .cache import SubscriptionRegistry
+from .config import (
+    CATALOG_SOCKET,
+    DISCORD_TOKEN,
+    DISPATCH_MAX_RETRIES,
+    DISPATCH_QUEUE_SIZE,
+    DISPATCH_WORKERS,
+    METRICS_HOST,
+    NOTIFICATION_CLEANUP_INTERVAL,
+    NOTIFICATION_RETENTION_DAYS,
+    NOTIFY_COALESCE,
+    OBSERVED_RETENTION_DAYS,
+)
+from .database import AsyncFutabaDatabase, FutabaDatabase
+from .dispatcher import Notification, NotificationDispatcher
+from .logging_config import get_logger, setup_logging
+from .matcher import KeywordMatcher
+from .metrics import REGISTRY, MetricsServer
+from .monitor import CatalogSnapshot, CatalogSource
+from .query import normalize_keyword
+from .scheduler import BoardScheduler
+from .sharding import CatalogReceiver, Shard, run_shards, shard_log_file
+from .thread import Thread
+from .utils import format_datetime, get_mute_until_datetime, parse_time_interval
 
 logger = get_logger(__name__)
 
+# Discordの1メッセージあたりの埋め込みの上限
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+# 埋め込みのタイトル・説明の上限（超えると送信が 400 で拒否される）
+MAX_EMBED_TITLE_LENGTH = 256
+MAX_EMBED_DESCRIPTION_LENGTH = 4096
+# 検索結果に表示するタイトルの最大文字数（1ページが2000文字に収まるように）
+SEARCH_TITLE_LENGTH = 80
+
+TICK_SECONDS = REGISTRY.histogram(
+    "futaba_tick_seconds", "板1つ分の監視処理全体にかかった時間", ("board",)
+)
+MATCH_SECONDS = REGISTRY.histogram(
+    "futaba_match_seconds",
+    "1回の監視でのキーワードマッチングにかかった時間",
+    ("board",),
+)
+CATALOG_THREADS = REGISTRY.counter(
+    "futaba_catalog_threads_total",
+    "カタログ差分のスレッド数（state は new / changed / unchanged / removed）",
+    ("board", "state"),
+)
+MATCHED_TOTAL = REGISTRY.counter(
+    "futaba_matches_total",
+    "キーワードにマッチした (スレッド, キーワード, チャンネル) の数",
+    ("board",),
+)
+QUEUED_TOTAL = REGISTRY.counter(
+    "futaba_notifications_queued_total",
+    "1回の監視で送信待ちに追加した通知の数",
+    ("board",),
+)
+MONITOR_GAUGES = {
+    key: REGISTRY.gauge(f"futaba_monitor_{key}", help, ("board",))
+    for key, help in (
+        ("interval", "現在の監視間隔（秒）"),
+        ("new_threads_per_fetch", "1回の取得あたりの新規スレッド数（指数移動平均）"),
+        ("new_threads_per_second", "1秒あたりの新規スレッド数（指数移動平均）"),
+    )
+}
+DISPATCH_QUEUE_DEPTH = REGISTRY.gauge("futaba_dispatch_queue_depth", "送信待ちの通知数")
+SUBSCRIPTIONS = REGISTRY.gauge("futaba_subscriptions", "購読の数", ("board",))
+DEDUP_GAUGE = REGISTRY.gauge(
+    "futaba_dedup", "重複チェックの計測値（key は dedup_stats の項目）", ("key",)
+)
+
+
+class BoardState:
+    """板ごとの監視状態（カタログの前回値・マッチャー・ミュート状態）"""
+
+    def __init__(self) -> None:
+        self.catalog = CatalogSnapshot()
+        self.matcher: KeywordMatcher | None = None
+        # マッチャー構築時の購読登録簿の version
+        self.matcher_version = -1
+        self.muted_channels: set[int] = set()
+        self.full_scan_pending = False
+
+    def get_matcher(self, registry: SubscriptionRegistry, board: str) -> KeywordMatcher:
+        """板の購読に対応するマッチャーを取得（登録簿の version が変わった場合のみ再構築）"""
+        if self.matcher is None or registry.version != self.matcher_version:
+            version, subscriptions = registry.snapshot(board)
+            self.matcher = KeywordMatcher(subscriptions)
+            self.matcher_version = version
+            logger.debug(
+                "%s: マッチャーを再構築: %s件のキーワード", board, len(self.matcher)
+            )
+        return self.matcher
+
+
+def truncate(text: str, length: int) -> str:
+    """length 文字を超える場合は末尾を「…」にして length 文字に切り詰める"""
+    if len(text) <= length:
+        return text
+    return text[: length - 1] + "…"
+
 
 class FutabaBot(commands.Bot):
     """ふたばスレッドを監視するDiscordボット"""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        metrics_port: int = 0,
+        shard: Shard | None = None,
+        connection: Connection | None = None,
+        db: AsyncFutabaDatabase | None = None,
+    ) -> None:
         intents = discord.Intents.default()
         intents.message_content = True
-        super().__init__(command_prefix="!", intents=intents)
+        # シャードのワーカーは Discord のシャードとしても接続を分ける
+        sharding: dict[str, Any] = {}
+        if shard:
+            sharding = {"shard_id": shard.index, "shard_count": shard.count}
+        super().__init__(command_prefix="!", intents=intents, **sharding)
 
-        self.db = FutabaDatabase()
-        self.monitor_task: tasks.Loop | None = None
+        # シャードのワーカー（担当するチャンネルの購読・通知履歴だけを扱う）
+        self.shard = shard
+        # DBアクセスは専用スレッドで行い、イベントループを止めない
+        # （db を渡すとそのデータベースを使う。ベンチマーク・テスト用）
+        self.db = db or AsyncFutabaDatabase(
+            FutabaDatabase(shard=shard) if shard else None
+        )
+        self.cleanup_task: tasks.Loop | None = None
+        # 板ごとの監視タスク（接続プールは全ての板で共有する）。
+        # コーディネーターからカタログを受け取る場合は自分では取得しない
+        self.scheduler: BoardScheduler | CatalogReceiver
+        if connection is not None:
+            self.scheduler = CatalogReceiver(
+                MONITORED_BOARDS, self.monitor_board, connection, self.close
+            )
+        else:
+            self.scheduler = BoardScheduler(
+                MONITORED_BOARDS, self.monitor_board, catalog_socket=CATALOG_SOCKET
+            )
+        self.board_states: dict[str, BoardState] = {}
+        # 最後にステータスに表示したアクティブなチャンネル数
+        self._active_channels = -1
+        # マッチングと送信を切り離す通知ディスパッチャー
+        self.dispatcher = NotificationDispatcher(
+            self._send_dispatched,
+            workers=DISPATCH_WORKERS,
+            batch_size=MAX_EMBEDS_PER_MESSAGE if NOTIFY_COALESCE else 1,
+            max_queue=DISPATCH_QUEUE_SIZE,
+            max_retries=DISPATCH_MAX_RETRIES,
+            on_failed=self._notification_failed,
+        )
+        # 送信待ち・送信中の通知（送信できるまで通知履歴には記録しないため、
+        # 次のティックで同じ通知をもう一度送信待ちに入れないように覚えておく）
+        self.in_flight: set[tuple[str, str, int]] = set()
+        # 計測値の公開（ポートが指定された場合のみ）
+        self.metrics_server: MetricsServer | None = None
+        if metrics_port:
+            REGISTRY.enabled = True
+            REGISTRY.add_collector(self.collect_metrics)
+            self.metrics_server = MetricsServer(REGISTRY, METRICS_HOST, metrics_port)
 
     async def setup_hook(self) -> None:
         """ボット開始時に呼び出されるセットアップフック"""
-        # スラッシュコマンドを同期
+        self.dispatcher.start()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error("計測値の公開を開始できません: %s", e)
+
+        # スラッシュコマンドを同期（シャードでは1つのワーカーだけが行う）
+        if not self.primary:
+            return
         try:
             await self.tree.sync()
             print(f"Synced {len(self.tree.get_commands())} commands")
         except Exception as e:
             print(f"Failed to sync commands: {e}")
 
+    async def close(self) -> None:
+        """ボット終了時に送信待ちの通知を送り、セッションとDBスレッドを閉じる"""
+        await self.scheduler.stop()
+        await self.dispatcher.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await super().close()
+        self.db.close()
+
+    @property
+    def primary(self) -> bool:
+        """全体で1回だけ行う処理（コマンドの同期・検索対象の記録）を担当するか"""
+        return self.shard is None or self.shard.primary
+
     async def on_ready(self) -> None:
         """ボットが準備完了時に呼び出される"""
-        logger.info(f"{self.user} がDiscordに接続しました!")
+        logger.info("%s がDiscordに接続しました!", self.user)
 
         # 初期ステータスを設定
         activity = discord.Activity(
@@ -45,91 +217,281 @@ class FutabaBot(commands.Bot):
         await self.change_presence(status=discord.Status.online, activity=activity)
         logger.info("初期ステータスを設定")
 
-        if not self.monitor_task:
-            self.monitor_task = self.monitor_futaba.start()  # type: ignore
+        if not self.scheduler.running:
+            await self.scheduler.start()
+        if not self.cleanup_task:
+            self.cleanup_task = self.cleanup_notifications.start()  # type: ignore
 
-    @tasks.loop(seconds=MONITOR_INTERVAL)
-    async def monitor_futaba(self) -> None:
-        """ふたばの新しいスレッドを監視する定期タスク"""
-        logger.debug("監視タスクを開始")
+    @tasks.loop(seconds=NOTIFICATION_CLEANUP_INTERVAL)
+    async def cleanup_notifications(self) -> None:
+        """保存期間を過ぎた通知履歴を削除する定期タスク（監視とは別の間隔で実行）"""
         try:
+            await self.db.cleanup_old_notifications()
+            if self.primary:
+                await self.db.cleanup_observed_threads()
+        except Exception as e:
+            logger.error("通知履歴のクリーンアップでエラーが発生: %s", e, exc_info=True)
+
+    def collect_metrics(self) -> None:
+        """スケジューラー・ディスパッチャー・重複チェックの統計をゲージに反映"""
+        for board, stats in self.scheduler.stats().items():
+            for key, gauge in MONITOR_GAUGES.items():
+                if key in stats:
+                    gauge.set(stats[key], board)
+        DISPATCH_QUEUE_DEPTH.set(self.dispatcher.queue_depth)
+        registry = self.db.subscriptions
+        for monitored in self.scheduler.boards:
+            _, subscriptions = registry.snapshot(monitored.name)
+            SUBSCRIPTIONS.set(len(subscriptions), monitored.name)
+        for key, value in self.db.dedup_stats().items():
+            DEDUP_GAUGE.set(value, key)
+
+    async def update_presence(self, active_channels: int) -> None:
+        """アクティブなチャンネル数が変わった場合のみステータスを更新"""
+        if active_channels == self._active_channels:
+            return
+        self._active_channels = active_channels
+
+        if active_channels > 0:
+            activity = discord.Activity(
+                type=discord.ActivityType.watching,
+                name=f"{active_channels}個のチャンネルで動作中!",
+            )
+        else:
+            activity = discord.Activity(
+                type=discord.ActivityType.watching, name="購読登録待ち中..."
+            )
+        await self.change_presence(status=discord.Status.online, activity=activity)
+        logger.debug("ステータス更新: %s個のチャンネルで動作中", active_channels)
+
+    async def monitor_board(self, board: Board, monitor: CatalogSource) -> int | None:
+        """板1つ分の新しいスレッドを監視する（スケジューラーから板ごとに呼び出される）
+
+        Returns:
+            前回の取得から増えた新規スレッド数（監視間隔の調整に使う）。
+            取得に失敗した場合や、比較できる前回のカタログがない場合は None
+        """
+        logger.debug("%s: 監視タスクを開始", board.name)
+        started = time.perf_counter()
+        state = self.board_states.setdefault(board.name, BoardState())
+        # 送信できないチャンネル宛てのため通知済みとするスレッド（最後にまとめて記録する）。
+        # 送信待ちに入れた通知は送信に成功したときに記録する
+        notified: list[tuple[str, str, int]] = []
+        new_threads: int | None = None
+        try:
+            # 他のワーカーが受け付けた購読・ミュートの変更を反映
+            if self.shard:
+                await self.db.refresh_shared_state()
             # 期限切れのミュートを最初にクリーンアップ
-            self.db.cleanup_expired_mutes()
-            # 一週間以上前の古い通知レコードをクリーンアップ
-            self.db.cleanup_old_notifications()
-
-            async with FutabaMonitor() as monitor:
-                data = await monitor.fetch_threads()
-                if not data:
-                    logger.debug("スレッドデータの取得に失敗、監視をスキップ")
-                    return
+            await self.db.cleanup_expired_mutes()
+
+            # 購読はインメモリ登録簿から参照する（subscriptions テーブルは読まない）
+            registry = self.db.subscriptions
+            await self.update_presence(len(registry.channel_ids()))
+            channel_ids = registry.channel_ids(board.name)
+
+            previous_matcher = state.matcher
+            matcher = state.get_matcher(registry, board.name)
 
-                threads = monitor.parse_threads(data)
-                subscriptions = self.db.get_all_subscriptions()
+            # ミュート中のチャンネルを取得（インメモリ表を参照するためDBに問い合わせない）
+            mute_table = self.db.mute_table
+            muted = {
+                channel_id
+                for channel_id in channel_ids
+                if mute_table.is_muted(channel_id)
+            }
+            unmuted = state.muted_channels - muted
+            state.muted_channels = muted
 
+            if matcher is not previous_matcher or unmuted:
+                state.full_scan_pending = True
+            if state.full_scan_pending:
+                # 購読やミュート状態が変わった場合はカタログ全体を取得し直して再評価
                 logger.debug(
-                    f"{len(threads)}件のスレッド、{len(subscriptions)}件の購読をチェック"
+                    "%s: 購読またはミュート状態の変化により全スレッドを評価", board.name
                 )
+                monitor.clear_validators()
 
-                # アクティブなチャンネル数を計算してステータス更新
-                active_channels = len({channel_id for channel_id, _ in subscriptions})
-                if active_channels > 0:
-                    activity = discord.Activity(
-                        type=discord.ActivityType.watching,
-                        name=f"{active_channels}個のチャンネルで動作中!",
+            threads = await monitor.stream_threads()
+            if threads is None:
+                if monitor.not_modified:
+                    logger.debug(
+                        "%s: カタログに変化がないため監視をスキップ", board.name
                     )
-                else:
-                    activity = discord.Activity(
-                        type=discord.ActivityType.watching, name="購読登録待ち中..."
-                    )
-                await self.change_presence(
-                    status=discord.Status.online, activity=activity
+                    return 0
+                logger.debug(
+                    "%s: スレッドデータの取得に失敗、監視をスキップ", board.name
                 )
-                logger.debug(f"ステータス更新: {active_channels}個のチャンネルで動作中")
+                return None
 
-                for channel_id, keyword in subscriptions:
-                    # ミュート中のチャンネルをスキップ
-                    if self.db.is_channel_muted(channel_id):
-                        continue
+            logger.debug(
+                "%s: %s件のスレッド、%s件のキーワードをチェック",
+                board.name,
+                len(threads),
+                len(matcher),
+            )
+
+            # 前回から新規・変更のあったスレッドのみを評価する
+            has_previous = len(state.catalog) > 0
+            changed_threads = state.catalog.diff(threads)
+            stats = state.catalog.last_stats
+            if has_previous:
+                new_threads = stats.new
+            for key in ("new", "changed", "unchanged", "removed"):
+                CATALOG_THREADS.inc(getattr(stats, key), board.name, key)
+            logger.debug(
+                "%s: カタログ差分: 新規%s件, 変更%s件, 変化なし%s件, 消滅%s件",
+                board.name,
+                stats.new,
+                stats.changed,
+                stats.unchanged,
+                stats.removed,
+            )
+            if state.full_scan_pending:
+                target_threads = threads
+                state.full_scan_pending = False
+            else:
+                target_threads = changed_threads
+
+            # マッチ結果を集め、重複チェックはDBスレッドへの1回の問い合わせで行う
+            threads_by_key: dict[str, Thread] = {}
+            candidates: list[tuple[str, str, int]] = []
+            match_started = time.perf_counter()
+            for thread in target_threads:
+                # 通知履歴のキーは板ごとに区別する（既定の板はスレッドIDのみ）
+                thread_key = thread.key
+                matches = matcher.match(thread.search_text)
+                for keyword, matched_channel_ids in matches.items():
+                    for channel_id in matched_channel_ids:
+                        # ミュート中のチャンネルをスキップ
+                        if channel_id in muted:
+                            continue
+                        threads_by_key[thread_key] = thread
+                        candidates.append((thread_key, keyword, channel_id))
+            MATCH_SECONDS.observe(time.perf_counter() - match_started, board.name)
+            MATCHED_TOTAL.inc(len(candidates), board.name)
 
-                    channel = self.get_channel(channel_id)
+            # スレッドごとに未通知のキーワードをチャンネル単位でまとめる
+            pending: dict[str, dict[int, list[str]]] = {}
+            for thread_key, keyword, channel_id in await self.db.filter_unnotified(
+                candidates
+            ):
+                if (thread_key, keyword, channel_id) in self.in_flight:
+                    continue
+                pending.setdefault(thread_key, {}).setdefault(channel_id, []).append(
+                    keyword
+                )
+
+            # チャンネルはティック内で1回だけ解決する
+            channels = {
+                channel_id: self.resolve_channel(channel_id)
+                for channel_keywords in pending.values()
+                for channel_id in channel_keywords
+            }
+            for thread_key, channel_keywords in pending.items():
+                thread = threads_by_key[thread_key]
+                for channel_id, keywords in channel_keywords.items():
+                    channel = channels[channel_id]
                     if not channel:
                         continue
 
-                    for thread in threads:
-                        thread_id = thread["id"]
+                    keywords.sort()
+                    logger.info(
+                        "%s: キーワード %s がマッチ: %s",
+                        board.name,
+                        keywords,
+                        thread.title,
+                    )
+                    if not isinstance(
+                        channel, discord.TextChannel | discord.PartialMessageable
+                    ):
+                        notified.extend(
+                            (thread_key, keyword, channel_id) for keyword in keywords
+                        )
+                        continue
+
+                    # まとめて送る場合は1スレッド1埋め込みにキーワードを並べる
+                    if NOTIFY_COALESCE:
+                        groups = [tuple(keywords)]
+                    else:
+                        groups = [(keyword,) for keyword in keywords]
 
-                        if self.db.is_thread_notified(thread_id, keyword, channel_id):
+                    for group in groups:
+                        notification = Notification(channel, thread, group)
+                        if not self.dispatcher.submit(notification):
+                            # 破棄された通知は次回の全件評価で拾い直す
+                            state.full_scan_pending = True
                             continue
+                        logger.debug(
+                            "通知を送信待ちに追加: チャンネル%s -> %s",
+                            channel_id,
+                            thread_key,
+                        )
+                        QUEUED_TOTAL.inc(1, board.name)
+                        self.in_flight.update(notification.keys)
+
+            # 新規・変更のあったスレッドだけを検索対象に追加する
+            # （シャードでは全てのワーカーに同じカタログが届くため1つだけが記録する）
+            if self.primary:
+                try:
+                    ingested = await self.db.ingest_threads(changed_threads)
+                    logger.debug(
+                        "%s: %s件のスレッドを検索対象に記録", board.name, ingested
+                    )
+                except Exception as e:
+                    logger.error("スレッドの記録でエラーが発生: %s", e, exc_info=True)
 
-                        if monitor.check_keyword_match(thread, keyword):
-                            logger.info(
-                                f"キーワード '{keyword}' がマッチ: {thread.get('title', 'N/A')}"
-                            )
-                            if isinstance(channel, discord.TextChannel):
-                                await self.send_notification(channel, thread, keyword)
-                                logger.debug(
-                                    f"通知送信完了: チャンネル{channel_id} -> {thread_id}"
-                                )
-                            self.db.mark_thread_notified(thread_id, keyword, channel_id)
+            # 統計の集計（送信レイテンシの並べ替え等）は DEBUG のときだけ行う
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("重複チェック統計: %s", self.db.dedup_stats())
+                logger.debug("通知送信統計: %s", self.dispatcher.stats())
+                logger.debug("監視間隔統計: %s", self.scheduler.stats()[board.name])
+            return new_threads
 
         except Exception as e:
-            logger.error(f"監視タスクでエラーが発生: {e}", exc_info=True)
+            logger.error(
+                "%s: 監視タスクでエラーが発生: %s", board.name, e, exc_info=True
+            )
+            # 評価しきれなかったスレッドを取りこぼさないよう次回は全件を評価
+            state.catalog.reset()
+            monitor.clear_validators()
+            return None
         finally:
-            logger.debug("監視タスクを終了")
+            if notified:
+                try:
+                    await self.db.mark_threads_notified(notified)
+                    logger.debug("%s件の通知履歴を記録", len(notified))
+                except Exception as e:
+                    logger.error("通知履歴の記録でエラーが発生: %s", e, exc_info=True)
+            TICK_SECONDS.observe(time.perf_counter() - started, board.name)
+            logger.debug("%s: 監視タスクを終了", board.name)
 
-    async def send_notification(
-        self, channel: discord.TextChannel, thread: dict, keyword: str
-    ) -> None:
-        """通知埋め込みをDiscordチャンネルに送信"""
-        thread_id = thread["id"]
-        title = thread["title"]
-        thumb_url = thread["thumb_url"]
+    def resolve_channel(self, channel_id: int) -> Any:
+        """通知先のチャンネルを取得
+
+        シャードのワーカーは担当するチャンネルが別のシャードのギルドにあると
+        キャッシュに持たないため、IDだけで送信できる PartialMessageable を使う。
+        """
+        channel = self.get_channel(channel_id)
+        if channel is None and self.shard:
+            return self.get_partial_messageable(channel_id)
+        return channel
+
+    @staticmethod
+    def build_embed(thread: Thread, keywords: tuple[str, ...]) -> discord.Embed:
+        """スレッド1件分の通知埋め込みを作成
+
+        キーワードが多い場合などはタイトル・説明を Discord の上限で切り詰める。
+        """
+        board = BOARDS[thread.board]
+        thumb_url = thread.thumb_url
         timestamp = datetime.now(UTC)
 
+        title = "キーワード" + "".join(f"『{keyword}』" for keyword in keywords)
+        description = f"{board.thread_url(thread.id)}\n{thread.title}"
         embed = discord.Embed(
-            title=f"キーワード『{keyword}』",
-            description=f"https://may.2chan.net/b/res/{thread_id}.htm\n{title}",
+            title=truncate(title, MAX_EMBED_TITLE_LENGTH),
+            description=truncate(description, MAX_EMBED_DESCRIPTION_LENGTH),
             timestamp=timestamp,
             color=0x00FF00,
         )
@@ -137,31 +499,105 @@ class FutabaBot(commands.Bot):
         if thumb_url:
             embed.set_image(url=thumb_url)
 
-        embed.add_field(
-            name="ふたばフォレスト",
-            value=f"http://futabaforest.net/b/res/{thread_id}.htm",
-            inline=False,
-        )
+        # 保存先サイトへのリンクは板ごとの設定に従う
+        for label, url in board.archive_urls(thread.id):
+            embed.add_field(name=label, value=url, inline=False)
 
-        ftbucket_url = (
-            f"https://may.ftbucket.info/may/cont/"
-            f"may.2chan.net_b_res_{thread_id}/index.htm"
-        )
-        embed.add_field(
-            name="FTBucket",
-            value=ftbucket_url,
-            inline=False,
-        )
+        return embed
 
+    async def send_notifications(
+        self, channel: discord.abc.Messageable, notifications: list[Notification]
+    ) -> None:
+        """通知埋め込みをDiscordチャンネルに送信
+
+        Discordの上限（1メッセージ10埋め込み・合計6000文字）に収まるよう
+        必要に応じて複数メッセージに分けて送り、送信できたメッセージの通知を
+        delivered にする。送信に失敗した場合は例外を送出する
+        （再送はディスパッチャーが行う）。
+        """
+        message: list[tuple[Notification, discord.Embed]] = []
+        size = 0
+        for notification in notifications:
+            embed = self.build_embed(notification.thread, notification.keywords)
+            if message and (
+                len(message) >= MAX_EMBEDS_PER_MESSAGE
+                or size + len(embed) > MAX_EMBED_CHARS_PER_MESSAGE
+            ):
+                await self._send_message(channel, message)
+                message, size = [], 0
+            message.append((notification, embed))
+            size += len(embed)
+        if message:
+            await self._send_message(channel, message)
+
+    @staticmethod
+    async def _send_message(
+        channel: discord.abc.Messageable,
+        message: list[tuple[Notification, discord.Embed]],
+    ) -> None:
+        """1メッセージ分の埋め込みを送信し、その通知を送信済みにする"""
+        await channel.send(embeds=[embed for _, embed in message])
+        for notification, _ in message:
+            notification.delivered = True
+
+    async def _send_dispatched(self, notifications: list[Notification]) -> None:
+        """ディスパッチャーから呼び出される送信処理
+
+        送信に成功した通知だけを通知履歴に記録する。複数メッセージに分けて
+        送る途中で失敗した場合も、送信できたメッセージの分は記録する。
+        """
+        try:
+            await self.send_notifications(notifications[0].channel, notifications)
+        except Exception:
+            delivered = [
+                notification for notification in notifications if notification.delivered
+            ]
+            if delivered:
+                await self._record_notified(delivered)
+            raise
+        for notification in notifications:
+            notification.delivered = True
+        await self._record_notified(notifications)
+
+    async def _record_notified(self, notifications: list[Notification]) -> None:
+        """通知を通知履歴に記録して送信中から外す"""
+        keys = [key for notification in notifications for key in notification.keys]
         try:
-            await channel.send(embed=embed)
+            await self.db.mark_threads_notified(keys)
+            logger.debug("%s件の通知履歴を記録", len(keys))
         except Exception as e:
-            print(f"Failed to send notification: {e}")
+            # 送信済みのため例外は送出しない（再送すると二重に通知される）
+            logger.error("通知履歴の記録でエラーが発生: %s", e, exc_info=True)
+        finally:
+            self.in_flight.difference_update(keys)
+
+    async def _notification_failed(
+        self, notifications: list[Notification], error: Exception
+    ) -> None:
+        """送信できなかった通知を処理
+
+        権限不足・チャンネル削除など再送しても成功しないエラーの場合は、
+        毎回送り直さないよう通知済みとして記録する。一時的なエラーで再送を
+        使い切った場合は送信中から外し、次回の全件評価で拾い直す。
+        """
+        if NotificationDispatcher.is_permanent(error):
+            await self._record_notified(notifications)
+            return
+        for notification in notifications:
+            self.in_flight.difference_update(notification.keys)
+            state = self.board_states.get(notification.thread.board)
+            if state is not None:
+                state.full_scan_pending = True
 
 
-def create_bot() -> FutabaBot:
+def create_bot(
+    metrics_port: int = 0,
+    shard: Shard | None = None,
+    connection: Connection | None = None,
+) -> FutabaBot:
     """ボットインスタンスを作成し設定"""
-    bot = FutabaBot()
+    bot = FutabaBot(metrics_port, shard, connection)
+    monitored_boards = [board.name for board in MONITORED_BOARDS]
 
     @bot.tree.command(name="futaba-search", description="Futaba monitoring commands")
     async def futaba_search(
@@ -169,15 +605,33 @@ def create_bot() -> FutabaBot:
         action: str,
         keyword: str | None = None,
         interval: str | None = None,
+        board: str | None = None,
+        page: int | None = None,
     ) -> None:
         """ふたば検索スラッシュコマンドを処理"""
         logger.debug(
-            f"スラッシュコマンド受信: action={action}, keyword={keyword}, interval={interval}, channel_id={interaction.channel.id if interaction.channel else None}, user={interaction.user}"
+            "スラッシュコマンド受信: action=%s, keyword=%s, interval=%s, board=%s, page=%s, channel_id=%s, user=%s",
+            action,
+            keyword,
+            interval,
+            board,
+            page,
+            interaction.channel.id if interaction.channel else None,
+            interaction.user,
         )
         await interaction.response.defer()
 
+        # 板の指定がなければ既定の板（may）を対象にする
+        board_name = board or DEFAULT_BOARD
+        if board_name not in monitored_boards:
+            logger.debug("監視していない板の指定でエラー返却: board=%s", board)
+            await interaction.followup.send(
+                f"監視している板: {', '.join(monitored_boards)}", ephemeral=True
+            )
+            return
+
         if action == "subscribe":
-            logger.debug(f"subscribeアクションを処理中: keyword={keyword}")
+            logger.debug("subscribeアクションを処理中: keyword=%s", keyword)
             if not keyword:
                 logger.debug("subscribe: キーワード未指定でエラー返却")
                 await interaction.followup.send(
@@ -185,6 +639,19 @@ def create_bot() -> FutabaBot:
                 )
                 return
 
+            # 部分一致のキーワードは表記ゆれ（全角・半角、カタカナ・ひらがな等）を
+            # そろえた形で登録し、正規表現・式は解析できることを確かめる
+            try:
+                keyword = normalize_keyword(keyword)
+            except ValueError as e:
+                logger.debug(
+                    "subscribe: キーワード解析失敗 - keyword=%s: %s", keyword, e
+                )
+                await interaction.followup.send(
+                    f"キーワードを解釈できません: {e}", ephemeral=True
+                )
+                return
+
             if interaction.channel is None:
                 logger.debug("subscribe: チャンネル情報取得失敗")
                 await interaction.followup.send(
@@ -192,26 +659,34 @@ def create_bot() -> FutabaBot:
                 )
                 return
             logger.debug(
-                f"subscribe: データベースに購読追加試行 - channel_id={interaction.channel.id}, keyword={keyword}"
+                "subscribe: データベースに購読追加試行 - channel_id=%s, keyword=%s",
+                interaction.channel.id,
+                keyword,
+            )
+            success = await bot.db.add_subscription(
+                interaction.channel.id, keyword, board_name
             )
-            success = bot.db.add_subscription(interaction.channel.id, keyword)
             if success:
                 logger.debug(
-                    f"subscribe: 購読追加成功 - channel_id={interaction.channel.id}, keyword={keyword}"
+                    "subscribe: 購読追加成功 - channel_id=%s, keyword=%s",
+                    interaction.channel.id,
+                    keyword,
                 )
                 await interaction.followup.send(
-                    f"キーワード '{keyword}' の通知を登録しました。"
+                    f"キーワード '{keyword}' の通知を登録しました。（{board_name}）"
                 )
             else:
                 logger.debug(
-                    f"subscribe: 購読追加失敗(重複) - channel_id={interaction.channel.id}, keyword={keyword}"
+                    "subscribe: 購読追加失敗(重複) - channel_id=%s, keyword=%s",
+                    interaction.channel.id,
+                    keyword,
                 )
                 await interaction.followup.send(
                     f"キーワード '{keyword}' は既に登録済みです。", ephemeral=True
                 )
 
         elif action == "unsubscribe":
-            logger.debug(f"unsubscribeアクションを処理中: keyword={keyword}")
+            logger.debug("unsubscribeアクションを処理中: keyword=%s", keyword)
             if not keyword:
                 logger.debug("unsubscribe: キーワード未指定でエラー返却")
                 await interaction.followup.send(
@@ -226,19 +701,35 @@ def create_bot() -> FutabaBot:
                 )
                 return
             logger.debug(
-                f"unsubscribe: データベースから購読削除試行 - channel_id={interaction.channel.id}, keyword={keyword}"
+                "unsubscribe: データベースから購読削除試行 - channel_id=%s, keyword=%s",
+                interaction.channel.id,
+                keyword,
+            )
+            # 登録時と同じ形にそろえて削除し、見つからなければ入力どおりの
+            # キーワード（正規化を導入する前の購読）を削除する
+            try:
+                normalized = normalize_keyword(keyword)
+            except ValueError:
+                normalized = keyword
+            success = await bot.db.remove_subscription(
+                interaction.channel.id, normalized, board_name
+            ) or await bot.db.remove_subscription(
+                interaction.channel.id, keyword, board_name
             )
-            success = bot.db.remove_subscription(interaction.channel.id, keyword)
             if success:
                 logger.debug(
-                    f"unsubscribe: 購読削除成功 - channel_id={interaction.channel.id}, keyword={keyword}"
+                    "unsubscribe: 購読削除成功 - channel_id=%s, keyword=%s",
+                    interaction.channel.id,
+                    keyword,
                 )
                 await interaction.followup.send(
-                    f"キーワード '{keyword}' の通知を解除しました。"
+                    f"キーワード '{keyword}' の通知を解除しました。（{board_name}）"
                 )
             else:
                 logger.debug(
-                    f"unsubscribe: 購読削除失敗(登録なし) - channel_id={interaction.channel.id}, keyword={keyword}"
+                    "unsubscribe: 購読削除失敗(登録なし) - channel_id=%s, keyword=%s",
+                    interaction.channel.id,
+                    keyword,
                 )
                 await interaction.followup.send(
                     f"キーワード '{keyword}' は登録されていません。", ephemeral=True
@@ -253,31 +744,48 @@ def create_bot() -> FutabaBot:
                 )
                 return
             logger.debug(
-                f"list: チャンネルの購読情報を取得中 - channel_id={interaction.channel.id}"
+                "list: チャンネルの購読情報を取得中 - channel_id=%s",
+                interaction.channel.id,
             )
-            keywords = bot.db.get_subscriptions(interaction.channel.id)
-            mute_status = bot.db.get_mute_status(interaction.channel.id)
+            # 板を指定しなければ監視している全ての板の購読を表示
+            list_boards = [board] if board else list(monitored_boards)
+            keywords_by_board = {
+                name: await bot.db.get_subscriptions(interaction.channel.id, name)
+                for name in list_boards
+            }
+            keywords_by_board = {
+                name: keywords
+                for name, keywords in keywords_by_board.items()
+                if keywords
+            }
+            mute_status = await bot.db.get_mute_status(interaction.channel.id)
             logger.debug(
-                f"list: 取得結果 - keywords={len(keywords)}件, muted={bool(mute_status)}"
+                "list: 取得結果 - keywords=%s件, muted=%s",
+                sum(map(len, keywords_by_board.values())),
+                bool(mute_status),
             )
 
             response = ""
-            if keywords:
-                keyword_list = "\n".join([f"• {kw}" for kw in keywords])
-                response = f"このチャンネルの登録キーワード:\n{keyword_list}\n"
-                logger.debug(f"list: キーワードリストを表示 - {len(keywords)}件")
+            if keywords_by_board:
+                response = "このチャンネルの登録キーワード:\n"
+                for name, keywords in keywords_by_board.items():
+                    keyword_list = "\n".join([f"• {kw}" for kw in keywords])
+                    response += f"[{name}]\n{keyword_list}\n"
+                logger.debug(
+                    "list: キーワードリストを表示 - %s個の板", len(keywords_by_board)
+                )
             else:
                 response = "このチャンネルにはキーワードが登録されていません。\n"
                 logger.debug("list: キーワードなしで空リストを表示")
 
             if mute_status:
                 response += f"\n🔇 通知は {format_datetime(mute_status)} まで無効になっています。"
-                logger.debug(f"list: ミュート状態を表示 - until={mute_status}")
+                logger.debug("list: ミュート状態を表示 - until=%s", mute_status)
 
             await interaction.followup.send(response)
 
         elif action == "mute":
-            logger.debug(f"muteアクションを処理中: interval={interval}")
+            logger.debug("muteアクションを処理中: interval=%s", interval)
             if not interval:
                 logger.debug("mute: 期間未指定でエラー返却")
                 await interaction.followup.send(
@@ -285,10 +793,10 @@ def create_bot() -> FutabaBot:
                 )
                 return
 
-            logger.debug(f"mute: 期間文字列を解析中 - interval={interval}")
+            logger.debug("mute: 期間文字列を解析中 - interval=%s", interval)
             mute_until = get_mute_until_datetime(interval)
             if not mute_until:
-                logger.debug(f"mute: 無効な期間形式でエラー返却 - interval={interval}")
+                logger.debug("mute: 無効な期間形式でエラー返却 - interval=%s", interval)
                 await interaction.followup.send(
                     "無効な期間形式です。例: 30m, 1h, 2d", ephemeral=True
                 )
@@ -301,11 +809,13 @@ def create_bot() -> FutabaBot:
                 )
                 return
             logger.debug(
-                f"mute: チャンネルをミュート設定中 - channel_id={interaction.channel.id}, until={mute_until}"
+                "mute: チャンネルをミュート設定中 - channel_id=%s, until=%s",
+                interaction.channel.id,
+                mute_until,
             )
-            bot.db.mute_channel(interaction.channel.id, mute_until)
+            await bot.db.mute_channel(interaction.channel.id, mute_until)
             logger.debug(
-                f"mute: ミュート設定完了 - channel_id={interaction.channel.id}"
+                "mute: ミュート設定完了 - channel_id=%s", interaction.channel.id
             )
             await interaction.followup.send(
                 f"🔇 通知を {format_datetime(mute_until)} まで無効にしました。"
@@ -320,41 +830,109 @@ def create_bot() -> FutabaBot:
                 )
                 return
             logger.debug(
-                f"unmute: チャンネルのミュート解除試行 - channel_id={interaction.channel.id}"
+                "unmute: チャンネルのミュート解除試行 - channel_id=%s",
+                interaction.channel.id,
             )
-            success = bot.db.unmute_channel(interaction.channel.id)
+            success = await bot.db.unmute_channel(interaction.channel.id)
             if success:
                 logger.debug(
-                    f"unmute: ミュート解除成功 - channel_id={interaction.channel.id}"
+                    "unmute: ミュート解除成功 - channel_id=%s", interaction.channel.id
                 )
                 await interaction.followup.send("🔔 通知を再開しました。")
             else:
                 logger.debug(
-                    f"unmute: ミュート解除失敗(ミュートされていない) - channel_id={interaction.channel.id}"
+                    "unmute: ミュート解除失敗(ミュートされていない) - channel_id=%s",
+                    interaction.channel.id,
                 )
                 await interaction.followup.send(
                     "このチャンネルはミュートされていません。", ephemeral=True
                 )
 
+        elif action == "search":
+            logger.debug(
+                "searchアクションを処理中: keyword=%s, board=%s, interval=%s, page=%s",
+                keyword,
+                board,
+                interval,
+                page,
+            )
+            if not keyword:
+                logger.debug("search: キーワード未指定でエラー返却")
+                await interaction.followup.send(
+                    "キーワードを指定してください。", ephemeral=True
+                )
+                return
+
+            # 期間を指定した場合はその期間内に取得したスレッドに絞る
+            since = None
+            if interval:
+                period = parse_time_interval(interval)
+                if not period:
+                    logger.debug(
+                        "search: 無効な期間形式でエラー返却 - interval=%s", interval
+                    )
+                    await interaction.followup.send(
+                        "無効な期間形式です。例: 30m, 1h, 2d", ephemeral=True
+                    )
+                    return
+                since = datetime.now() - period
+
+            # 板を指定しなければ全ての板から検索
+            result = await bot.db.search_threads(
+                keyword, board=board, since=since, page=page or 1
+            )
+            logger.debug(
+                "search: 検索結果 - %s件, page=%s, has_next=%s",
+                len(result.hits),
+                result.page,
+                result.has_next,
+            )
+            if not result.hits:
+                await interaction.followup.send(
+                    f"キーワード '{keyword}' を含むスレッドは見つかりませんでした。"
+                )
+                return
+
+            lines = [f"キーワード '{keyword}' の検索結果（{result.page}ページ目）:"]
+            for thread, first_seen in result.hits:
+                title = thread.title or thread.subject
+                if len(title) > SEARCH_TITLE_LENGTH:
+                    title = title[:SEARCH_TITLE_LENGTH] + "…"
+                lines.append(
+                    f"• [{thread.board}] {format_datetime(first_seen)} {title}\n"
+                    f"  {BOARDS[thread.board].thread_url(thread.id)}"
+                )
+            if result.has_next:
+                lines.append(
+                    f"次のページ: `page:{result.page + 1}` を指定してください。"
+                )
+            await interaction.followup.send("\n".join(lines))
+
         elif action == "help":
             logger.debug("helpアクションを処理中")
-            help_text = """
+            help_text = f"""
 **🔍 ふたば検索ボット - ヘルプ**
 
 ふたば☆ちゃんねるで指定したキーワードを含むスレッドが立った時に通知するボットです。
 
 **📝 利用可能なコマンド:**
 
-• `/futaba-search subscribe <キーワード>`
+• `/futaba-search subscribe <キーワード> [板]`
   - 指定したキーワードの通知を登録
+  - 全角・半角、カタカナ・ひらがな、大文字・小文字の違いは区別しません
+  - `re:` で始めると正規表現として扱います（例: `re:ねこ|いぬ`）
+  - `expr:` で始めると AND / OR / NOT と括弧で条件を組み合わせられます
+    （例: `expr:猫 AND (画像 OR 動画) AND NOT 実況`、空白を含む語は "..." で囲む）
+  - `re:` / `expr:` で始まる語そのものは先頭に `\\` を付けて登録します（例: `\\re:ゼロ`）
+  - 板を省略すると {DEFAULT_BOARD} が対象になります
   - 例: `/futaba-search subscribe 猫`
 
-• `/futaba-search unsubscribe <キーワード>`
+• `/futaba-search unsubscribe <キーワード> [板]`
   - 指定したキーワードの通知を解除
   - 例: `/futaba-search unsubscribe 猫`
 
-• `/futaba-search list`
-  - このチャンネルに登録されているキーワード一覧を表示
+• `/futaba-search list [板]`
+  - このチャンネルに登録されているキーワード一覧を板ごとに表示
   - ミュート状態も表示されます
 
 • `/futaba-search mute <期間>`
@@ -365,38 +943,62 @@ def create_bot() -> FutabaBot:
 • `/futaba-search unmute`
   - このチャンネルのミュートを解除
 
+• `/futaba-search search <キーワード> [期間] [板] [ページ]`
+  - 過去{OBSERVED_RETENTION_DAYS}日間に取得したスレッドからキーワードを含むものを新しい順に検索
+  - 期間を指定するとその期間内に見つかったスレッドに絞り込みます
+  - 例: `/futaba-search search 猫 interval:3d`
+
 • `/futaba-search help`
   - このヘルプを表示
 
 **⚡ 監視機能:**
-- 5分間隔でふたば☆ちゃんねるをチェック
+- 監視中の板（{", ".join(monitored_boards)}）を板ごとの間隔でチェック
+  （新しいスレッドが多い時間帯は間隔を短くするよう設定できます）
 - 登録したキーワードが含まれるスレッドを自動検出
 - 同じスレッドへの重複通知を防止
-- 古い通知履歴は1週間で自動削除
+- 古い通知履歴は{NOTIFICATION_RETENTION_DAYS}日で自動削除
 
 **🔗 通知に含まれる情報:**
 - スレッドのタイトルと画像
 - ふたば☆ちゃんねる本家へのリンク
-- ふたばフォレストへのリンク
-- FTBucketへのリンク
+- 保存先サイトへのリンク（may: ふたばフォレスト・FTBucket）
 
 何かご質問がございましたら、お気軽にお声かけください！
 """
             await interaction.followup.send(help_text)
 
         else:
-            logger.debug(f"不明なアクションでエラー返却: action={action}")
+            logger.debug("不明なアクションでエラー返却: action=%s", action)
             await interaction.followup.send(
-                "有効なアクション: subscribe, unsubscribe, list, mute, unmute, help",
+                "有効なアクション: subscribe, unsubscribe, list, search, mute, unmute, help",
                 ephemeral=True,
             )
 
+    @futaba_search.autocomplete("board")
+    async def board_autocomplete(
+        _interaction: discord.Interaction, current: str
+    ) -> list[discord.app_commands.Choice[str]]:
+        """板パラメータの自動補完を提供"""
+        return [
+            discord.app_commands.Choice(name=name, value=name)
+            for name in monitored_boards
+            if current.lower() in name.lower()
+        ]
+
     @futaba_search.autocomplete("action")
     async def action_autocomplete(
         _interaction: discord.Interaction, current: str
     ) -> list[discord.app_commands.Choice[str]]:
         """アクションパラメータの自動補完を提供"""
-        actions = ["subscribe", "unsubscribe", "list", "mute", "unmute", "help"]
+        actions = [
+            "subscribe",
+            "unsubscribe",
+            "list",
+            "search",
+            "mute",
+            "unmute",
+            "help",
+        ]
         return [
             discord.app_commands.Choice(name=action, value=action)
             for action in actions
@@ -406,11 +1008,54 @@ def create_bot() -> FutabaBot:
     return bot
 
 
-def run_bot() -> None:
-    """Discordボットを実行"""
+def run_bot(
+    metrics_port: int = 0, shards: int = 1, log_options: dict[str, Any] | None = None
+) -> None:
+    """Discordボットを実行（metrics_port を指定すると計測値を公開する）
+
+    shards が2以上の場合はカタログを取得するコーディネーターと、
+    購読をチャンネルIDで分担するワーカープロセスに分けて実行する。
+    log_options はワーカーでのログ設定（setup_logging の引数）。
+    """
     if not DISCORD_TOKEN:
         print("DISCORD_TOKEN environment variable is required")
         exit(1)
 
-    bot = create_bot()
-    bot.run(DISCORD_TOKEN)
+    if shards > 1:
+        # マイグレーションはワーカーの起動前に1回だけ行う
+        FutabaDatabase(use_notified_index=False).engine.dispose()
+        code = run_shards(
+            shards,
+            run_shard_worker,
+            (metrics_port, log_options or {}),
+            boards=MONITORED_BOARDS,
+            metrics_port=metrics_port,
+        )
+        if code:
+            sys.exit(code)
+        return
+
+    bot = create_bot(metrics_port)
+    # discord.py 独自のハンドラーは付けず、setup_logging の設定で出力する
+    bot.run(DISCORD_TOKEN, log_handler=None)
+
+
+def run_shard_worker(
+    shard: Shard,
+    connection: Connection,
+    metrics_port: int = 0,
+    log_options: dict[str, Any] | None = None,
+) -> None:
+    """ワーカープロセスでボットを実行（コーディネーターからカタログを受け取る）
+
+    計測値はコーディネーターが metrics_port、ワーカーが metrics_port + 1 + 番号で公開する。
+    """
+    log_options = dict(log_options or {})
+    log_options["log_file"] = shard_log_file(log_options.get("log_file"), shard)
+    setup_logging(**log_options)
+    logger.info("ワーカー %s/%s を開始", shard.index, shard.count)
+
+    bot = create_bot(
+        metrics_port + 1 + shard.index if metrics_port else 0, shard, connection
+    )
+    bot.run(DISCORD_TOKEN or "", log_handler=None)
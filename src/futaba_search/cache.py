@@ -0,0 +1,223 @@
+"""データベース内容のインメモリキャッシュ"""
+
+import heapq
+import threading
+from collections import deque
+from collections.abc import Iterable
+from datetime import datetime
+
+from .boards import DEFAULT_BOARD
+
+NotifiedKey = tuple[str, str, int]
+
+
+class NotifiedIndex:
+    """通知済み (thread_id, keyword, channel_id) のインメモリ索引
+
+    起動時に notified_threads テーブルから読み込み、書き込みのたびに同期する。
+    ロード済みであれば重複チェックはDBを参照せずに判定できる。
+    """
+
+    def __init__(self) -> None:
+        self._keys: set[NotifiedKey] = set()
+        # 期限切れ処理のため通知日時の古い順にキーを保持
+        self._timeline: deque[tuple[datetime, NotifiedKey]] = deque()
+        self.loaded = False
+
+        # 計測用カウンタ（索引で判定した照会数 / DBに問い合わせた照会数）
+        self.hits = 0
+        self.db_fallbacks = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def load(self, rows: Iterable[tuple[str, str, int, datetime]]) -> None:
+        """通知日時の昇順に並んだレコードから索引を構築"""
+        self._keys.clear()
+        self._timeline.clear()
+        for thread_id, keyword, channel_id, notified_at in rows:
+            self.add((thread_id, keyword, channel_id), notified_at)
+        self.loaded = True
+
+    def add(self, key: NotifiedKey, notified_at: datetime) -> None:
+        """通知済みキーを追加"""
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        self._timeline.append((notified_at, key))
+
+    def expire(self, cutoff: datetime) -> int:
+        """cutoff以前に通知されたキーを削除し、削除件数を返す"""
+        expired = 0
+        while self._timeline and self._timeline[0][0] <= cutoff:
+            _, key = self._timeline.popleft()
+            self._keys.discard(key)
+            expired += 1
+        return expired
+
+    def stats(self) -> dict[str, int]:
+        """計測カウンタのスナップショットを取得"""
+        return {
+            "entries": len(self._keys),
+            "hits": self.hits,
+            "db_fallbacks": self.db_fallbacks,
+        }
+
+
+class MuteTable:
+    """ミュート中のチャンネルのインメモリ表
+
+    チャンネルIDからミュート期限を引く辞書と、期限の早い順に並んだヒープを持つ。
+    ミュート状態はO(1)で判定でき、期限切れはヒープの先頭から取り出すだけで分かる。
+    ミュートの延長・解除で古くなったヒープの要素は取り出した時点で読み捨てる。
+    """
+
+    def __init__(self) -> None:
+        self._until: dict[int, datetime] = {}
+        self._heap: list[tuple[datetime, int]] = []
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def load(self, rows: Iterable[tuple[int, datetime]]) -> None:
+        """(channel_id, muted_until) のレコードから表を構築"""
+        self._until = dict(rows)
+        self._heap = [(until, channel_id) for channel_id, until in self._until.items()]
+        heapq.heapify(self._heap)
+        self.loaded = True
+
+    def set(self, channel_id: int, muted_until: datetime) -> None:
+        """チャンネルのミュート期限を設定"""
+        self._until[channel_id] = muted_until
+        heapq.heappush(self._heap, (muted_until, channel_id))
+
+    def remove(self, channel_id: int) -> bool:
+        """チャンネルのミュートを解除（ミュートされていなければ False）"""
+        return self._until.pop(channel_id, None) is not None
+
+    def get(self, channel_id: int, now: datetime | None = None) -> datetime | None:
+        """ミュート中であればミュート期限を返す"""
+        until = self._until.get(channel_id)
+        if until is None or until <= (now or datetime.now()):
+            return None
+        return until
+
+    def is_muted(self, channel_id: int, now: datetime | None = None) -> bool:
+        """チャンネルが現在ミュート中か"""
+        return self.get(channel_id, now) is not None
+
+    def expire(self, now: datetime) -> list[int]:
+        """期限切れのミュートを取り除き、該当するチャンネルIDを返す"""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            until, channel_id = heapq.heappop(self._heap)
+            # 延長・解除済みの古い要素は読み捨てる
+            if self._until.get(channel_id) == until:
+                del self._until[channel_id]
+                expired.append(channel_id)
+        return expired
+
+
+class SubscriptionRegistry:
+    """キーワード購読のインメモリ登録簿
+
+    板ごとに、キーワード → チャンネル、チャンネル → キーワードの両方向の対応を持ち、
+    購読の追加・削除のたびに version を進める。マッチャーなどの派生データは
+    version が変わったときだけ作り直せばよい。
+
+    更新はDBスレッド、参照はイベントループから行われるためロックで保護する。
+    """
+
+    def __init__(self) -> None:
+        self._by_keyword: dict[tuple[str, str], set[int]] = {}
+        # 登録順を保つため値は dict を順序付き集合として使う
+        self._by_channel: dict[int, dict[tuple[str, str], None]] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(keywords) for keywords in self._by_channel.values())
+
+    def load(self, rows: Iterable[tuple[int, str, str]]) -> None:
+        """登録順に並んだ (channel_id, keyword, board) から登録簿を構築"""
+        with self._lock:
+            self._by_keyword.clear()
+            self._by_channel.clear()
+            for channel_id, keyword, board in rows:
+                self._add(channel_id, (board, keyword))
+            self.version += 1
+            self.loaded = True
+
+    def add(self, channel_id: int, keyword: str, board: str = DEFAULT_BOARD) -> bool:
+        """購読を追加（既に登録済みなら False）"""
+        with self._lock:
+            if not self._add(channel_id, (board, keyword)):
+                return False
+            self.version += 1
+            return True
+
+    def remove(self, channel_id: int, keyword: str, board: str = DEFAULT_BOARD) -> bool:
+        """購読を削除（登録されていなければ False）"""
+        entry = (board, keyword)
+        with self._lock:
+            entries = self._by_channel.get(channel_id)
+            if entries is None or entry not in entries:
+                return False
+            del entries[entry]
+            if not entries:
+                del self._by_channel[channel_id]
+            channel_ids = self._by_keyword[entry]
+            channel_ids.discard(channel_id)
+            if not channel_ids:
+                del self._by_keyword[entry]
+            self.version += 1
+            return True
+
+    def _add(self, channel_id: int, entry: tuple[str, str]) -> bool:
+        entries = self._by_channel.setdefault(channel_id, {})
+        if entry in entries:
+            return False
+        entries[entry] = None
+        self._by_keyword.setdefault(entry, set()).add(channel_id)
+        return True
+
+    def keywords(self, channel_id: int, board: str = DEFAULT_BOARD) -> list[str]:
+        """チャンネルの購読キーワード（登録順）"""
+        with self._lock:
+            return [
+                keyword
+                for entry_board, keyword in self._by_channel.get(channel_id, ())
+                if entry_board == board
+            ]
+
+    def channels(self, keyword: str, board: str = DEFAULT_BOARD) -> set[int]:
+        """キーワードを購読しているチャンネル"""
+        with self._lock:
+            return set(self._by_keyword.get((board, keyword), ()))
+
+    def channel_ids(self, board: str | None = None) -> set[int]:
+        """購読のあるチャンネル（board 指定時はその板に購読のあるチャンネル）"""
+        with self._lock:
+            if board is None:
+                return set(self._by_channel)
+            return {
+                channel_id
+                for channel_id, entries in self._by_channel.items()
+                if any(entry_board == board for entry_board, _ in entries)
+            }
+
+    def snapshot(self, board: str = DEFAULT_BOARD) -> tuple[int, list[tuple[int, str]]]:
+        """現在の version と板の全購読の (channel_id, keyword) を一貫した状態で取得"""
+        with self._lock:
+            return self.version, [
+                (channel_id, keyword)
+                for channel_id, entries in self._by_channel.items()
+                for entry_board, keyword in entries
+                if entry_board == board
+            ]
@@ -0,0 +1,419 @@
+"""カタログを1回だけ取得して複数のボットに配るサービス
+
+`futaba-search catalog-service --socket PATH` で起動すると、板ごとのカタログを
+取得して解析し、Unix ソケットで接続してきたボットに配る。ボットは
+CATALOG_SOCKET を指定すると FutabaMonitor がふたばに直接アクセスせず、
+このサービスからカタログを受け取る（クライアントモード）。
+
+通信は 4 バイト（ビッグエンディアン）の長さに続く JSON の1フレーム単位で行う。
+
+- クライアント → サービス: {"version": 1, "boards": ["may", ...]}
+- サービス → クライアント:
+    - subscribed: 接続直後の応答。配信する板（boards）とカタログを取得済みの板（ready）
+    - snapshot: 接続直後に送る板のカタログ全体（threads）
+    - delta: 前回から新規・変更のあったスレッド（threads）と消えたスレッドID（removed）
+    - not_modified: カタログに変化がなかった（304）
+
+配信していない板だけを購読しようとしたクライアントには subscribed を返して
+切断する。スレッドは Thread のフィールド順のリストで送る。受け取りの遅いクライアントは
+切断し、再接続時に snapshot から受け取り直させる。
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import stat
+import struct
+from collections.abc import Iterable
+from dataclasses import astuple
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .boards import Board
+from .config import METRICS_HOST
+from .logging_config import get_logger
+from .metrics import REGISTRY, MetricsServer
+from .thread import Thread
+
+if TYPE_CHECKING:
+    from .monitor import CatalogSource
+
+logger = get_logger(__name__)
+
+PROTOCOL_VERSION = 1
+# 1フレームの上限（カタログ全体が収まる大きさ）
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+# クライアントごとの送信待ちの上限（超えたら切断して再同期させる）
+MAX_CLIENT_BUFFER = 16 * 1024 * 1024
+# 接続時の購読の要求と応答を待つ上限（秒）
+HANDSHAKE_TIMEOUT = 10
+
+_HEADER = struct.Struct(">I")
+
+CATALOG_CLIENTS = REGISTRY.gauge(
+    "futaba_catalog_service_clients", "接続中のクライアント数", ("board",)
+)
+CATALOG_FRAMES_TOTAL = REGISTRY.counter(
+    "futaba_catalog_service_frames_total",
+    "配信したフレームの数（type は snapshot / delta / not_modified）",
+    ("board", "type"),
+)
+CATALOG_DISCONNECTS_TOTAL = REGISTRY.counter(
+    "futaba_catalog_service_slow_disconnects_total",
+    "受け取りが遅いため切断したクライアントの数",
+)
+
+
+def encode_frame(message: dict[str, Any]) -> bytes:
+    """メッセージを長さ付きの JSON フレームにする"""
+    body = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict[str, Any]:
+    """フレームを1つ読み込む（接続が閉じられた場合は IncompleteReadError）"""
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"フレームが大きすぎます: {size}バイト")
+    message = json.loads(await reader.readexactly(size))
+    if not isinstance(message, dict):
+        raise ValueError("フレームの形式が不正です")
+    return message
+
+
+def _thread_rows(threads: Iterable[Thread]) -> list[list[Any]]:
+    return [list(astuple(thread)) for thread in threads]
+
+
+class CatalogService:
+    """取得したカタログを購読中のクライアントに配る（サービス側）
+
+    BoardScheduler の handler として publish を使う。板ごとに前回のカタログを
+    保持し、新しく接続したクライアントには snapshot を、以降は差分を送る。
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        boards: Iterable[str] | None = None,
+        max_buffer: int = MAX_CLIENT_BUFFER,
+    ) -> None:
+        self.path = Path(path)
+        # 配信する板（None は要求された板を全て配信する）
+        self.boards = set(boards) if boards is not None else None
+        self.max_buffer = max_buffer
+        self._server: asyncio.AbstractServer | None = None
+        # 板 → 前回のカタログ（スレッドID → スレッド）
+        self._catalogs: dict[str, dict[int, Thread]] = {}
+        # 板 → 購読中のクライアント
+        self._clients: dict[str, set[asyncio.StreamWriter]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    def clients(self, board: str) -> int:
+        """板を購読中のクライアント数"""
+        return len(self._clients.get(board, ()))
+
+    async def start(self) -> None:
+        """Unix ソケットで待ち受けを開始（残っているソケットファイルは作り直す）"""
+        if self._server is not None:
+            return
+        await self._remove_stale_socket()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = await asyncio.start_unix_server(
+            self._handle_client, path=str(self.path)
+        )
+        logger.info("カタログの配信を開始: %s", self.path)
+
+    async def _remove_stale_socket(self) -> None:
+        if not self.path.exists():
+            return
+        if not stat.S_ISSOCK(self.path.stat().st_mode):
+            raise RuntimeError(f"ソケット以外のファイルが存在します: {self.path}")
+        try:
+            _, writer = await asyncio.open_unix_connection(str(self.path))
+        except OSError:
+            self.path.unlink()
+            return
+        writer.close()
+        raise RuntimeError(f"既に他のサービスが待ち受けています: {self.path}")
+
+    async def stop(self) -> None:
+        """待ち受けを止めて全てのクライアントを切断"""
+        if self._server is None:
+            return
+        self._server.close()
+        for writers in self._clients.values():
+            for writer in writers:
+                writer.close()
+        self._clients.clear()
+        await self._server.wait_closed()
+        self._server = None
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+    async def publish(self, board: Board, monitor: "CatalogSource") -> int | None:
+        """カタログを取得してクライアントに配り、新規スレッド数を返す"""
+        threads = await monitor.stream_threads()
+        if threads is None:
+            if not monitor.not_modified:
+                logger.debug(
+                    "%s: スレッドデータの取得に失敗、配信をスキップ", board.name
+                )
+                return None
+            self._broadcast(board.name, "not_modified", {})
+            return 0
+
+        current = {thread.id: thread for thread in threads}
+        previous = self._catalogs.get(board.name)
+        self._catalogs[board.name] = current
+        if previous is None:
+            self._broadcast(board.name, "snapshot", {"threads": _thread_rows(threads)})
+            return None
+
+        changed = [thread for thread in threads if previous.get(thread.id) != thread]
+        removed = [thread_id for thread_id in previous if thread_id not in current]
+        self._broadcast(
+            board.name,
+            "delta",
+            {"threads": _thread_rows(changed), "removed": removed},
+        )
+        return sum(1 for thread in threads if thread.id not in previous)
+
+    def _broadcast(self, board: str, kind: str, fields: dict[str, Any]) -> None:
+        writers = self._clients.get(board)
+        if not writers:
+            return
+        payload = encode_frame({"type": kind, "board": board, **fields})
+        for writer in list(writers):
+            self._send(board, writer, payload)
+        CATALOG_FRAMES_TOTAL.inc(1, board, kind)
+
+    def _send(self, board: str, writer: asyncio.StreamWriter, payload: bytes) -> None:
+        """送信待ちに追加（受け取りが遅いクライアントは切断する）"""
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            logger.warning("%s: 受け取りが遅いクライアントを切断します", board)
+            CATALOG_DISCONNECTS_TOTAL.inc()
+            self._unsubscribe(writer)
+            writer.close()
+            return
+        writer.write(payload)
+
+    def _unsubscribe(self, writer: asyncio.StreamWriter) -> None:
+        for board, writers in self._clients.items():
+            if writer in writers:
+                writers.discard(writer)
+                CATALOG_CLIENTS.set(len(writers), board)
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """購読する板を受け取り、応答と snapshot を送ってから配信先に加える"""
+        try:
+            hello = await asyncio.wait_for(read_frame(reader), HANDSHAKE_TIMEOUT)
+            if hello.get("version") != PROTOCOL_VERSION:
+                raise ValueError(
+                    f"プロトコルのバージョンが違います: {hello.get('version')}"
+                )
+            requested = [str(board) for board in hello.get("boards", [])]
+        except (asyncio.IncompleteReadError, TimeoutError, ValueError) as e:
+            logger.warning("クライアントの接続を拒否しました: %s", e)
+            writer.close()
+            return
+
+        boards = [
+            board for board in requested if self.boards is None or board in self.boards
+        ]
+        writer.write(
+            encode_frame(
+                {
+                    "type": "subscribed",
+                    "boards": boards,
+                    "ready": [board for board in boards if board in self._catalogs],
+                }
+            )
+        )
+        if not boards:
+            logger.warning(
+                "配信していない板のため接続を拒否しました: %s", ", ".join(requested)
+            )
+            writer.close()
+            return
+
+        for board in boards:
+            catalog = self._catalogs.get(board)
+            if catalog is not None:
+                writer.write(
+                    encode_frame(
+                        {
+                            "type": "snapshot",
+                            "board": board,
+                            "threads": _thread_rows(catalog.values()),
+                        }
+                    )
+                )
+                CATALOG_FRAMES_TOTAL.inc(1, board, "snapshot")
+            writers = self._clients.setdefault(board, set())
+            writers.add(writer)
+            CATALOG_CLIENTS.set(len(writers), board)
+        logger.info("クライアントが接続しました: %s", ", ".join(boards))
+
+        # クライアントからは以降何も送られないため、切断されるまで待つ
+        try:
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            self._unsubscribe(writer)
+            writer.close()
+            logger.info("クライアントが切断しました: %s", ", ".join(boards))
+
+
+class CatalogSubscription:
+    """サービスから板1つ分のカタログを受け取る（クライアント側）
+
+    受信したフレームを適用して最新のカタログを保持する。take は前回から
+    更新があった場合だけカタログ全体を返す。
+    """
+
+    def __init__(self, path: str | Path, board: str) -> None:
+        self.path = Path(path)
+        self.board = board
+        self.threads: dict[int, Thread] = {}
+        # snapshot を受け取ったか / 前回の take から更新があったか
+        self.synced = False
+        self.updated = False
+        # 接続時点でサービスがカタログを取得済みだったか
+        self.ready = False
+        self._synced_event = asyncio.Event()
+        self._writer: asyncio.StreamWriter | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def connect(self) -> None:
+        """サービスに接続して板を購読
+
+        接続できない場合は OSError、サービスがこの板を配信していない場合や
+        応答がない場合は ValueError を送出する。
+        """
+        reader, writer = await asyncio.open_unix_connection(str(self.path))
+        try:
+            writer.write(
+                encode_frame({"version": PROTOCOL_VERSION, "boards": [self.board]})
+            )
+            await writer.drain()
+            reply = await asyncio.wait_for(read_frame(reader), HANDSHAKE_TIMEOUT)
+        except (asyncio.IncompleteReadError, TimeoutError) as e:
+            writer.close()
+            raise ValueError("カタログ配信サービスから応答がありません") from e
+        except BaseException:
+            writer.close()
+            raise
+        if reply.get("type") != "subscribed" or self.board not in reply.get(
+            "boards", []
+        ):
+            writer.close()
+            raise ValueError(
+                f"カタログ配信サービスが板 {self.board} を配信していません"
+            )
+        self.ready = self.board in reply.get("ready", [])
+        self._writer = writer
+        self._task = asyncio.create_task(
+            self._receive(reader), name=f"catalog-{self.board}"
+        )
+
+    async def wait_synced(self, timeout: float) -> bool:
+        """snapshot を受け取るまで待つ（timeout 秒で諦める）"""
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._synced_event.wait(), timeout)
+        return self.synced
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def apply(self, message: dict[str, Any]) -> None:
+        """受け取ったフレームをカタログに反映"""
+        kind = message.get("type")
+        if kind == "snapshot":
+            self.threads = {
+                thread.id: thread
+                for thread in (Thread(*row) for row in message["threads"])
+            }
+            self.synced = True
+            self.updated = True
+            self._synced_event.set()
+        elif kind == "delta" and self.synced:
+            for row in message["threads"]:
+                thread = Thread(*row)
+                self.threads[thread.id] = thread
+            for thread_id in message["removed"]:
+                self.threads.pop(thread_id, None)
+            self.updated = True
+
+    def take(self) -> list[Thread] | None:
+        """前回から更新があればカタログ全体を返す"""
+        if not self.updated:
+            return None
+        self.updated = False
+        return list(self.threads.values())
+
+    def replay(self) -> None:
+        """次の take で最新のカタログをもう一度返す（全件の再評価用）"""
+        self.updated = self.synced
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                self.apply(await read_frame(reader))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            logger.warning(
+                "%s: カタログ配信サービスから切断されました: %s", self.board, e
+            )
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+
+
+async def serve(
+    path: str | Path, boards: Iterable[Board], metrics_port: int = 0
+) -> None:
+    """停止されるまでカタログを取得して配り続ける"""
+    # monitor.py がこのモジュールを読み込むため、スケジューラーはここで読み込む
+    from .scheduler import BoardScheduler
+
+    boards = list(boards)
+    service = CatalogService(path, [board.name for board in boards])
+    scheduler = BoardScheduler(boards, service.publish)
+    metrics_server: MetricsServer | None = None
+    if metrics_port:
+        REGISTRY.enabled = True
+        metrics_server = MetricsServer(REGISTRY, METRICS_HOST, metrics_port)
+        await metrics_server.start()
+    await service.start()
+    try:
+        await scheduler.start()
+        await asyncio.Event().wait()
+    finally:
+        await scheduler.stop()
+        await service.stop()
+        if metrics_server:
+            await metrics_server.stop()
+
+
+def run_catalog_service(
+    path: str | Path, boards: Iterable[Board], metrics_port: int = 0
+) -> None:
+    """カタログ配信サービスを実行"""
+    asyncio.run(serve(path, boards, metrics_port))
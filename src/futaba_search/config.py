@@ -8,10 +8,90 @@ FUTABA_API_URL = os.getenv(
     "FUTABA_API_URL", "https://may.2chan.net/b/futaba.php?mode=json"
 )
 MONITOR_INTERVAL = int(os.getenv("MONITOR_INTERVAL", "60"))  # 1 minutes in seconds
+# 監視する板（カンマ区切り、"img:120" のように板ごとの監視間隔を指定可能）
+FUTABA_BOARDS = os.getenv("FUTABA_BOARDS", "may")
+# 板ごとの監視開始時刻をずらす幅（秒、各回 ±半分の範囲でずらし平均の間隔は変えない）
+MONITOR_JITTER = float(os.getenv("MONITOR_JITTER", "5"))
+# 新規スレッドの増え方に合わせて監視間隔を調整するか
+MONITOR_ADAPTIVE = os.getenv("MONITOR_ADAPTIVE", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# 調整する監視間隔の下限・上限（秒）
+MONITOR_MIN_INTERVAL = float(os.getenv("MONITOR_MIN_INTERVAL", "15"))
+MONITOR_MAX_INTERVAL = float(os.getenv("MONITOR_MAX_INTERVAL", "300"))
+# 1回の取得で見つかる新規スレッド数の目標（小さいほど通知が早く、取得回数が増える）
+MONITOR_TARGET_NEW_THREADS = float(os.getenv("MONITOR_TARGET_NEW_THREADS", "5"))
+
+# HTTP接続設定（ティック間で接続を使い回すため、キープアライブは監視間隔より長くする）
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_KEEPALIVE_TIMEOUT = float(
+    os.getenv("HTTP_KEEPALIVE_TIMEOUT", str(MONITOR_INTERVAL * 2))
+)
+HTTP_CONNECTION_LIMIT = int(os.getenv("HTTP_CONNECTION_LIMIT", "10"))
+
+# 通知送信設定
+DISPATCH_WORKERS = int(os.getenv("DISPATCH_WORKERS", "4"))
+DISPATCH_QUEUE_SIZE = int(os.getenv("DISPATCH_QUEUE_SIZE", "1000"))
+DISPATCH_MAX_RETRIES = int(os.getenv("DISPATCH_MAX_RETRIES", "3"))
+# 同じチャンネルへの通知を1メッセージ（最大10埋め込み）にまとめるか
+NOTIFY_COALESCE = os.getenv("NOTIFY_COALESCE", "true").lower() in ("1", "true", "yes")
+
+# 通知履歴の保存日数（日ごとのテーブル単位で削除するため最大1日長く残る）
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "7"))
+# 古い通知履歴を削除する間隔（秒）
+NOTIFICATION_CLEANUP_INTERVAL = int(os.getenv("NOTIFICATION_CLEANUP_INTERVAL", "3600"))
+
+# スレッド検索の対象として保持する日数
+OBSERVED_RETENTION_DAYS = int(os.getenv("OBSERVED_RETENTION_DAYS", "7"))
+# スレッド検索の1ページあたりの件数
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "10"))
+
+# 重複チェックにブルームフィルターを使うか（通知履歴をメモリに全件保持しない）
+NOTIFIED_FILTER = os.getenv("NOTIFIED_FILTER", "false").lower() in ("1", "true", "yes")
+# ブルームフィルター全体のメモリ上限（MiB、保存日数 + 1日で等分する）
+NOTIFIED_FILTER_MEMORY_MB = int(os.getenv("NOTIFIED_FILTER_MEMORY_MB", "16"))
+# 1日あたりの想定通知数（ハッシュ関数の数の決定に使う）
+NOTIFIED_FILTER_EXPECTED_PER_DAY = int(
+    os.getenv("NOTIFIED_FILTER_EXPECTED_PER_DAY", "100000")
+)
+
+# SQLite設定
+# performance: WAL・同期レベル・mmap・キャッシュサイズを設定 / default: SQLiteの既定値のまま
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "performance").lower()
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL").upper()
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# 負の値はKiB単位（-65536 = 64MiB）
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+# カタログ配信サービス（futaba-search catalog-service）のソケット
+# 指定するとボットはふたばに直接アクセスせず、サービスからカタログを受け取る
+CATALOG_SOCKET = os.getenv("CATALOG_SOCKET", "")
+
+# 購読をチャンネルIDで分担するワーカープロセスの数（1 なら1プロセスで実行）
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+
+# 計測値を Prometheus 形式で公開するポート（0 なら計測しない）
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# 計測値を公開するアドレス（既定ではローカルからのみ参照できる）
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
 
 # ログ設定
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 LOG_FILE = os.getenv("LOG_FILE")  # ログファイルパス（指定されない場合はコンソールのみ）
+# ログの形式（text: 従来のテキスト形式 / json: 1行1レコードの JSON）
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# ログファイルのローテーション（size: サイズで切り替え / time: 時刻で切り替え / none）
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size").lower()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATION_WHEN = os.getenv("LOG_ROTATION_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# 書き込み待ちのログの上限（0 なら待ち行列を使わず同期的に書き込む）
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# 書き込み待ちが上限に達した場合の破棄方針（drop_new: 新しいログ / drop_old: 古いログ）
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "drop_new").lower()
 
 # プロジェクトルートパスを取得
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -1,24 +1,103 @@
 """ふたば検索ボットのデータベース管理"""
 
-from datetime import datetime, timedelta
+import asyncio
+import functools
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
+from time import perf_counter
+from typing import Any, ParamSpec, TypeVar
 
 from sqlalchemy import (
     Column,
+    Connection,
     DateTime,
     Integer,
+    MetaData,
     String,
+    Table,
     UniqueConstraint,
     create_engine,
+    event,
+    inspect,
+    select,
 )
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
-from .config import DATABASE_PATH
+from .bloom import TimeBucketedBloomFilter
+from .boards import DEFAULT_BOARD
+from .cache import MuteTable, NotifiedIndex, NotifiedKey, SubscriptionRegistry
+from .config import (
+    DATABASE_PATH,
+    NOTIFICATION_RETENTION_DAYS,
+    NOTIFIED_FILTER,
+    NOTIFIED_FILTER_EXPECTED_PER_DAY,
+    NOTIFIED_FILTER_MEMORY_MB,
+    OBSERVED_RETENTION_DAYS,
+    SEARCH_PAGE_SIZE,
+    SQLITE_CACHE_SIZE,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_PROFILE,
+    SQLITE_SYNCHRONOUS,
+)
 from .logging_config import get_logger
+from .metrics import REGISTRY
+from .normalize import normalize_text
+from .query import EXPRESSION_PREFIX, LITERAL_PREFIX, REGEX_PREFIX
+from .sharding import Shard
+from .thread import Thread
 
 logger = get_logger(__name__)
 
+P = ParamSpec("P")
+T = TypeVar("T")
+
+DB_SECONDS = REGISTRY.histogram(
+    "futaba_db_seconds", "データベース処理の実行時間（メソッドごと）", ("method",)
+)
+DB_WAIT_SECONDS = REGISTRY.histogram(
+    "futaba_db_wait_seconds", "データベーススレッドの空きを待った時間"
+)
+DB_ERRORS = REGISTRY.counter(
+    "futaba_db_errors_total", "データベース処理で発生した例外の数", ("method",)
+)
+
+# 接続ごとに設定するPRAGMAのプロファイル
+SQLITE_PROFILES: dict[str, dict[str, str | int]] = {
+    "default": {},
+    "performance": {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": SQLITE_CACHE_SIZE,
+    },
+}
+
+# PRAGMAに渡せる値（文字列で指定するもの）
+_PRAGMA_CHOICES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+}
+
+
+def _pragma_statements(pragmas: dict[str, str | int]) -> list[str]:
+    """PRAGMA文を組み立てる（不正な値は ValueError）"""
+    statements = []
+    for name, value in pragmas.items():
+        if name in _PRAGMA_CHOICES:
+            value = str(value).upper()
+            if value not in _PRAGMA_CHOICES[name]:
+                raise ValueError(f"PRAGMA {name} に指定できない値です: {value}")
+        else:
+            value = int(value)
+        statements.append(f"PRAGMA {name}={value}")
+    return statements
+
 
 class Base(DeclarativeBase):
     """SQLAlchemyのベースクラス"""
@@ -34,22 +113,44 @@ class Subscription(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     channel_id = Column(Integer, nullable=False)
     keyword = Column(String, nullable=False)
+    # 購読する板（boards.BOARDS のキー）
+    board = Column(
+        String, nullable=False, default=DEFAULT_BOARD, server_default=DEFAULT_BOARD
+    )
 
-    __table_args__ = (UniqueConstraint("channel_id", "keyword"),)
+    __table_args__ = (UniqueConstraint("channel_id", "keyword", "board"),)
 
 
-class NotifiedThread(Base):
-    """通知済みスレッドを追跡するモデル"""
+# 通知履歴は日ごとのテーブル（notified_threads_YYYYMMDD）に分けて保存し、
+# 保存期間を過ぎた日のテーブルをまとめて削除する
+NOTIFIED_TABLE_PREFIX = "notified_threads_"
+# 日ごとに分割する前の通知履歴テーブル（起動時に移行して削除する）
+LEGACY_NOTIFIED_TABLE = "notified_threads"
 
-    __tablename__ = "notified_threads"
+# PRAGMA user_version に記録する購読キーワードの書式の版。
+# 1: re: / expr: で始まるキーワードを正規表現・式として扱う
+KEYWORD_SYNTAX_VERSION = 1
+
+
+def notified_table_name(day: date) -> str:
+    """通知日に対応する通知履歴テーブル名"""
+    return f"{NOTIFIED_TABLE_PREFIX}{day:%Y%m%d}"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    thread_id = Column(String, nullable=False)
-    keyword = Column(String, nullable=False)
-    channel_id = Column(Integer, nullable=False)
-    notified_at = Column(DateTime, default=datetime.now)
 
-    __table_args__ = (UniqueConstraint("thread_id", "keyword", "channel_id"),)
+def _notified_table(metadata: MetaData, day: date) -> Table:
+    """通知済みスレッドを追跡する1日分のテーブル定義"""
+    name = notified_table_name(day)
+    if name in metadata.tables:
+        return metadata.tables[name]
+    return Table(
+        name,
+        metadata,
+        Column("thread_id", String, nullable=False),
+        Column("keyword", String, nullable=False),
+        Column("channel_id", Integer, nullable=False),
+        Column("notified_at", DateTime, nullable=False),
+        UniqueConstraint("thread_id", "keyword", "channel_id"),
+    )
 
 
 class MutedChannel(Base):
@@ -59,15 +160,118 @@ class MutedChannel(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     channel_id = Column(Integer, nullable=False, unique=True)
-    muted_until = Column(DateTime, nullable=False)
+    # 期限切れミュートのクリーンアップで範囲検索する
+    muted_until = Column(DateTime, nullable=False, index=True)
     muted_at = Column(DateTime, default=datetime.now)
 
 
+class ObservedThread(Base):
+    """監視中に取得したスレッド（全文検索の対象）"""
+
+    __tablename__ = "observed_threads"
+
+    # 全文検索インデックスの rowid と対応させる
+    id = Column(Integer, primary_key=True)
+    board = Column(String, nullable=False)
+    thread_id = Column(Integer, nullable=False)
+    title = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    timestamp = Column(String, nullable=False)
+    thumb_path = Column(String)
+    search_text = Column(String, nullable=False)
+    # 最初に取得した日時（検索期間の絞り込みと古いスレッドの削除に使う）
+    first_seen = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (UniqueConstraint("board", "thread_id"),)
+
+
+class StateVersion(Base):
+    """購読・ミュート状態の更新回数（シャードのワーカー間で変更を検知する）"""
+
+    __tablename__ = "state_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# 更新回数を記録する状態の名前
+SUBSCRIPTIONS_STATE = "subscriptions"
+MUTES_STATE = "mutes"
+
+
+OBSERVED_FTS_TABLE = "observed_threads_fts"
+
+# observed_threads.search_text を外部コンテンツとするトライグラム索引と、
+# 索引を observed_threads に追従させるトリガー
+_OBSERVED_FTS_STATEMENTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {OBSERVED_FTS_TABLE} USING fts5("
+    "search_text, content='observed_threads', content_rowid='id', "
+    "tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS observed_threads_ai "
+    "AFTER INSERT ON observed_threads BEGIN "
+    f"INSERT INTO {OBSERVED_FTS_TABLE} (rowid, search_text) "
+    "VALUES (new.id, new.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS observed_threads_ad "
+    "AFTER DELETE ON observed_threads BEGIN "
+    f"INSERT INTO {OBSERVED_FTS_TABLE} ({OBSERVED_FTS_TABLE}, rowid, search_text) "
+    "VALUES ('delete', old.id, old.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS observed_threads_au "
+    "AFTER UPDATE OF search_text ON observed_threads BEGIN "
+    f"INSERT INTO {OBSERVED_FTS_TABLE} ({OBSERVED_FTS_TABLE}, rowid, search_text) "
+    "VALUES ('delete', old.id, old.search_text); "
+    f"INSERT INTO {OBSERVED_FTS_TABLE} (rowid, search_text) "
+    "VALUES (new.id, new.search_text); END",
+)
+
+# トライグラム索引で検索できる最短の文字数（これより短い語は全件を走査する）
+MIN_FULLTEXT_QUERY_LENGTH = 3
+
+
+@dataclass(slots=True)
+class SearchPage:
+    """スレッド検索結果の1ページ分（スレッドと最初に取得した日時の組）"""
+
+    hits: list[tuple[Thread, datetime]]
+    page: int
+    has_next: bool
+
+
 class FutabaDatabase:
     """購読情報と通知履歴を保存するSQLiteデータベースを管理"""
 
-    def __init__(self, db_path: Path = DATABASE_PATH) -> None:
+    def __init__(
+        self,
+        db_path: Path = DATABASE_PATH,
+        use_notified_index: bool = True,
+        profile: str = SQLITE_PROFILE,
+        use_notified_filter: bool = NOTIFIED_FILTER,
+        shard: Shard | None = None,
+    ) -> None:
         self.db_path = db_path
+        # シャードのワーカーでは担当するチャンネルの状態だけをメモリに持つ
+        self.shard = shard
+        # 最後に読み込んだ時点の購読・ミュート状態の更新回数
+        self._state_versions: dict[str, int] = {}
+        self.use_notified_index = use_notified_index
+        # ブルームフィルターを使う場合は正確な索引をメモリに持たない
+        self.use_notified_filter = use_notified_filter
+        if profile not in SQLITE_PROFILES:
+            raise ValueError(f"不明なSQLiteプロファイルです: {profile}")
+        self.profile = profile
+        self.notified_index = NotifiedIndex()
+        self.notified_filter = TimeBucketedBloomFilter(
+            NOTIFIED_FILTER_MEMORY_MB * 1024 * 1024,
+            NOTIFICATION_RETENTION_DAYS,
+            NOTIFIED_FILTER_EXPECTED_PER_DAY,
+        )
+        self.mute_table = MuteTable()
+        self.subscriptions = SubscriptionRegistry()
+        # 通知日 → その日の通知履歴テーブル
+        self._notified_metadata = MetaData()
+        self._notified_tables: dict[date, Table] = {}
+        # トライグラム索引を使えるか（SQLite 3.34 未満では全件走査で検索する）
+        self.fulltext_available = False
         self.init_database()
 
     def init_database(self) -> None:
@@ -76,80 +280,488 @@ class FutabaDatabase:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
 
         # SQLAlchemyエンジンとセッションを作成
+        # （接続はプールされ、DBスレッドでティックをまたいで再利用される）
         self.engine = create_engine(f"sqlite:///{self.db_path}")
+        pragmas = _pragma_statements(SQLITE_PROFILES[self.profile])
+        if pragmas:
+
+            @event.listens_for(self.engine, "connect")
+            def _apply_pragmas(dbapi_connection: Any, _record: Any) -> None:
+                cursor = dbapi_connection.cursor()
+                try:
+                    for statement in pragmas:
+                        cursor.execute(statement)
+                finally:
+                    cursor.close()
+
         Base.metadata.create_all(self.engine)
+        self.migrate()
         self.Session = sessionmaker(bind=self.engine)
 
+        if self.use_notified_filter:
+            self.load_notified_filter()
+        elif self.use_notified_index:
+            self.load_notified_index()
+        self.load_mute_table()
+        self.load_subscriptions()
+
+    def migrate(self) -> None:
+        """既存のデータベースを現在のスキーマに合わせる"""
+        with self.engine.begin() as connection:
+            self._migrate_subscription_board(connection)
+
+            # create_all は既存テーブルのインデックスを作成しないため個別に確認する
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+
+            self._discover_notified_tables(connection)
+            if inspect(connection).has_table(LEGACY_NOTIFIED_TABLE):
+                self._migrate_legacy_notifications(connection)
+            self._migrate_keyword_syntax(connection)
+
+        self._create_fulltext_index()
+
+    def _create_fulltext_index(self) -> None:
+        """スレッド検索用のトライグラム索引を作成（既存のスレッドも索引に入れる）"""
+        try:
+            with self.engine.begin() as connection:
+                created = not inspect(connection).has_table(OBSERVED_FTS_TABLE)
+                for statement in _OBSERVED_FTS_STATEMENTS:
+                    connection.exec_driver_sql(statement)
+                if created:
+                    connection.exec_driver_sql(
+                        f"INSERT INTO {OBSERVED_FTS_TABLE} ({OBSERVED_FTS_TABLE}) "
+                        "VALUES ('rebuild')"
+                    )
+        except OperationalError as e:
+            logger.warning(
+                "トライグラム索引を作成できないため、スレッド検索は全件を走査します: %s",
+                e,
+            )
+            return
+        self.fulltext_available = True
+
+    def _migrate_subscription_board(self, connection: Connection) -> None:
+        """板の列がない購読テーブルを作り直し、既存の購読を既定の板に割り当てる"""
+        columns = {
+            column["name"]
+            for column in inspect(connection).get_columns("subscriptions")
+        }
+        if "board" in columns:
+            return
+
+        # SQLite では一意制約を変更できないため、テーブルを作り直して移す
+        connection.exec_driver_sql(
+            "ALTER TABLE subscriptions RENAME TO subscriptions_old"
+        )
+        Base.metadata.tables["subscriptions"].create(connection)
+        connection.exec_driver_sql(
+            "INSERT INTO subscriptions (id, channel_id, keyword, board) "
+            "SELECT id, channel_id, keyword, ? FROM subscriptions_old",
+            (DEFAULT_BOARD,),
+        )
+        connection.exec_driver_sql("DROP TABLE subscriptions_old")
+        logger.info(
+            "購読テーブルに板の列を追加しました（既存の購読は %s）", DEFAULT_BOARD
+        )
+
+    def _migrate_keyword_syntax(self, connection: Connection) -> None:
+        """接頭辞の書式を導入する前の購読を部分一致のまま扱われるようにする
+
+        以前は全てのキーワードが部分一致だったため、re: / expr: / \\ で始まる
+        既存のキーワードには \\ を付ける。通知履歴のキーワードも同じ形にそろえ、
+        通知済みのスレッドを再び通知しないようにする。
+        """
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar() or 0
+        if version >= KEYWORD_SYNTAX_VERSION:
+            return
+
+        condition = (
+            "substr(keyword, 1, ?) = ? OR substr(keyword, 1, ?) = ? "
+            "OR substr(keyword, 1, ?) = ?"
+        )
+        params = (
+            len(REGEX_PREFIX),
+            REGEX_PREFIX,
+            len(EXPRESSION_PREFIX),
+            EXPRESSION_PREFIX,
+            len(LITERAL_PREFIX),
+            LITERAL_PREFIX,
+        )
+        escaped = connection.exec_driver_sql(
+            f"UPDATE subscriptions SET keyword = ? || keyword WHERE {condition}",
+            (LITERAL_PREFIX, *params),
+        ).rowcount
+        for table in self._notified_tables.values():
+            connection.exec_driver_sql(
+                f"UPDATE OR IGNORE {table.name} SET keyword = ? || keyword "
+                f"WHERE {condition}",
+                (LITERAL_PREFIX, *params),
+            )
+        connection.exec_driver_sql(f"PRAGMA user_version = {KEYWORD_SYNTAX_VERSION}")
+        if escaped:
+            logger.warning(
+                "接頭辞で始まる既存の購読 %s件を部分一致のまま扱うよう %s を付けました",
+                escaped,
+                LITERAL_PREFIX,
+            )
+
+    def _discover_notified_tables(self, connection: Connection) -> None:
+        """既存の日ごとの通知履歴テーブルを把握する"""
+        names = connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+            (f"{NOTIFIED_TABLE_PREFIX}[0-9]*",),
+        ).scalars()
+        for name in names:
+            try:
+                day = datetime.strptime(
+                    name.removeprefix(NOTIFIED_TABLE_PREFIX), "%Y%m%d"
+                ).date()
+            except ValueError:
+                continue
+            self._notified_tables[day] = _notified_table(self._notified_metadata, day)
+
+    def _migrate_legacy_notifications(self, connection: Connection) -> None:
+        """分割前の通知履歴を日ごとのテーブルに移して旧テーブルを削除"""
+        days = connection.exec_driver_sql(
+            f"SELECT DISTINCT date(notified_at) FROM {LEGACY_NOTIFIED_TABLE} "
+            "WHERE notified_at IS NOT NULL"
+        ).scalars()
+        for value in list(days):
+            table = self._notified_table(connection, date.fromisoformat(value))
+            connection.exec_driver_sql(
+                f"INSERT OR IGNORE INTO {table.name} "
+                "(thread_id, keyword, channel_id, notified_at) "
+                "SELECT thread_id, keyword, channel_id, notified_at "
+                f"FROM {LEGACY_NOTIFIED_TABLE} WHERE date(notified_at) = ?",
+                (value,),
+            )
+
+        # 通知日時のないレコードは移行した日に通知したものとして扱う
+        now = datetime.now()
+        table = self._notified_table(connection, now.date())
+        connection.exec_driver_sql(
+            f"INSERT OR IGNORE INTO {table.name} "
+            "(thread_id, keyword, channel_id, notified_at) "
+            "SELECT thread_id, keyword, channel_id, ? "
+            f"FROM {LEGACY_NOTIFIED_TABLE} WHERE notified_at IS NULL",
+            (now.isoformat(sep=" "),),
+        )
+
+        connection.exec_driver_sql(f"DROP TABLE {LEGACY_NOTIFIED_TABLE}")
+        logger.info("通知履歴を日ごとのテーブルに移行しました")
+
+    def _notified_table(self, connection: Connection, day: date) -> Table:
+        """通知日のテーブルを取得（なければ作成）"""
+        table = self._notified_tables.get(day)
+        if table is None:
+            table = _notified_table(self._notified_metadata, day)
+            table.create(connection, checkfirst=True)
+            self._notified_tables[day] = table
+        return table
+
+    def notified_days(self) -> list[date]:
+        """通知履歴のある日（古い順）"""
+        return sorted(self._notified_tables)
+
+    def owns(self, channel_id: int) -> bool:
+        """チャンネルの状態をメモリに持つか（シャードでなければ全てのチャンネル）"""
+        return self.shard is None or self.shard.owns(channel_id)
+
+    def _shard_filter(self, channel_id: Any) -> list[Any]:
+        """担当するチャンネルだけを読み込む条件（シャードでなければ条件なし）"""
+        if self.shard is None:
+            return []
+        return [channel_id % self.shard.count == self.shard.index]
+
+    def load_notified_index(self) -> None:
+        """通知履歴をインメモリ索引に読み込む"""
+        with self.engine.connect() as connection:
+            self.notified_index.load(
+                (row.thread_id, row.keyword, row.channel_id, row.notified_at)
+                for day in self.notified_days()
+                for row in connection.execute(
+                    select(self._notified_tables[day])
+                    .where(*self._shard_filter(self._notified_tables[day].c.channel_id))
+                    .order_by(self._notified_tables[day].c.notified_at)
+                )
+            )
+        logger.debug("通知履歴を%s件読み込みました", len(self.notified_index))
+
+    def load_notified_filter(self) -> None:
+        """通知履歴から日ごとのブルームフィルターを構築"""
+        with self.engine.connect() as connection:
+            self.notified_filter.load(
+                ((row.thread_id, row.keyword, row.channel_id), day)
+                for day in self.notified_days()
+                for row in connection.execute(
+                    select(
+                        self._notified_tables[day].c.thread_id,
+                        self._notified_tables[day].c.keyword,
+                        self._notified_tables[day].c.channel_id,
+                    ).where(
+                        *self._shard_filter(self._notified_tables[day].c.channel_id)
+                    )
+                )
+            )
+        logger.debug(
+            "通知履歴%s件からブルームフィルターを構築: %.1f MiB",
+            len(self.notified_filter),
+            self.notified_filter.memory_bytes / 1024 / 1024,
+        )
+
+    def dedup_stats(self) -> dict[str, float]:
+        """重複チェック方式に応じた計測カウンタ"""
+        if self.notified_filter.loaded:
+            return self.notified_filter.stats()
+        return dict(self.notified_index.stats())
+
+    def load_mute_table(self) -> None:
+        """ミュート状態をインメモリ表に読み込む"""
+        with self._get_session() as session:
+            rows: list = (
+                session.query(MutedChannel.channel_id, MutedChannel.muted_until)
+                .filter(*self._shard_filter(MutedChannel.channel_id))
+                .all()
+            )
+            self.mute_table.load((row.channel_id, row.muted_until) for row in rows)
+        logger.debug("ミュート状態を%s件読み込みました", len(self.mute_table))
+
+    def load_subscriptions(self) -> None:
+        """購読をインメモリ登録簿に読み込む"""
+        with self._get_session() as session:
+            rows: list = (
+                session.query(
+                    Subscription.channel_id, Subscription.keyword, Subscription.board
+                )
+                .filter(*self._shard_filter(Subscription.channel_id))
+                .order_by(Subscription.id)
+                .all()
+            )
+            self.subscriptions.load(
+                (row.channel_id, row.keyword, row.board) for row in rows
+            )
+        logger.debug("購読を%s件読み込みました", len(self.subscriptions))
+
+    def _bump_state_version(self, session: Session, name: str) -> None:
+        """状態の更新回数を進める（他のワーカーが読み込み直すきっかけになる）"""
+        session.execute(
+            sqlite_insert(StateVersion)
+            .values(name=name, version=1)
+            .on_conflict_do_update(
+                index_elements=["name"],
+                set_={"version": StateVersion.version + 1},
+            )
+        )
+
+    def refresh_shared_state(self) -> list[str]:
+        """他のワーカーが購読・ミュート状態を変更していれば読み込み直す
+
+        Returns:
+            読み込み直した状態の名前
+        """
+        with self._get_session() as session:
+            versions: dict[str, int] = dict(
+                session.query(StateVersion.name, StateVersion.version).all()  # type: ignore
+            )
+        reloaded = [
+            name
+            for name in (SUBSCRIPTIONS_STATE, MUTES_STATE)
+            if versions.get(name, 0) != self._state_versions.get(name, 0)
+        ]
+        if SUBSCRIPTIONS_STATE in reloaded:
+            self.load_subscriptions()
+        if MUTES_STATE in reloaded:
+            self.load_mute_table()
+        self._state_versions = versions
+        return reloaded
+
     def _get_session(self) -> Session:
         """新しいデータベースセッションを取得"""
         return self.Session()
 
-    def add_subscription(self, channel_id: int, keyword: str) -> bool:
+    def add_subscription(
+        self, channel_id: int, keyword: str, board: str = DEFAULT_BOARD
+    ) -> bool:
         """チャンネルに新しいキーワード購読を追加"""
         try:
             with self._get_session() as session:
-                subscription = Subscription(channel_id=channel_id, keyword=keyword)
+                subscription = Subscription(
+                    channel_id=channel_id, keyword=keyword, board=board
+                )
                 session.add(subscription)
+                self._bump_state_version(session, SUBSCRIPTIONS_STATE)
                 session.commit()
-                return True
         except IntegrityError:
             return False
+        if self.owns(channel_id):
+            self.subscriptions.add(channel_id, keyword, board)
+        return True
 
-    def remove_subscription(self, channel_id: int, keyword: str) -> bool:
+    def remove_subscription(
+        self, channel_id: int, keyword: str, board: str = DEFAULT_BOARD
+    ) -> bool:
         """チャンネルのキーワード購読を削除"""
         with self._get_session() as session:
             result = (
                 session.query(Subscription)
-                .filter_by(channel_id=channel_id, keyword=keyword)
+                .filter_by(channel_id=channel_id, keyword=keyword, board=board)
                 .delete()
             )
+            if result:
+                self._bump_state_version(session, SUBSCRIPTIONS_STATE)
             session.commit()
-            return result > 0
+        self.subscriptions.remove(channel_id, keyword, board)
+        return result > 0
+
+    def get_subscriptions(
+        self, channel_id: int, board: str = DEFAULT_BOARD
+    ) -> list[str]:
+        """チャンネルの板ごとのキーワード購読を取得"""
+        if self.subscriptions.loaded and self.owns(channel_id):
+            return self.subscriptions.keywords(channel_id, board)
 
-    def get_subscriptions(self, channel_id: int) -> list[str]:
-        """チャンネルの全てのキーワード購読を取得"""
         with self._get_session() as session:
             subscriptions = (
                 session.query(Subscription.keyword)
-                .filter_by(channel_id=channel_id)
+                .filter_by(channel_id=channel_id, board=board)
                 .all()
             )
             return [sub.keyword for sub in subscriptions]
 
-    def get_all_subscriptions(self) -> list[tuple[int, str]]:
-        """全チャンネルの全てのキーワード購読を取得"""
+    def get_all_subscriptions(
+        self, board: str = DEFAULT_BOARD
+    ) -> list[tuple[int, str]]:
+        """板の全チャンネルのキーワード購読を取得"""
+        if self.subscriptions.loaded and self.shard is None:
+            return self.subscriptions.snapshot(board)[1]
+
         with self._get_session() as session:
-            subscriptions = session.query(
-                Subscription.channel_id, Subscription.keyword
-            ).all()
+            subscriptions = (
+                session.query(Subscription.channel_id, Subscription.keyword)
+                .filter_by(board=board)
+                .all()
+            )
             return [(sub.channel_id, sub.keyword) for sub in subscriptions]
 
     def is_thread_notified(self, thread_id: str, keyword: str, channel_id: int) -> bool:
         """チャンネルでキーワードに対してスレッドが既に通知済みかチェック"""
-        with self._get_session() as session:
-            result = (
-                session.query(NotifiedThread)
-                .filter_by(thread_id=thread_id, keyword=keyword, channel_id=channel_id)
-                .first()
+        if self.notified_index.loaded:
+            self.notified_index.hits += 1
+            return (thread_id, keyword, channel_id) in self.notified_index
+        if self.notified_filter.loaded:
+            return not self.filter_unnotified([(thread_id, keyword, channel_id)])
+
+        self.notified_index.db_fallbacks += 1
+        with self.engine.connect() as connection:
+            return self._is_notified_in_db(connection, (thread_id, keyword, channel_id))
+
+    def _is_notified_in_db(
+        self,
+        connection: Connection,
+        key: NotifiedKey,
+        days: Iterable[date] | None = None,
+    ) -> bool:
+        """保存期間内のいずれかの日（days 指定時はその日）のテーブルに記録があるか"""
+        thread_id, keyword, channel_id = key
+        if days is None:
+            tables = list(self._notified_tables.values())
+        else:
+            tables = [
+                self._notified_tables[day]
+                for day in days
+                if day in self._notified_tables
+            ]
+        for table in tables:
+            statement = (
+                select(table.c.thread_id)
+                .where(
+                    table.c.thread_id == thread_id,
+                    table.c.keyword == keyword,
+                    table.c.channel_id == channel_id,
+                )
+                .limit(1)
             )
-            return result is not None
+            if connection.execute(statement).first() is not None:
+                return True
+        return False
+
+    def filter_unnotified(self, entries: Iterable[NotifiedKey]) -> list[NotifiedKey]:
+        """(thread_id, keyword, channel_id) のうち未通知のものだけを返す"""
+        keys = list(entries)
+        if self.notified_index.loaded:
+            self.notified_index.hits += len(keys)
+            return [key for key in keys if key not in self.notified_index]
+        if self.notified_filter.loaded:
+            return self._filter_unnotified_with_filter(keys)
+
+        self.notified_index.db_fallbacks += len(keys)
+        with self.engine.connect() as connection:
+            return [key for key in keys if not self._is_notified_in_db(connection, key)]
+
+    def _filter_unnotified_with_filter(
+        self, keys: list[NotifiedKey]
+    ) -> list[NotifiedKey]:
+        """ブルームフィルターで未通知と分かったものはDBを参照せずに判定
+
+        含まれる可能性がある場合だけ、該当する日のテーブルで正確に照合する。
+        """
+        notified_filter = self.notified_filter
+        candidates = [(key, notified_filter.candidate_days(key)) for key in keys]
+        positives = [(key, days) for key, days in candidates if days]
+        notified_filter.negatives += len(candidates) - len(positives)
+        notified_filter.positives += len(positives)
+
+        notified: set[NotifiedKey] = set()
+        if positives:
+            with self.engine.connect() as connection:
+                notified = {
+                    key
+                    for key, days in positives
+                    if self._is_notified_in_db(connection, key, days)
+                }
+            notified_filter.false_positives += len(positives) - len(notified)
+        return [key for key in keys if key not in notified]
 
     def mark_thread_notified(
         self, thread_id: str, keyword: str, channel_id: int
     ) -> None:
         """チャンネルでキーワードに対してスレッドを通知済みとしてマーク"""
-        with self._get_session() as session:
-            existing = (
-                session.query(NotifiedThread)
-                .filter_by(thread_id=thread_id, keyword=keyword, channel_id=channel_id)
-                .first()
+        self.mark_threads_notified([(thread_id, keyword, channel_id)])
+
+    def mark_threads_notified(
+        self, entries: Iterable[NotifiedKey], notified_at: datetime | None = None
+    ) -> None:
+        """複数の (thread_id, keyword, channel_id) を1トランザクションで通知済みにする"""
+        keys = list(entries)
+        if not keys:
+            return
+
+        notified_at = notified_at or datetime.now()
+        rows = [
+            {
+                "thread_id": thread_id,
+                "keyword": keyword,
+                "channel_id": channel_id,
+                "notified_at": notified_at,
+            }
+            for thread_id, keyword, channel_id in keys
+        ]
+
+        with self.engine.begin() as connection:
+            table = self._notified_table(connection, notified_at.date())
+            statement = sqlite_insert(table).on_conflict_do_nothing(
+                index_elements=["thread_id", "keyword", "channel_id"]
             )
-            if not existing:
-                notified_thread = NotifiedThread(
-                    thread_id=thread_id, keyword=keyword, channel_id=channel_id
-                )
-                session.add(notified_thread)
-                session.commit()
+            connection.execute(statement, rows)
+
+        if self.notified_index.loaded:
+            for key in keys:
+                self.notified_index.add(key, notified_at)
+        if self.notified_filter.loaded:
+            for key in keys:
+                self.notified_filter.add(key, notified_at.date())
 
     def mute_channel(self, channel_id: int, muted_until: datetime) -> None:
         """指定された日時までチャンネルをミュート"""
@@ -165,7 +777,10 @@ class FutabaDatabase:
                     channel_id=channel_id, muted_until=muted_until
                 )
                 session.add(muted_channel)
+            self._bump_state_version(session, MUTES_STATE)
             session.commit()
+        if self.owns(channel_id):
+            self.mute_table.set(channel_id, muted_until)
 
     def unmute_channel(self, channel_id: int) -> bool:
         """チャンネルのミュートを解除"""
@@ -173,11 +788,17 @@ class FutabaDatabase:
             result = (
                 session.query(MutedChannel).filter_by(channel_id=channel_id).delete()
             )
+            if result:
+                self._bump_state_version(session, MUTES_STATE)
             session.commit()
-            return result > 0
+        self.mute_table.remove(channel_id)
+        return result > 0
 
     def is_channel_muted(self, channel_id: int) -> bool:
         """チャンネルが現在ミュート中かチェック"""
+        if self.mute_table.loaded and self.owns(channel_id):
+            return self.mute_table.is_muted(channel_id)
+
         with self._get_session() as session:
             now = datetime.now()
             result = (
@@ -192,6 +813,9 @@ class FutabaDatabase:
 
     def get_mute_status(self, channel_id: int) -> datetime | None:
         """チャンネルがミュート中の場合、ミュート期限時刻を取得"""
+        if self.mute_table.loaded and self.owns(channel_id):
+            return self.mute_table.get(channel_id)
+
         with self._get_session() as session:
             now = datetime.now()
             muted_channel = (
@@ -207,23 +831,341 @@ class FutabaDatabase:
             return None
 
     def cleanup_expired_mutes(self) -> None:
-        """期限切れのミュートエントリをデータベースから削除"""
+        """期限切れのミュートエントリをデータベースから削除
+
+        インメモリ表で期限切れになったチャンネルがある場合のみDBを更新する。
+        """
+        now = datetime.now()
+        if self.mute_table.loaded:
+            expired = self.mute_table.expire(now)
+            if not expired:
+                return
+            logger.debug("ミュート期限切れ: %s", expired)
+            with self._get_session() as session:
+                session.query(MutedChannel).filter(
+                    MutedChannel.channel_id.in_(expired),
+                    MutedChannel.muted_until <= now,  # type: ignore
+                ).delete()
+                session.commit()
+            return
+
         with self._get_session() as session:
-            now = datetime.now()
             session.query(MutedChannel).filter(MutedChannel.muted_until <= now).delete()
             session.commit()
 
-    def cleanup_old_notifications(self, days: int = 7) -> None:
-        """指定日数より古い通知レコードをデータベースから削除"""
-        with self._get_session() as session:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            deleted_count = (
-                session.query(NotifiedThread)
-                .filter(NotifiedThread.notified_at <= cutoff_date)
-                .delete()
+    def cleanup_old_notifications(
+        self, days: int = NOTIFICATION_RETENTION_DAYS
+    ) -> None:
+        """指定日数より古い通知履歴を日ごとのテーブル単位で削除
+
+        行単位の DELETE は行わず、丸1日分が保存期間を過ぎたテーブルを DROP する。
+        そのため通知履歴は最大で1日長く保持される。
+        シャードのワーカーはそれぞれ削除を試みるため、既に削除済みのテーブルは飛ばす。
+        """
+        cutoff_date = (datetime.now() - timedelta(days=days)).date()
+        expired = {
+            day: table
+            for day, table in self._notified_tables.items()
+            if day < cutoff_date
+        }
+        if expired:
+            with self.engine.begin() as connection:
+                for table in expired.values():
+                    table.drop(connection, checkfirst=True)
+            for day, table in expired.items():
+                del self._notified_tables[day]
+                self._notified_metadata.remove(table)
+
+        # 削除したテーブルに含まれていた通知（cutoff_date より前）を索引からも除く
+        boundary = datetime.combine(cutoff_date, time.min)
+        self.notified_index.expire(boundary - timedelta(microseconds=1))
+        self.notified_filter.expire(cutoff_date)
+        if expired:
+            logger.info(
+                "%s日分の古い通知履歴をクリーンアップしました: %s",
+                len(expired),
+                ", ".join(notified_table_name(day) for day in sorted(expired)),
             )
-            session.commit()
-            if deleted_count > 0:
-                logger.info(
-                    f"{deleted_count}件の古い通知レコードをクリーンアップしました"
-                )
+
+    def ingest_threads(
+        self, threads: Iterable[Thread], seen_at: datetime | None = None
+    ) -> int:
+        """取得したスレッドを検索対象として1トランザクションで記録
+
+        既に記録済みのスレッドは本文が変わった場合のみ更新する
+        （最初に取得した日時は変えない）。
+
+        Returns:
+            記録を試みたスレッド数
+        """
+        seen_at = seen_at or datetime.now()
+        rows = [
+            {
+                "board": thread.board,
+                "thread_id": thread.id,
+                "title": thread.title,
+                "subject": thread.subject,
+                "name": thread.name,
+                "timestamp": thread.timestamp,
+                "thumb_path": thread.thumb_path,
+                "search_text": thread.search_text,
+                "first_seen": seen_at,
+            }
+            for thread in threads
+        ]
+        if not rows:
+            return 0
+
+        table = Base.metadata.tables["observed_threads"]
+        statement = sqlite_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=["board", "thread_id"],
+            set_={
+                "title": statement.excluded.title,
+                "subject": statement.excluded.subject,
+                "thumb_path": statement.excluded.thumb_path,
+                "search_text": statement.excluded.search_text,
+            },
+            where=table.c.search_text != statement.excluded.search_text,
+        )
+        with self.engine.begin() as connection:
+            connection.execute(statement, rows)
+        return len(rows)
+
+    def search_threads(
+        self,
+        query: str,
+        board: str | None = None,
+        since: datetime | None = None,
+        page: int = 1,
+        page_size: int = SEARCH_PAGE_SIZE,
+    ) -> SearchPage:
+        """記録済みのスレッドから query を含むものを新しい順に検索
+
+        3文字以上の語はトライグラム索引で検索し、それより短い語は
+        observed_threads を新しい順に走査して部分一致で探す。
+        """
+        text = normalize_text(query)
+        page = max(1, page)
+        if not text:
+            return SearchPage([], page, False)
+
+        table = Base.metadata.tables["observed_threads"]
+        conditions = []
+        params: list[Any] = []
+        if board is not None:
+            conditions.append("o.board = ?")
+            params.append(board)
+        if since is not None:
+            conditions.append("o.first_seen >= ?")
+            # SQLAlchemy の DateTime と同じ書式の文字列で比較する
+            params.append(since.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+        if self.fulltext_available and len(text) >= MIN_FULLTEXT_QUERY_LENGTH:
+            # 語全体を1つのフレーズとして部分一致させる
+            phrase = '"' + text.replace('"', '""') + '"'
+            sql = (
+                f"SELECT o.* FROM {OBSERVED_FTS_TABLE} f "
+                f"JOIN {table.name} o ON o.id = f.rowid "
+                f"WHERE {OBSERVED_FTS_TABLE} MATCH ?"
+            )
+            params.insert(0, phrase)
+            order = "f.rowid"
+        else:
+            sql = f"SELECT o.* FROM {table.name} o WHERE instr(o.search_text, ?) > 0"
+            params.insert(0, text)
+            order = "o.id"
+
+        for condition in conditions:
+            sql += f" AND {condition}"
+        # 1件多く取得して次のページがあるか判定する
+        sql += f" ORDER BY {order} DESC LIMIT ? OFFSET ?"
+        params += [page_size + 1, (page - 1) * page_size]
+
+        with self.engine.connect() as connection:
+            rows = connection.exec_driver_sql(sql, tuple(params)).mappings().all()
+
+        hits = [
+            (
+                Thread(
+                    id=row["thread_id"],
+                    title=row["title"],
+                    subject=row["subject"],
+                    name=row["name"],
+                    timestamp=row["timestamp"],
+                    thumb_path=row["thumb_path"],
+                    search_text=row["search_text"],
+                    board=row["board"],
+                ),
+                datetime.fromisoformat(row["first_seen"]),
+            )
+            for row in rows[:page_size]
+        ]
+        return SearchPage(hits, page, len(rows) > page_size)
+
+    def cleanup_observed_threads(self, days: int = OBSERVED_RETENTION_DAYS) -> int:
+        """指定日数より前に取得したスレッドを検索対象から削除"""
+        cutoff = datetime.now() - timedelta(days=days)
+        table = Base.metadata.tables["observed_threads"]
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                table.delete().where(table.c.first_seen < cutoff)
+            )
+        if result.rowcount:
+            logger.info("%s件の古いスレッドを検索対象から削除しました", result.rowcount)
+        return int(result.rowcount)
+
+
+def _measure(method: str, submitted: float, call: Callable[[], T]) -> T:
+    """データベーススレッドでの待ち時間と実行時間を記録しながら実行"""
+    started = perf_counter()
+    DB_WAIT_SECONDS.observe(started - submitted)
+    try:
+        return call()
+    except Exception:
+        DB_ERRORS.inc(1, method)
+        raise
+    finally:
+        DB_SECONDS.observe(perf_counter() - started, method)
+
+
+class AsyncFutabaDatabase:
+    """FutabaDatabase の各メソッドを専用スレッドで実行する非同期ラッパー
+
+    SQLiteへの読み書きはすべて1本のワーカースレッドで直列に実行されるため、
+    重いクリーンアップ中もイベントループ（ゲートウェイのハートビートや
+    スラッシュコマンドへの応答）を止めない。
+    """
+
+    def __init__(self, db: FutabaDatabase | None = None) -> None:
+        self.sync = db if db is not None else FutabaDatabase()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="futaba-db"
+        )
+
+    @property
+    def notified_index(self) -> NotifiedIndex:
+        return self.sync.notified_index
+
+    @property
+    def mute_table(self) -> MuteTable:
+        return self.sync.mute_table
+
+    def dedup_stats(self) -> dict[str, float]:
+        return self.sync.dedup_stats()
+
+    @property
+    def subscriptions(self) -> SubscriptionRegistry:
+        return self.sync.subscriptions
+
+    async def _run(self, func: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """データベーススレッドで関数を実行"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        if REGISTRY.enabled:
+            call = functools.partial(_measure, func.__name__, perf_counter(), call)
+        return await loop.run_in_executor(self._executor, call)
+
+    def close(self) -> None:
+        """実行中の処理の完了を待ってデータベーススレッドを停止"""
+        self._executor.shutdown(wait=True)
+        self.sync.engine.dispose()
+
+    async def load_notified_index(self) -> None:
+        await self._run(self.sync.load_notified_index)
+
+    async def load_mute_table(self) -> None:
+        await self._run(self.sync.load_mute_table)
+
+    async def load_subscriptions(self) -> None:
+        await self._run(self.sync.load_subscriptions)
+
+    async def refresh_shared_state(self) -> list[str]:
+        return await self._run(self.sync.refresh_shared_state)
+
+    async def add_subscription(
+        self, channel_id: int, keyword: str, board: str = DEFAULT_BOARD
+    ) -> bool:
+        return await self._run(self.sync.add_subscription, channel_id, keyword, board)
+
+    async def remove_subscription(
+        self, channel_id: int, keyword: str, board: str = DEFAULT_BOARD
+    ) -> bool:
+        return await self._run(
+            self.sync.remove_subscription, channel_id, keyword, board
+        )
+
+    async def get_subscriptions(
+        self, channel_id: int, board: str = DEFAULT_BOARD
+    ) -> list[str]:
+        return await self._run(self.sync.get_subscriptions, channel_id, board)
+
+    async def get_all_subscriptions(
+        self, board: str = DEFAULT_BOARD
+    ) -> list[tuple[int, str]]:
+        return await self._run(self.sync.get_all_subscriptions, board)
+
+    async def is_thread_notified(
+        self, thread_id: str, keyword: str, channel_id: int
+    ) -> bool:
+        return await self._run(
+            self.sync.is_thread_notified, thread_id, keyword, channel_id
+        )
+
+    async def filter_unnotified(
+        self, entries: Iterable[NotifiedKey]
+    ) -> list[NotifiedKey]:
+        return await self._run(self.sync.filter_unnotified, list(entries))
+
+    async def mark_thread_notified(
+        self, thread_id: str, keyword: str, channel_id: int
+    ) -> None:
+        await self._run(self.sync.mark_thread_notified, thread_id, keyword, channel_id)
+
+    async def mark_threads_notified(
+        self, entries: Iterable[NotifiedKey], notified_at: datetime | None = None
+    ) -> None:
+        await self._run(self.sync.mark_threads_notified, list(entries), notified_at)
+
+    async def mute_channel(self, channel_id: int, muted_until: datetime) -> None:
+        await self._run(self.sync.mute_channel, channel_id, muted_until)
+
+    async def unmute_channel(self, channel_id: int) -> bool:
+        return await self._run(self.sync.unmute_channel, channel_id)
+
+    async def is_channel_muted(self, channel_id: int) -> bool:
+        return await self._run(self.sync.is_channel_muted, channel_id)
+
+    async def get_mute_status(self, channel_id: int) -> datetime | None:
+        return await self._run(self.sync.get_mute_status, channel_id)
+
+    async def cleanup_expired_mutes(self) -> None:
+        await self._run(self.sync.cleanup_expired_mutes)
+
+    async def cleanup_old_notifications(
+        self, days: int = NOTIFICATION_RETENTION_DAYS
+    ) -> None:
+        await self._run(self.sync.cleanup_old_notifications, days)
+
+    async def ingest_threads(
+        self, threads: Iterable[Thread], seen_at: datetime | None = None
+    ) -> int:
+        # スレッドのリストはDBスレッドで読むため、呼び出し時点の内容を渡す
+        return await self._run(self.sync.ingest_threads, list(threads), seen_at)
+
+    async def search_threads(
+        self,
+        query: str,
+        board: str | None = None,
+        since: datetime | None = None,
+        page: int = 1,
+        page_size: int = SEARCH_PAGE_SIZE,
+    ) -> SearchPage:
+        return await self._run(
+            self.sync.search_threads, query, board, since, page, page_size
+        )
+
+    async def cleanup_observed_threads(
+        self, days: int = OBSERVED_RETENTION_DAYS
+    ) -> int:
+        return await self._run(self.sync.cleanup_observed_threads, days)
@@ -0,0 +1,381 @@
+"""Discordへの通知送信ディスパッチャー"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import discord
+
+from .logging_config import get_logger
+from .metrics import REGISTRY
+from .thread import Thread
+
+logger = get_logger(__name__)
+
+# 送信レイテンシの統計に使う直近のサンプル数
+LATENCY_WINDOW = 1000
+
+NOTIFICATIONS_TOTAL = REGISTRY.counter(
+    "futaba_notifications_total",
+    "通知の処理結果ごとの件数（sent / failed / dropped / retried）",
+    ("result",),
+)
+SEND_SECONDS = REGISTRY.histogram(
+    "futaba_send_seconds", "1メッセージの送信にかかった時間（失敗を含む）"
+)
+QUEUE_SECONDS = REGISTRY.histogram(
+    "futaba_notification_queue_seconds",
+    "通知が送信待ちに入ってから送信されるまでの時間",
+)
+
+
+@dataclass(slots=True)
+class Notification:
+    """送信待ちの通知1件（1スレッドにマッチした1つ以上のキーワード）"""
+
+    channel: Any
+    thread: Thread
+    keywords: tuple[str, ...]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+    # 送信に成功したか（複数メッセージに分けて送る途中で失敗した場合に、
+    # 送信済みの通知を再送しないために送信処理が設定する）
+    delivered: bool = False
+
+    @property
+    def channel_id(self) -> int:
+        channel_id: int = self.channel.id
+        return channel_id
+
+    @property
+    def keys(self) -> list[tuple[str, str, int]]:
+        """通知履歴に記録するキー（スレッドキー, キーワード, チャンネルID）"""
+        channel_id = self.channel_id
+        return [(self.thread.key, keyword, channel_id) for keyword in self.keywords]
+
+
+class TokenBucket:
+    """チャンネルごとの送信レート制限（トークンバケット）
+
+    Discordのメッセージ送信はチャンネル単位のバケットで制限されるため、
+    上限に達する前に送信側で間隔を空ける。
+    """
+
+    def __init__(self, rate: int, per: float) -> None:
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        # 429 やバックオフでこの時刻まで送信を止める
+        self.blocked_until = 0.0
+
+    def reserve(self) -> float:
+        """トークンを1つ取得し、取得できなければ待つべき秒数を返す"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        self.tokens = min(
+            float(self.rate), self.tokens + (now - self.updated) * self.rate / self.per
+        )
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) * self.per / self.rate
+
+    def block(self, seconds: float) -> None:
+        """指定秒数だけ送信を止める"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+def _percentile(samples: list[float], percent: float) -> float:
+    """サンプルのパーセンタイル値（サンプルがなければ0）"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+    return ordered[index]
+
+
+class NotificationDispatcher:
+    """通知をチャンネルごとの待ち行列に振り分け、ワーカーで並行送信する
+
+    - 同じチャンネルへの通知は順番どおりに送信する
+      （batch_size が2以上なら最大その件数を1メッセージにまとめる）
+    - 別チャンネルへの送信は並行して行い、遅いチャンネルが他を待たせない
+    - チャンネルごとのレート制限、429・一時的なエラーでの再送を行う
+    - 待ち行列が上限に達した通知は破棄して数える
+    - 再送しても送れなかった通知は最後のエラーと一緒に on_failed に渡す
+    - 送信の途中で失敗した場合は、delivered の通知を送信済みとして残りだけを再送する
+    """
+
+    def __init__(
+        self,
+        send: Callable[[list[Notification]], Awaitable[None]],
+        workers: int = 4,
+        batch_size: int = 1,
+        max_queue: int = 1000,
+        max_retries: int = 3,
+        rate: int = 5,
+        per: float = 5.0,
+        backoff: float = 1.0,
+        on_failed: Callable[[list[Notification], Exception], Awaitable[None]]
+        | None = None,
+    ) -> None:
+        self._send = send
+        self._on_failed = on_failed
+        self.num_workers = workers
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.rate = rate
+        self.per = per
+        self.backoff = backoff
+
+        self._lanes: dict[int, deque[Notification]] = {}
+        self._buckets: dict[int, TokenBucket] = {}
+        # 処理可能なチャンネルIDの待ち行列
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        # 待ち行列に入っているか処理中のチャンネル
+        self._scheduled: set[int] = set()
+        self._workers: list[asyncio.Task[None]] = []
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # 統計（sent 等は通知数、messages は送信したメッセージ数）
+        self.messages = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self._send_latency: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._queue_latency: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def queue_depth(self) -> int:
+        """送信待ちの通知数"""
+        return self._pending
+
+    def start(self) -> None:
+        """ワーカータスクを起動"""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"notification-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+
+    async def stop(self, timeout: float | None = 5.0) -> None:
+        """送信待ちの通知を可能な範囲で送り切ってからワーカーを停止"""
+        if self._pending and self._workers:
+            try:
+                await asyncio.wait_for(self.join(), timeout)
+            except TimeoutError:
+                logger.warning("%s件の通知を送信できずに停止します", self._pending)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def join(self) -> None:
+        """送信待ちの通知がなくなるまで待つ"""
+        await self._idle.wait()
+
+    def submit(self, notification: Notification) -> bool:
+        """通知を送信待ちに追加（待ち行列が満杯なら破棄して False）"""
+        if self._pending >= self.max_queue:
+            self.dropped += 1
+            NOTIFICATIONS_TOTAL.inc(1, "dropped")
+            logger.warning(
+                "送信待ちが上限(%s)に達したため通知を破棄: チャンネル%s",
+                self.max_queue,
+                notification.channel_id,
+            )
+            return False
+
+        channel_id = notification.channel_id
+        self._lanes.setdefault(channel_id, deque()).append(notification)
+        self._pending += 1
+        self._idle.clear()
+        self._schedule(channel_id)
+        return True
+
+    def stats(self) -> dict[str, float]:
+        """送信状況の統計"""
+        send_latency = list(self._send_latency)
+        queue_latency = list(self._queue_latency)
+        return {
+            "queue_depth": self._pending,
+            "messages": self.messages,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "send_latency_p50": _percentile(send_latency, 50),
+            "send_latency_p90": _percentile(send_latency, 90),
+            "send_latency_p99": _percentile(send_latency, 99),
+            "queue_latency_p50": _percentile(queue_latency, 50),
+            "queue_latency_p99": _percentile(queue_latency, 99),
+        }
+
+    def _schedule(self, channel_id: int, delay: float = 0.0) -> None:
+        """チャンネルを処理待ちに入れる（delay秒後）"""
+        if delay > 0:
+            asyncio.get_running_loop().call_later(
+                delay, self._ready.put_nowait, channel_id
+            )
+            self._scheduled.add(channel_id)
+        elif channel_id not in self._scheduled:
+            self._scheduled.add(channel_id)
+            self._ready.put_nowait(channel_id)
+
+    def _bucket(self, channel_id: int) -> TokenBucket:
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = TokenBucket(self.rate, self.per)
+        return bucket
+
+    def _finish(self, count: int) -> None:
+        """通知の処理を完了"""
+        self._pending -= count
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _worker(self) -> None:
+        while True:
+            channel_id = await self._ready.get()
+            lane = self._lanes.get(channel_id)
+            if not lane:
+                self._scheduled.discard(channel_id)
+                self._lanes.pop(channel_id, None)
+                continue
+
+            bucket = self._bucket(channel_id)
+            wait = bucket.reserve()
+            if wait > 0:
+                # レート制限中はワーカーを塞がず、解除時刻に再投入する
+                self._schedule(channel_id, wait)
+                continue
+
+            batch = [lane.popleft() for _ in range(min(self.batch_size, len(lane)))]
+            await self._deliver(batch, bucket, lane)
+
+            if lane:
+                # 他のチャンネルと公平になるよう待ち行列の末尾に戻す
+                self._ready.put_nowait(channel_id)
+            else:
+                self._scheduled.discard(channel_id)
+                self._lanes.pop(channel_id, None)
+
+    async def _deliver(
+        self,
+        batch: list[Notification],
+        bucket: TokenBucket,
+        lane: deque[Notification],
+    ) -> None:
+        """1メッセージ分を送信し、失敗時は再送か破棄を判断"""
+        channel_id = batch[0].channel_id
+        attempts = max(notification.attempts for notification in batch) + 1
+        for notification in batch:
+            notification.attempts = attempts
+
+        start = time.monotonic()
+        try:
+            await self._send(batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            SEND_SECONDS.observe(time.monotonic() - start)
+            delivered = [
+                notification for notification in batch if notification.delivered
+            ]
+            if delivered:
+                self._record_sent(delivered, time.monotonic())
+                batch = [
+                    notification for notification in batch if not notification.delivered
+                ]
+                if not batch:
+                    return
+            delay = self._retry_delay(e, attempts)
+            if delay is None:
+                self.failed += len(batch)
+                NOTIFICATIONS_TOTAL.inc(len(batch), "failed")
+                self._finish(len(batch))
+                logger.error(
+                    "通知の送信に失敗: チャンネル%s %s件 (%s回目): %s",
+                    channel_id,
+                    len(batch),
+                    attempts,
+                    e,
+                )
+                if self._on_failed is not None:
+                    try:
+                        await self._on_failed(batch, e)
+                    except Exception as error:
+                        logger.error(
+                            "送信失敗の処理でエラーが発生: %s", error, exc_info=True
+                        )
+                return
+
+            self.retries += 1
+            NOTIFICATIONS_TOTAL.inc(len(batch), "retried")
+            bucket.block(delay)
+            lane.extendleft(reversed(batch))
+            logger.warning(
+                "通知の送信に失敗、%.1f秒後に再送: チャンネル%s %s件 (%s回目): %s",
+                delay,
+                channel_id,
+                len(batch),
+                attempts,
+                e,
+            )
+            return
+
+        now = time.monotonic()
+        self._send_latency.append(now - start)
+        SEND_SECONDS.observe(now - start)
+        self._record_sent(batch, now)
+
+    def _record_sent(self, batch: list[Notification], now: float) -> None:
+        """送信できた通知を数えて完了にする"""
+        for notification in batch:
+            self._queue_latency.append(now - notification.enqueued_at)
+            QUEUE_SECONDS.observe(now - notification.enqueued_at)
+        self.messages += 1
+        self.sent += len(batch)
+        NOTIFICATIONS_TOTAL.inc(len(batch), "sent")
+        self._finish(len(batch))
+
+    @staticmethod
+    def is_permanent(error: Exception) -> bool:
+        """再送しても成功しないエラー（429 以外の 4xx）か"""
+        return (
+            isinstance(error, discord.HTTPException)
+            and not isinstance(error, discord.RateLimited)
+            and 400 <= error.status < 500
+            and error.status != 429
+        )
+
+    def _retry_delay(self, error: Exception, attempts: int) -> float | None:
+        """再送までの待ち時間（再送しない場合は None）"""
+        if attempts > self.max_retries:
+            return None
+
+        if isinstance(error, discord.RateLimited):
+            return float(error.retry_after)
+        if isinstance(error, discord.HTTPException):
+            if error.status == 429:
+                retry_after = getattr(error.response, "headers", {}).get("Retry-After")
+                if retry_after:
+                    return float(retry_after)
+            elif self.is_permanent(error):
+                # 権限不足・チャンネル削除などは再送しても成功しない
+                return None
+
+        # 5xx・通信エラーは指数バックオフで再送
+        return float(self.backoff * 2 ** (attempts - 1))
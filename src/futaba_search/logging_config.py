@@ -1,14 +1,195 @@
-"""ロギング設定モジュール"""
+"""ロギング設定モジュール
 
+ログの書き込み（ファイル・コンソールへの出力）はイベントループを止めないよう
+専用スレッド（QueueListener）で行う。ロガーを呼び出した側は上限付きの待ち行列に
+レコードを入れるだけだが、メッセージの組み立て（% 形式の引数の展開）と
+例外のトレースバックの文字列化は、引数が後から変更されても記録時点の内容を
+残せるよう呼び出し側で行う。待ち行列が満杯の場合はレコードを破棄し、空きが
+できた時点で破棄した件数を WARNING として出力する。
+"""
+
+import atexit
+import copy
+import json
 import logging
+import queue
 import sys
+from datetime import datetime
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
 from pathlib import Path
+from typing import Any, TextIO
+
+from .config import (
+    LOG_BACKUP_COUNT,
+    LOG_FORMAT,
+    LOG_MAX_BYTES,
+    LOG_QUEUE_POLICY,
+    LOG_QUEUE_SIZE,
+    LOG_ROTATION,
+    LOG_ROTATION_WHEN,
+)
+
+# LogRecord の標準の属性（JSON では extra で渡された属性だけを追加で出力する）
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+    | {"message", "asctime", "taskName"}
+)
+
+# 呼び出し側でトレースバックを文字列にするためのフォーマッター
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+# 書き込みスレッド（setup_logging で作り直す）
+_listener: QueueListener | None = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """満杯なら待たずにレコードを破棄する QueueHandler
+
+    policy:
+        drop_new: 新しいレコードを破棄する（既に積まれたログの順序を保つ）
+        drop_old: 最も古いレコードを破棄して新しいレコードを入れる
+    """
+
+    def __init__(self, log_queue: "queue.Queue[Any]", policy: str = "drop_new") -> None:
+        if policy not in ("drop_new", "drop_old"):
+            raise ValueError(f"不明なログの破棄方針です: {policy}")
+        super().__init__(log_queue)
+        self._queue = log_queue
+        self.policy = policy
+        # 破棄したレコードの総数と、まだ報告していない件数
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """記録時点のメッセージとトレースバックを文字列にしたコピーを作成
+
+        標準の QueueHandler.prepare と同様に args と exc_info を消して、
+        書き込みスレッドが呼び出し側のオブジェクトに触れないようにする。
+        フォーマッターの適用は書き込みスレッドのハンドラーに任せる。
+        """
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+    def _put(self, record: logging.LogRecord) -> bool:
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            pass
+        if self.policy == "drop_old":
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            self._unreported += 1
+            try:
+                self._queue.put_nowait(record)
+                return True
+            except queue.Full:
+                pass
+        self.dropped += 1
+        self._unreported += 1
+        return False
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._unreported and not self._queue.full():
+            dropped, self._unreported = self._unreported, 0
+            notice = logging.LogRecord(
+                __name__,
+                logging.WARNING,
+                __file__,
+                0,
+                "ログの待ち行列が満杯のため%d件のログを破棄しました",
+                (dropped,),
+                None,
+            )
+            if not self._put(notice):
+                self._unreported += dropped
+        self._put(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコードを1行の JSON にするフォーマッター
+
+    time・level・logger・message に加えて、extra で渡された属性と
+    例外のトレースバックを出力する。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created)
+            .astimezone()
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _file_handler(
+    log_file: str, rotation: str, max_bytes: int, backup_count: int, when: str
+) -> logging.Handler:
+    """ローテーション方式に応じたファイルハンドラーを作成"""
+    if rotation == "size":
+        return RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+    if rotation == "time":
+        return TimedRotatingFileHandler(
+            log_file, when=when, backupCount=backup_count, encoding="utf-8"
+        )
+    if rotation == "none":
+        return logging.FileHandler(log_file, encoding="utf-8")
+    raise ValueError(f"不明なログのローテーション方式です: {rotation}")
+
+
+def stop_logging() -> None:
+    """書き込みスレッドを止め、待ち行列に残ったログを書き出す"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
 
 def setup_logging(
     level: str = "INFO",
     log_file: str | None = None,
     format_string: str | None = None,
+    log_format: str = LOG_FORMAT,
+    rotation: str = LOG_ROTATION,
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT,
+    when: str = LOG_ROTATION_WHEN,
+    queue_size: int = LOG_QUEUE_SIZE,
+    queue_policy: str = LOG_QUEUE_POLICY,
+    stream: TextIO | None = None,
 ) -> None:
     """
     アプリケーション全体のロギングを設定
@@ -16,8 +197,17 @@ def setup_logging(
     Args:
         level: ログレベル (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: ログファイルのパス（Noneの場合はコンソールのみ）
-        format_string: ログフォーマット文字列
+        format_string: ログフォーマット文字列（text 形式の場合）
+        log_format: text または json（1行1レコードの JSON）
+        rotation: ログファイルのローテーション方式（size, time, none）
+        max_bytes: size の場合に切り替えるファイルサイズ
+        backup_count: 残す古いログファイルの数
+        when: time の場合に切り替える間隔（TimedRotatingFileHandler の when）
+        queue_size: 書き込み待ちの上限（0 なら待ち行列を使わず同期的に書き込む）
+        queue_policy: 待ち行列が満杯の場合の破棄方針（drop_new, drop_old）
+        stream: コンソールの出力先（Noneの場合は標準出力）
     """
+    global _listener
     if format_string is None:
         format_string = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
@@ -28,28 +218,45 @@ def setup_logging(
     root_logger = logging.getLogger()
     root_logger.setLevel(numeric_level)
 
-    # 既存のハンドラーをクリア
+    # 既存のハンドラーと書き込みスレッドをクリア
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    stop_logging()
 
     # フォーマッターを作成
-    formatter = logging.Formatter(format_string)
+    formatter: logging.Formatter
+    if log_format == "json":
+        formatter = JsonFormatter()
+    elif log_format == "text":
+        formatter = logging.Formatter(format_string)
+    else:
+        raise ValueError(f"不明なログ形式です: {log_format}")
 
     # コンソールハンドラーを設定
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(numeric_level)
-    console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    console_handler = logging.StreamHandler(stream or sys.stdout)
+    handlers: list[logging.Handler] = [console_handler]
 
     # ファイルハンドラーを設定（指定された場合）
     if log_file:
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(
+            _file_handler(log_file, rotation, max_bytes, backup_count, when)
+        )
 
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
-        file_handler.setLevel(numeric_level)
-        file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+    for handler in handlers:
+        handler.setLevel(numeric_level)
+        handler.setFormatter(formatter)
+
+    if queue_size > 0:
+        # 呼び出し側は待ち行列に入れるだけにし、書き込みは専用スレッドで行う
+        log_queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+        root_logger.addHandler(DroppingQueueHandler(log_queue, queue_policy))
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
 
     # discord.pyのログレベルを調整（通常は少し高めに設定）
     discord_logger = logging.getLogger("discord")
@@ -68,6 +275,10 @@ def setup_logging(
         aiohttp_logger.setLevel(logging.WARNING)
 
 
+# 終了時に待ち行列に残ったログを書き出す
+atexit.register(stop_logging)
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     指定された名前のロガーを取得
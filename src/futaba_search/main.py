@@ -3,8 +3,19 @@
 import argparse
 import sys
 
+from .bench import add_arguments as add_bench_arguments
+from .bench import run_bench
+from .boards import MONITORED_BOARDS
 from .bot import run_bot
-from .config import LOG_FILE, LOG_LEVEL
+from .catalog_service import run_catalog_service
+from .config import (
+    CATALOG_SOCKET,
+    LOG_FILE,
+    LOG_FORMAT,
+    LOG_LEVEL,
+    METRICS_PORT,
+    SHARD_COUNT,
+)
 from .logging_config import setup_logging
 
 
@@ -18,6 +29,13 @@ def parse_args() -> argparse.Namespace:
   %(prog)s --log-level DEBUG        # DEBUGレベルで実行
   %(prog)s --log-file /tmp/bot.log  # ログファイルを指定
   %(prog)s --console-only           # コンソールのみに出力
+  %(prog)s --log-format json        # 1行1レコードのJSONで出力
+  %(prog)s --metrics-port 9100      # 計測値を http://127.0.0.1:9100/metrics で公開
+  %(prog)s --shards 4                # 4つのワーカープロセスで購読を分担
+  %(prog)s bench --subscriptions 10000
+                                    # 記録・合成したカタログでオフラインのベンチマーク
+  %(prog)s catalog-service --socket /run/futaba/catalog.sock
+                                    # カタログを1回だけ取得して複数のボットに配る
 """,
     )
 
@@ -40,6 +58,29 @@ def parse_args() -> argparse.Namespace:
         help="コンソールのみにログを出力（ファイルには出力しない）",
     )
 
+    parser.add_argument(
+        "--log-format",
+        default=LOG_FORMAT,
+        choices=["text", "json"],
+        help=f"ログの形式を指定 (デフォルト: {LOG_FORMAT})",
+    )
+
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="計測値を Prometheus 形式で公開するポート（0 なら計測しない, "
+        f"デフォルト: {METRICS_PORT}）",
+    )
+
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=SHARD_COUNT,
+        help="購読をチャンネルIDで分担するワーカープロセスの数（カタログの取得は"
+        f"1回のまま, デフォルト: {SHARD_COUNT}）",
+    )
+
     parser.add_argument(
         "--version",
         action="version",
@@ -47,7 +88,32 @@ def parse_args() -> argparse.Namespace:
         help="バージョン情報を表示",
     )
 
-    return parser.parse_args()
+    subparsers = parser.add_subparsers(
+        dest="command", metavar="{bench,catalog-service}"
+    )
+    bench_parser = subparsers.add_parser(
+        "bench",
+        help="記録・合成したカタログを再生して監視処理を計測（ネットワーク不要）",
+        description="記録・合成したカタログを再生して監視処理を計測し、結果をJSONで出力",
+    )
+    add_bench_arguments(bench_parser)
+
+    service_parser = subparsers.add_parser(
+        "catalog-service",
+        help="カタログを1回だけ取得し、Unixソケットで複数のボットに配る",
+        description="カタログを1回だけ取得し、CATALOG_SOCKET を指定したボットに"
+        "Unixソケットで配る（Discordには接続しない）",
+    )
+    service_parser.add_argument(
+        "--socket",
+        default=CATALOG_SOCKET,
+        help="待ち受ける Unix ソケットのパス（デフォルト: CATALOG_SOCKET）",
+    )
+
+    args = parser.parse_args()
+    if args.command == "catalog-service" and not args.socket:
+        parser.error("catalog-service には --socket か CATALOG_SOCKET の指定が必要です")
+    return args
 
 
 def main() -> None:
@@ -57,10 +123,29 @@ def main() -> None:
 
         # ログ設定を初期化
         log_file = None if args.console_only else args.log_file
-        setup_logging(level=args.log_level, log_file=log_file)
+        log_options = {
+            "level": args.log_level,
+            "log_file": log_file,
+            "log_format": args.log_format,
+        }
+        if args.command == "bench":
+            # 計測結果の JSON を標準出力に出すため、ログは標準エラー出力に出す
+            setup_logging(**log_options, stream=sys.stderr)
+            run_bench(args)
+            return
+
+        setup_logging(**log_options)
+
+        if args.command == "catalog-service":
+            run_catalog_service(args.socket, MONITORED_BOARDS, args.metrics_port)
+            return
 
         # ボットを実行
-        run_bot()
+        run_bot(
+            metrics_port=args.metrics_port,
+            shards=args.shards,
+            log_options=log_options,
+        )
 
     except KeyboardInterrupt:
         print("\nボットを停止しました。")
@@ -0,0 +1,192 @@
+"""複数キーワードの一括マッチング（Aho-Corasick法）"""
+
+import re
+from collections import deque
+from collections.abc import Iterable
+
+from .logging_config import get_logger
+from .query import (
+    Node,
+    Pattern,
+    Term,
+    evaluate,
+    iter_terms,
+    parse_subscription,
+    required_terms,
+)
+
+logger = get_logger(__name__)
+
+
+class KeywordMatcher:
+    """購読キーワードをまとめてコンパイルしたマッチャー
+
+    全購読から一度だけ構築し、スレッドごとの検索テキストを1回走査するだけで
+    マッチした全キーワードと、その通知先チャンネルを返す。
+
+    - 部分一致の語（式に含まれる語を含む）は1つのAho-Corasickオートマトンにまとめる
+    - 先頭の文字列が分かる正規表現は、その文字列がオートマトンで見つかった場合のみ
+      評価する。それ以外の正規表現は1つの選択（|）にまとめた正規表現で先に判定し、
+      どれかにマッチした場合のみ個別に確かめる
+    - 式は、オートマトンで見つかった語を手がかりに評価が必要なものだけを評価する
+    """
+
+    def __init__(self, subscriptions: Iterable[tuple[int, str]]) -> None:
+        # キーワード -> 購読しているチャンネルIDの集合
+        self.channels: dict[str, set[int]] = {}
+        for channel_id, keyword in subscriptions:
+            self.channels.setdefault(keyword, set()).add(channel_id)
+
+        # 部分一致の語 -> その語だけからなる購読キーワード
+        self._literals: dict[str, list[str]] = {}
+        # 正規表現の購読（先頭の文字列 -> 正規表現 / まとめた正規表現で先に判定するもの
+        # / 常に個別に判定するもの）
+        self._prefixed_patterns: dict[str, list[tuple[str, re.Pattern[str]]]] = {}
+        self._patterns: list[tuple[str, re.Pattern[str]]] = []
+        self._grouped_patterns: list[tuple[str, re.Pattern[str]]] = []
+        self._prefilter: re.Pattern[str] | None = None
+        # 式の購読と、評価のきっかけになる語 -> 式の番号
+        self._expressions: list[tuple[str, Node]] = []
+        self._triggers: dict[str, list[int]] = {}
+        # どの語が含まれていなくても真になりうるため、常に評価する式
+        self._always: list[int] = []
+
+        terms: set[str] = set()
+        for keyword in self.channels:
+            try:
+                node = parse_subscription(keyword)
+            except ValueError as e:
+                logger.warning(
+                    "購読キーワードを解釈できないため無視します: %s: %s", keyword, e
+                )
+                continue
+            if isinstance(node, Term):
+                self._literals.setdefault(node.text, []).append(keyword)
+                terms.add(node.text)
+            elif isinstance(node, Pattern) and node.prefix:
+                self._prefixed_patterns.setdefault(node.prefix, []).append(
+                    (keyword, node.regex)
+                )
+                terms.add(node.prefix)
+            elif isinstance(node, Pattern):
+                self._add_pattern(keyword, node.regex)
+            else:
+                index = len(self._expressions)
+                self._expressions.append((keyword, node))
+                terms.update(iter_terms(node))
+                required = required_terms(node)
+                if required is None:
+                    self._always.append(index)
+                else:
+                    terms.update(required)
+                    for term in required:
+                        self._triggers.setdefault(term, []).append(index)
+        self._build_prefilter()
+
+        # ノードごとの遷移表・失敗リンク・出力（マッチする語）
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[tuple[str, ...]] = [()]
+        self._build(terms)
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    def _add_pattern(self, keyword: str, regex: re.Pattern[str]) -> None:
+        # 番号付きのグループを持つ正規表現は、まとめると後方参照の番号がずれる
+        if regex.groups:
+            self._grouped_patterns.append((keyword, regex))
+        else:
+            self._patterns.append((keyword, regex))
+
+    def _build_prefilter(self) -> None:
+        """正規表現の購読を1つの選択（|）にまとめる"""
+        if not self._patterns:
+            return
+        combined = "|".join(f"(?:{regex.pattern})" for _, regex in self._patterns)
+        try:
+            self._prefilter = re.compile(combined, re.IGNORECASE)
+        except re.error:
+            # 途中にフラグを含むパターンなどはまとめられないため個別に判定する
+            self._grouped_patterns.extend(self._patterns)
+            self._patterns = []
+
+    def _build(self, terms: Iterable[str]) -> None:
+        """トライを構築し、幅優先探索で失敗リンクを張る"""
+        outputs: list[list[str]] = [[]]
+
+        for pattern in terms:
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                node = next_node
+            outputs[node].append(pattern)
+
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                outputs[child].extend(outputs[self._fail[child]])
+
+        self._output = [tuple(keywords) for keywords in outputs]
+
+    def match(self, text: str) -> dict[str, set[int]]:
+        """テキストにマッチした全キーワードと購読チャンネルを返す
+
+        Args:
+            text: normalize_text で正規化済みの検索対象テキスト
+
+        Returns:
+            マッチしたキーワード -> 購読チャンネルIDの集合
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        # テキストに含まれていた部分一致の語
+        found: set[str] = set()
+
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+
+        matched: set[str] = set()
+        for term in found:
+            matched.update(self._literals.get(term, ()))
+            for keyword, regex in self._prefixed_patterns.get(term, ()):
+                if regex.search(text):
+                    matched.add(keyword)
+
+        if self._prefilter is not None and self._prefilter.search(text):
+            matched.update(
+                keyword for keyword, regex in self._patterns if regex.search(text)
+            )
+        matched.update(
+            keyword for keyword, regex in self._grouped_patterns if regex.search(text)
+        )
+
+        if self._expressions:
+            candidates = set(self._always)
+            for term in found:
+                candidates.update(self._triggers.get(term, ()))
+            for index in candidates:
+                keyword, expression = self._expressions[index]
+                if evaluate(expression, found, text):
+                    matched.add(keyword)
+
+        return {keyword: self.channels[keyword] for keyword in matched}
@@ -0,0 +1,372 @@
+"""処理時間・件数の計測と Prometheus 形式での公開
+
+カウンター・ゲージ・ヒストグラムを REGISTRY に登録し、--metrics-port を
+指定した場合のみ計測を有効にしてローカルの HTTP エンドポイント（/metrics）で
+Prometheus のテキスト形式で公開する。
+
+無効な場合は各計測が enabled を確認するだけで戻るため、監視処理への影響はほぼない。
+"""
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Sequence
+from contextlib import AbstractContextManager, nullcontext
+from types import TracebackType
+
+from aiohttp import web
+
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 処理時間（秒）のヒストグラムの既定の区切り
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 計測が無効な場合のタイマー（時刻を取得しない）
+_NULL_TIMER = nullcontext()
+
+
+def _escape(value: str) -> str:
+    """ラベル値のエスケープ（\\, ", 改行）"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """ラベルの組ごとの値を持つ計測値の基底クラス
+
+    DB のエグゼキュータースレッドからも計測するため、子の追加と公開用の
+    スナップショットの取得は _lock で保護する。
+    """
+
+    kind = ""
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _child(self, values: tuple[str, ...]) -> object:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name}: ラベルの数が一致しません "
+                    f"({len(values)} != {len(self.labelnames)})"
+                )
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _items(self) -> list[tuple[tuple[str, ...], object]]:
+        """ラベルの組と値の一覧（ラベル順のスナップショット）"""
+        with self._lock:
+            items = list(self._children.items())
+        return sorted(items, key=lambda item: item[0])
+
+    @abstractmethod
+    def _new_child(self) -> object:
+        """ラベルの組ごとの値を新しく作成"""
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]:
+        """サンプル行"""
+
+    def render(self) -> list[str]:
+        """HELP・TYPE 行と全てのサンプル行"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+
+class Counter(_Metric):
+    """増える一方の件数"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        """ラベルの組（labelnames の順）の値を amount 増やす"""
+        if not self._registry.enabled:
+            return
+        child = self._child(labels)
+        assert isinstance(child, _Value)
+        child.value += amount
+
+    def value(self, *labels: str) -> float:
+        child = self._children.get(labels)
+        return child.value if isinstance(child, _Value) else 0.0
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._items():
+            assert isinstance(child, _Value)
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    """増減する現在値"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        """ラベルの組（labelnames の順）の値を設定"""
+        if not self._registry.enabled:
+            return
+        child = self._child(labels)
+        assert isinstance(child, _Value)
+        child.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Timer:
+    """with ブロックの処理時間をヒストグラムに記録する"""
+
+    __slots__ = ("_histogram", "_labels", "_started")
+
+    def __init__(self, histogram: "Histogram", labels: tuple[str, ...]) -> None:
+        self._histogram = histogram
+        self._labels = labels
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        _exc_type: type[BaseException] | None,
+        _exc_val: BaseException | None,
+        _exc_tb: TracebackType | None,
+    ) -> None:
+        self._histogram.observe(time.perf_counter() - self._started, *self._labels)
+
+
+class Histogram(_Metric):
+    """値（主に処理時間）の分布"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(len(self.buckets) + 1)
+
+    def observe(self, value: float, *labels: str) -> None:
+        """ラベルの組（labelnames の順）に値を1つ記録"""
+        if not self._registry.enabled:
+            return
+        child = self._child(labels)
+        assert isinstance(child, _HistogramValue)
+        child.counts[bisect.bisect_left(self.buckets, value)] += 1
+        child.sum += value
+        child.count += 1
+
+    def time(self, *labels: str) -> AbstractContextManager[object]:
+        """with ブロックの処理時間を記録するタイマー"""
+        if not self._registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        child = self._children.get(labels)
+        return child.count if isinstance(child, _HistogramValue) else 0
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._items():
+            assert isinstance(child, _HistogramValue)
+            cumulative = 0
+            for bound, count in zip(
+                (*self.buckets, float("inf")), child.counts, strict=True
+            ):
+                cumulative += count
+                labels = _format_labels(
+                    (*self.labelnames, "le"), (*values, _format_value(bound))
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    """計測値の登録簿
+
+    collector は公開の直前に呼び出され、スケジューラーやディスパッチャーの
+    統計のように、その時点の値をゲージに反映するために使う。
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"{metric.name}: 別の種類で登録済みです")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = self._register(Counter(self, name, help, labelnames))
+        assert isinstance(metric, Counter)
+        return metric
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        metric = self._register(Gauge(self, name, help, labelnames))
+        assert isinstance(metric, Gauge)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = self._register(Histogram(self, name, help, labelnames, buckets))
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """公開の直前に呼び出す関数を追加"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """全ての計測値を Prometheus のテキスト形式で出力"""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error("計測値の収集でエラーが発生: %s", e, exc_info=True)
+
+        lines: list[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+# アプリケーション全体で共有する登録簿（--metrics-port の指定で有効になる）
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """計測値を /metrics で公開するHTTPサーバー"""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        host: str = "127.0.0.1",
+        port: int = 9100,
+    ) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    async def _handle(self, _request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registry.render().encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+    async def start(self) -> None:
+        """サーバーを起動（port が 0 の場合は空いているポートを使う）"""
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        await site.start()
+        self._runner = runner
+        # 実際に割り当てられたポートを反映する
+        for address in runner.addresses:
+            if isinstance(address, tuple):
+                self.port = address[1]
+                break
+        logger.info("計測値を公開: http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
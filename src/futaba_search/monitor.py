@@ -1,83 +1,350 @@
 """ふたばチャンネルの監視機能"""
 
-from typing import Any
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, Protocol, TypeVar
 
 import aiohttp
 
-from .config import FUTABA_API_URL
+from .boards import BOARDS, DEFAULT_BOARD, Board
+from .catalog_service import CatalogSubscription
+from .config import (
+    HTTP_CONNECTION_LIMIT,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_TIMEOUT,
+)
 from .logging_config import get_logger
+from .metrics import REGISTRY
+from .query import evaluate, iter_terms, parse_subscription
+from .streaming import CatalogStreamParser
+from .thread import Thread, threads_from_api
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
 
-class FutabaMonitor:
-    """新しいスレッドのためにふたばチャンネルを監視"""
+# レスポンス本文を読み込む単位（バイト）
+STREAM_CHUNK_SIZE = 64 * 1024
+
+FETCH_SECONDS = REGISTRY.histogram(
+    "futaba_fetch_seconds",
+    "カタログの取得にかかった時間（本文の読み込みを含む）",
+    ("board",),
+)
+FETCH_TOTAL = REGISTRY.counter(
+    "futaba_fetch_total",
+    "カタログの取得回数（status は HTTP ステータスか error）",
+    ("board", "status"),
+)
+PARSE_SECONDS = REGISTRY.histogram(
+    "futaba_parse_seconds", "カタログの解析にかかった時間", ("board",)
+)
+
+
+@dataclass
+class CatalogDiffStats:
+    """1ティック分のカタログ差分の集計"""
+
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+class CatalogSnapshot:
+    """前回取得したカタログのスナップショット
+
+    スレッドIDごとにタイトルと題名のハッシュだけを保持し、
+    新規または本文が変化したスレッドのみをマッチング対象として返す。
+    """
 
     def __init__(self) -> None:
-        self.session: aiohttp.ClientSession | None = None
+        self._hashes: dict[int, int] = {}
+        self.last_stats = CatalogDiffStats()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def reset(self) -> None:
+        """スナップショットを破棄（次回は全スレッドが新規扱いになる）"""
+        self._hashes.clear()
+
+    def diff(self, threads: list[Thread]) -> list[Thread]:
+        """前回との差分を計算し、スナップショットを今回のカタログに更新
+
+        Returns:
+            新規または本文が変化したスレッドのリスト
+        """
+        stats = CatalogDiffStats()
+        previous = self._hashes
+        current: dict[int, int] = {}
+        delta: list[Thread] = []
+
+        for thread in threads:
+            thread_id = thread.id
+            text_hash = hash((thread.title, thread.subject))
+            current[thread_id] = text_hash
+
+            old_hash = previous.get(thread_id)
+            if old_hash is None:
+                stats.new += 1
+                delta.append(thread)
+            elif old_hash != text_hash:
+                stats.changed += 1
+                delta.append(thread)
+            else:
+                stats.unchanged += 1
+
+        stats.removed = len(previous.keys() - current.keys())
+        self._hashes = current
+        self.last_stats = stats
+        return delta
+
+
+class CatalogSource(Protocol):
+    """監視処理にカタログを渡すもの（FutabaMonitor やシャードのワーカーが受け取ったカタログ）"""
+
+    # 直近の取得でカタログに変化がなかったか
+    not_modified: bool
+
+    def clear_validators(self) -> None: ...
+
+    async def stream_threads(self) -> list[Thread] | None: ...
+
+
+def create_session() -> aiohttp.ClientSession:
+    """キープアライブ接続を再利用する長寿命セッションを作成"""
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_CONNECTION_LIMIT, keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+    )
+
+
+class FutabaMonitor:
+    """新しいスレッドのためにふたばチャンネルの板1つを監視
+
+    catalog_socket を指定するとクライアントモードになり、ふたばには
+    アクセスせずにカタログ配信サービス（catalog_service）から受け取る。
+    """
+
+    def __init__(
+        self,
+        api_url: str | None = None,
+        session: aiohttp.ClientSession | None = None,
+        board: Board | None = None,
+        catalog_socket: str | None = None,
+    ) -> None:
+        self.board = board or BOARDS[DEFAULT_BOARD]
+        self.api_url = api_url or self.board.catalog_url
+        self.session = session
+        # 外部から渡されたセッションは閉じない
+        self._owns_session = session is None
+        # カタログ配信サービスのソケットと購読（クライアントモードの場合）
+        self.catalog_socket = catalog_socket
+        self._subscription: CatalogSubscription | None = None
+
+        # 条件付きリクエスト用のバリデータ
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        # 直近の取得が 304 Not Modified だったか
+        self.not_modified = False
 
     async def __aenter__(self) -> "FutabaMonitor":
-        self.session = aiohttp.ClientSession()
+        await self.start()
         return self
 
     async def __aexit__(self, _exc_type: Any, _exc_val: Any, _exc_tb: Any) -> None:
-        if self.session:
+        await self.close()
+
+    async def start(self) -> None:
+        """キープアライブ接続を再利用する長寿命セッションを作成
+
+        クライアントモードではふたばにアクセスしないためセッションは作らない。
+        """
+        if self.session is None and not self.catalog_socket:
+            self.session = create_session()
+            self._owns_session = True
+
+    async def close(self) -> None:
+        """所有しているセッションとサービスへの接続を閉じる"""
+        if self.session and self._owns_session:
             await self.session.close()
+        self.session = None
+        if self._subscription is not None:
+            await self._subscription.close()
+            self._subscription = None
 
-    async def fetch_threads(self) -> dict[str, Any] | None:
-        """ふたばAPIからスレッドデータを取得"""
+    def clear_validators(self) -> None:
+        """バリデータを破棄し、次回は無条件にカタログ全体を取得する"""
+        self.etag = None
+        self.last_modified = None
+        if self._subscription is not None:
+            self._subscription.replay()
+
+    def _conditional_headers(self) -> dict[str, str]:
+        """If-None-Match / If-Modified-Since ヘッダーを構築"""
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def _store_validators(self, response: aiohttp.ClientResponse) -> None:
+        """レスポンスの ETag / Last-Modified を次回のために保存"""
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+    async def _request(
+        self, read: Callable[[aiohttp.ClientResponse], Awaitable[T]]
+    ) -> T | None:
+        """条件付きリクエストを送り、200 の場合のみ read で本文を読む
+
+        前回から変化がない場合（304 Not Modified）は None を返し、
+        not_modified を True にする。
+        """
         if not self.session:
             raise RuntimeError(
                 "セッションが初期化されていません。asyncコンテキストマネージャーを使用してください。"
             )
 
+        self.not_modified = False
+        board = self.board.name
+        started = time.perf_counter()
+        status = "error"
         try:
-            async with self.session.get(FUTABA_API_URL) as response:
-                if response.status == 200:
-                    json_data: dict[str, Any] = await response.json()
-                    return json_data
+            async with self.session.get(
+                self.api_url, headers=self._conditional_headers()
+            ) as response:
+                status = str(response.status)
+                if response.status == 304:
+                    self.not_modified = True
+                    logger.debug("%s: カタログに変化なし: HTTP 304", self.board.name)
+                    return None
+                elif response.status == 200:
+                    result = await read(response)
+                    self._store_validators(response)
+                    return result
                 else:
-                    logger.warning(f"スレッドの取得に失敗: HTTP {response.status}")
+                    logger.warning(
+                        "%s: スレッドの取得に失敗: HTTP %s",
+                        self.board.name,
+                        response.status,
+                    )
                     return None
         except Exception as e:
-            logger.error(f"スレッド取得中にエラーが発生: {e}", exc_info=True)
+            status = "error"
+            logger.error(
+                "%s: スレッド取得中にエラーが発生: %s",
+                self.board.name,
+                e,
+                exc_info=True,
+            )
             return None
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - started, board)
+            FETCH_TOTAL.inc(1, board, status)
 
-    def parse_threads(self, data: dict[str, Any]) -> list[dict[str, Any]]:
-        """ふたばAPIレスポンスからスレッドデータを解析"""
-        threads: list[dict[str, Any]] = []
+    async def fetch_threads(self) -> dict[str, Any] | None:
+        """ふたばAPIからスレッドデータを取得"""
 
-        if "res" not in data:
+        async def read_json(response: aiohttp.ClientResponse) -> dict[str, Any]:
+            json_data: dict[str, Any] = await response.json()
+            return json_data
+
+        return await self._request(read_json)
+
+    async def stream_threads(self) -> list[Thread] | None:
+        """ふたばAPIのレスポンスを逐次解析してスレッドデータを取得
+
+        fetch_threads + parse_threads と同じ結果を返すが、
+        レスポンス全体を文字列や辞書として保持しない。
+        クライアントモードではサービスから受け取った最新のカタログを返す。
+        """
+        if self.catalog_socket:
+            return await self._receive_threads(self.catalog_socket)
+
+        async def read_stream(
+            response: aiohttp.ClientResponse,
+        ) -> list[Thread]:
+            parser = CatalogStreamParser(response.charset or "utf-8")
+            board = self.board.name
+            threads: list[Thread] = []
+            # 受信待ちを除いた解析時間だけを積算する
+            parse_seconds = 0.0
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                started = time.perf_counter()
+                threads.extend(threads_from_api(parser.feed(chunk), board))
+                parse_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+            threads.extend(threads_from_api(parser.close(), board))
+            parse_seconds += time.perf_counter() - started
+            PARSE_SECONDS.observe(parse_seconds, board)
             return threads
 
-        for thread_id, thread_data in data["res"].items():
-            # スレッド情報を抽出
-            com = thread_data.get("com", "")
-            now = thread_data.get("now", "")
-            name = thread_data.get("name", "")
-            sub = thread_data.get("sub", "")
-
-            # 利用可能な場合は画像URLを構築
-            thumb_url = None
-            if thread_data.get("thumb"):
-                thumb_url = f"https://may.2chan.net{thread_data['thumb']}"
-            elif thread_data.get("src"):
-                thumb_url = f"https://may.2chan.net{thread_data['src']}"
-
-            threads.append(
-                {
-                    "id": thread_id,
-                    "title": com,
-                    "subject": sub,
-                    "name": name,
-                    "timestamp": now,
-                    "thumb_url": thumb_url,
-                }
+        return await self._request(read_stream)
+
+    async def _receive_threads(self, path: str) -> list[Thread] | None:
+        """カタログ配信サービスから前回以降に更新されたカタログを受け取る
+
+        更新がなければ 304 と同じく not_modified にして None を返す。
+        接続が切れている場合は接続し直し、カタログ全体を受け取り直す。
+        サービスがこの板を配信していない場合やまだカタログを取得していない
+        場合は、待たずに取得の失敗として扱う。
+        """
+        self.not_modified = False
+        board = self.board.name
+        subscription = self._subscription
+        if subscription is None or not subscription.connected:
+            if subscription is not None:
+                await subscription.close()
+            subscription = CatalogSubscription(path, board)
+            try:
+                await subscription.connect()
+            except (OSError, ValueError) as e:
+                logger.warning("%s: カタログ配信サービスに接続できません: %s", board, e)
+                FETCH_TOTAL.inc(1, board, "error")
+                return None
+            self._subscription = subscription
+            logger.info("%s: カタログ配信サービスに接続しました: %s", board, path)
+
+        if not subscription.synced and not subscription.ready:
+            logger.debug(
+                "%s: カタログ配信サービスがまだカタログを取得していません", board
             )
+            FETCH_TOTAL.inc(1, board, "error")
+            return None
+        if not await subscription.wait_synced(HTTP_TIMEOUT):
+            logger.warning("%s: カタログ配信サービスからカタログが届きません", board)
+            FETCH_TOTAL.inc(1, board, "error")
+            return None
 
+        threads = subscription.take()
+        if threads is None:
+            self.not_modified = True
+            FETCH_TOTAL.inc(1, board, "304")
+            return None
+        FETCH_TOTAL.inc(1, board, "200")
         return threads
 
-    def check_keyword_match(self, thread: dict, keyword: str) -> bool:
-        """スレッドがキーワードにマッチするかチェック"""
-        searchable_text = f"{thread['title']} {thread['subject']}".lower()
-        return keyword.lower() in searchable_text
+    def parse_threads(self, data: dict[str, Any]) -> list[Thread]:
+        """ふたばAPIレスポンスからスレッドデータを解析"""
+        if "res" not in data or not isinstance(data["res"], dict):
+            return []
+
+        with PARSE_SECONDS.time(self.board.name):
+            return threads_from_api(data["res"].items(), self.board.name)
+
+    def check_keyword_match(self, thread: Thread, keyword: str) -> bool:
+        """スレッドがキーワード（正規表現・式を含む）にマッチするかチェック"""
+        try:
+            node = parse_subscription(keyword)
+        except ValueError:
+            return False
+        text = thread.search_text
+        found = {term for term in iter_terms(node) if term in text}
+        return evaluate(node, found, text)
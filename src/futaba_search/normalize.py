@@ -0,0 +1,45 @@
+"""キーワード照合用のテキスト正規化"""
+
+import html
+import re
+import unicodedata
+from functools import lru_cache
+
+# 正規化結果を覚えておく件数（全ての板のカタログに載るスレッド数より十分大きくする）
+NORMALIZE_CACHE_SIZE = 1 << 16
+
+_BR_PATTERN = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_TAG_PATTERN = re.compile(r"<[^>]*>")
+_SPACE_PATTERN = re.compile(r"\s+")
+
+# カタカナ（ァ〜ヶ）を対応するひらがなに変換する表
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text: str) -> str:
+    """キーワード照合のためにテキストを正規化
+
+    1. <br> を空白に置き換え、その他のHTMLタグを取り除く
+    2. HTMLエンティティ（&gt; 等）を文字に戻す
+    3. NFKC 正規化（全角英数字・半角カナなどの表記ゆれをそろえる）
+    4. 大文字・小文字の区別をなくす（casefold）
+    5. カタカナをひらがなにそろえる
+    6. 連続する空白を1つにまとめる
+
+    同じ本文のスレッドはティックごとに取得し直されるため、結果をキャッシュして
+    1つのスレッドにつき正規化が1回で済むようにする。
+    """
+    text = _TAG_PATTERN.sub("", _BR_PATTERN.sub(" ", text))
+    text = unicodedata.normalize("NFKC", html.unescape(text))
+    text = text.casefold().translate(_KATAKANA_TO_HIRAGANA)
+    return _SPACE_PATTERN.sub(" ", text).strip()
+
+
+def normalize_pattern(pattern: str) -> str:
+    """正規表現のパターンを正規化済みテキストに合わせる（NFKC・カタカナのひらがな化）
+
+    casefold は \\W → \\w のように特殊シーケンスの意味を変えてしまうため行わない。
+    大文字・小文字はコンパイル時の re.IGNORECASE で区別しないようにする。
+    """
+    return unicodedata.normalize("NFKC", pattern).translate(_KATAKANA_TO_HIRAGANA)
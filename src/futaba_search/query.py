@@ -0,0 +1,292 @@
+"""購読キーワードの解析（部分一致・正規表現・AND/OR/NOT 式）
+
+購読キーワードは次のいずれかとして解釈する。
+
+- 部分一致: 通常のキーワード（例: ``猫``、``猫 画像``、``WAR AND PEACE``）
+- 正規表現: ``re:`` で始まるキーワード（例: ``re:ねこ|いぬ``）
+- 式: ``expr:`` で始まり AND / OR / NOT（大文字）で語を組み合わせたキーワード
+  （例: ``expr:猫 AND (画像 OR 動画) AND NOT 実況``）
+
+式の中では、空白を含む語を ``"..."`` で、正規表現を ``re:...`` または
+``re:"..."`` で書ける。AND は省略でき、隣り合う語は AND で結ばれる。
+``re:`` / ``expr:`` で始まる語を部分一致で購読する場合は先頭に ``\\`` を付ける
+（例: ``\\re:ゼロ``）。
+"""
+
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+
+from .normalize import normalize_pattern, normalize_text
+
+REGEX_PREFIX = "re:"
+EXPRESSION_PREFIX = "expr:"
+# 続く文字列を部分一致の語として扱う（接頭辞で始まる語を購読するため）
+LITERAL_PREFIX = "\\"
+# 正規表現の最大文字数（極端に重いパターンの登録を避ける）
+MAX_PATTERN_LENGTH = 200
+
+_REGEX_SPECIAL = frozenset(".^$*+?{}[]\\|()")
+_OPERATORS = frozenset({"AND", "OR", "NOT"})
+
+
+@dataclass(frozen=True, slots=True)
+class Term:
+    """部分一致する語（normalize_text で正規化済み）"""
+
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class Pattern:
+    """正規表現
+
+    prefix はマッチするテキストに必ず含まれる先頭の文字列（分からなければ空）で、
+    マッチャーはこの文字列が見つかった場合のみ正規表現を評価する。
+    """
+
+    regex: re.Pattern[str]
+    prefix: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class And:
+    children: tuple["Node", ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Or:
+    children: tuple["Node", ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Not:
+    child: "Node"
+
+
+Node = Term | Pattern | And | Or | Not
+
+
+def literal_prefix(pattern: str) -> str:
+    """正規表現の先頭にある、特殊文字を含まない文字列
+
+    トップレベル以外も含めて選択（|）を含むパターンでは先頭が決まらないため空を返す。
+    """
+    if "|" in pattern:
+        return ""
+    end = 0
+    while end < len(pattern) and pattern[end] not in _REGEX_SPECIAL:
+        end += 1
+    prefix = pattern[:end]
+    # 直後が *, ?, {m,n} の文字は省略されうる
+    if end < len(pattern) and pattern[end] in "*?{":
+        prefix = prefix[:-1]
+    return prefix.casefold()
+
+
+def compile_pattern(source: str) -> Pattern:
+    """正規表現をコンパイル（不正なパターンは ValueError）"""
+    if not source:
+        raise ValueError("正規表現が空です")
+    if len(source) > MAX_PATTERN_LENGTH:
+        raise ValueError(f"正規表現は{MAX_PATTERN_LENGTH}文字以内で指定してください")
+    pattern = normalize_pattern(source)
+    try:
+        regex = re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"正規表現が不正です: {e}") from e
+    return Pattern(regex, literal_prefix(pattern))
+
+
+def _make_term(text: str) -> Term:
+    normalized = normalize_text(text)
+    if not normalized:
+        raise ValueError("空の語は指定できません")
+    return Term(normalized)
+
+
+def _tokenize(expression: str) -> list[tuple[str, str]]:
+    """式を (種類, 値) の列に分割（種類は "(" / ")" / "word" / "phrase" / "regex"）"""
+    tokens: list[tuple[str, str]] = []
+    position = 0
+    length = len(expression)
+    while position < length:
+        char = expression[position]
+        if char.isspace():
+            position += 1
+            continue
+        if char in "()":
+            tokens.append((char, char))
+            position += 1
+            continue
+
+        regex = expression.startswith(REGEX_PREFIX, position)
+        start = position + len(REGEX_PREFIX) if regex else position
+        if start < length and expression[start] == '"':
+            end = expression.find('"', start + 1)
+            if end < 0:
+                raise ValueError("引用符が閉じられていません")
+            value = expression[start + 1 : end]
+            position = end + 1
+            kind = "regex" if regex else "phrase"
+        else:
+            end = start
+            while (
+                end < length
+                and not expression[end].isspace()
+                and expression[end] not in '()"'
+            ):
+                end += 1
+            value = expression[start:end]
+            position = end
+            kind = "regex" if regex else "word"
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    """式の再帰下降パーサー（優先順位は NOT > AND > OR）"""
+
+    def __init__(self, tokens: list[tuple[str, str]]) -> None:
+        self.tokens = tokens
+        self.position = 0
+
+    def parse(self) -> Node:
+        node = self._or()
+        if self.position < len(self.tokens):
+            raise ValueError(f"式を解析できません: {self.tokens[self.position][1]}")
+        return node
+
+    def _peek(self) -> tuple[str, str] | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _is_operator(self, token: tuple[str, str] | None, operator: str) -> bool:
+        return token is not None and token == ("word", operator)
+
+    def _or(self) -> Node:
+        children = [self._and()]
+        while self._is_operator(self._peek(), "OR"):
+            self.position += 1
+            children.append(self._and())
+        return children[0] if len(children) == 1 else Or(tuple(children))
+
+    def _and(self) -> Node:
+        children = [self._unary()]
+        while True:
+            token = self._peek()
+            if token is None or token[0] == ")" or self._is_operator(token, "OR"):
+                break
+            if self._is_operator(token, "AND"):
+                self.position += 1
+            children.append(self._unary())
+        return children[0] if len(children) == 1 else And(tuple(children))
+
+    def _unary(self) -> Node:
+        token = self._peek()
+        if token is None:
+            raise ValueError("式が途中で終わっています")
+        self.position += 1
+
+        kind, value = token
+        if self._is_operator(token, "NOT"):
+            return Not(self._unary())
+        if kind == "(":
+            node = self._or()
+            if self._peek() != (")", ")"):
+                raise ValueError("括弧が閉じられていません")
+            self.position += 1
+            return node
+        if kind == ")" or (kind == "word" and value in _OPERATORS):
+            raise ValueError(f"式を解析できません: {value}")
+        if kind == "regex":
+            return compile_pattern(value)
+        return _make_term(value)
+
+
+@lru_cache(maxsize=4096)
+def parse_subscription(keyword: str) -> Node:
+    """購読キーワードを解析（解釈できないキーワードは ValueError）
+
+    同じキーワードはマッチャーを作り直すたびに解析されるため、結果をキャッシュする。
+    """
+    keyword = keyword.strip()
+    if keyword.startswith(EXPRESSION_PREFIX):
+        return _Parser(_tokenize(keyword[len(EXPRESSION_PREFIX) :])).parse()
+    if keyword.startswith(REGEX_PREFIX):
+        return compile_pattern(keyword[len(REGEX_PREFIX) :])
+    return _make_term(keyword.removeprefix(LITERAL_PREFIX))
+
+
+def normalize_keyword(keyword: str) -> str:
+    """購読として登録する形にそろえる
+
+    部分一致のキーワードは正規化した形にし、式・正規表現は解析できることを
+    確かめたうえで入力どおりに登録する（不正なキーワードは ValueError）。
+    正規化で接頭辞の形になった部分一致の語（``Re：ゼロ`` など）は、
+    読み込み直しても部分一致になるよう ``\\`` を付けて登録する。
+    """
+    node = parse_subscription(keyword)
+    if isinstance(node, Term):
+        if node.text.startswith((REGEX_PREFIX, EXPRESSION_PREFIX, LITERAL_PREFIX)):
+            return LITERAL_PREFIX + node.text
+        return node.text
+    return keyword.strip()
+
+
+def iter_terms(node: Node) -> Iterator[str]:
+    """式に含まれる部分一致の語（NOT の中も含む）"""
+    if isinstance(node, Term):
+        yield node.text
+    elif isinstance(node, And | Or):
+        for child in node.children:
+            yield from iter_terms(child)
+    elif isinstance(node, Not):
+        yield from iter_terms(node.child)
+
+
+def required_terms(node: Node) -> frozenset[str] | None:
+    """式が真になるために、少なくとも1つは含まれている必要がある語
+
+    どの語も含まれていなくても真になりうる場合（NOT や先頭の文字列が分からない
+    正規表現）は None。
+    """
+    if isinstance(node, Term):
+        return frozenset((node.text,))
+    if isinstance(node, Pattern):
+        return frozenset((node.prefix,)) if node.prefix else None
+    if isinstance(node, And):
+        candidates = [
+            terms for terms in map(required_terms, node.children) if terms is not None
+        ]
+        return min(candidates, key=len) if candidates else None
+    if isinstance(node, Or):
+        union: set[str] = set()
+        for child in node.children:
+            terms = required_terms(child)
+            if terms is None:
+                return None
+            union.update(terms)
+        return frozenset(union)
+    return None
+
+
+def evaluate(node: Node, found: set[str] | frozenset[str], text: str) -> bool:
+    """式を評価
+
+    Args:
+        node: 解析済みの式
+        found: text に含まれていた部分一致の語
+        text: normalize_text で正規化済みの検索対象テキスト
+    """
+    if isinstance(node, Term):
+        return node.text in found
+    if isinstance(node, Pattern):
+        return node.regex.search(text) is not None
+    if isinstance(node, And):
+        return all(evaluate(child, found, text) for child in node.children)
+    if isinstance(node, Or):
+        return any(evaluate(child, found, text) for child in node.children)
+    return not evaluate(node.child, found, text)
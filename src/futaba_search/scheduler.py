@@ -0,0 +1,226 @@
+"""複数の板を並行して監視するスケジューラー"""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterable
+
+import aiohttp
+
+from .boards import Board
+from .config import (
+    MONITOR_ADAPTIVE,
+    MONITOR_MAX_INTERVAL,
+    MONITOR_MIN_INTERVAL,
+    MONITOR_TARGET_NEW_THREADS,
+)
+from .logging_config import get_logger
+from .monitor import FutabaMonitor, create_session
+
+logger = get_logger(__name__)
+
+# 監視処理は取得した新規スレッド数を返す（取得できなかった場合は None）
+BoardHandler = Callable[[Board, FutabaMonitor], Awaitable[int | None]]
+
+
+class AdaptiveInterval:
+    """新規スレッドの増え方から次の監視間隔を決める
+
+    1秒あたりの新規スレッド数を指数移動平均で見積もり、1回の取得で
+    見つかる新規スレッドがおよそ target 件になる間隔を選ぶ。
+    スレッドが次々に立つ時間帯は間隔を短くして通知までの時間を縮め、
+    落ち着いている時間帯は間隔を延ばして取得回数を減らす。
+    1回の調整での変化は半分〜2倍までとし、minimum〜maximum の範囲に収める。
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        minimum: float = MONITOR_MIN_INTERVAL,
+        maximum: float = MONITOR_MAX_INTERVAL,
+        target: float = MONITOR_TARGET_NEW_THREADS,
+        smoothing: float = 0.3,
+    ) -> None:
+        if not 0 < minimum <= maximum:
+            raise ValueError("監視間隔の下限・上限が不正です")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = target
+        self.smoothing = smoothing
+        self.interval = self._clamp(initial)
+        # 1秒あたり・1回の取得あたりの新規スレッド数（指数移動平均）
+        self.rate: float | None = None
+        self.new_per_fetch = 0.0
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.maximum, max(self.minimum, interval))
+
+    def observe(self, new_threads: int, elapsed: float) -> float:
+        """前回の取得から elapsed 秒で見つかった新規スレッド数を反映し、次の間隔を返す"""
+        rate = new_threads / max(elapsed, 1e-3)
+        if self.rate is None:
+            self.rate = rate
+            self.new_per_fetch = float(new_threads)
+        else:
+            self.rate += self.smoothing * (rate - self.rate)
+            self.new_per_fetch += self.smoothing * (new_threads - self.new_per_fetch)
+
+        proposed = self.target / self.rate if self.rate > 0 else self.maximum
+        # 一時的な増減で間隔が大きく振れないよう、変化幅を制限する
+        proposed = min(self.interval * 2, max(self.interval / 2, proposed))
+        self.interval = self._clamp(proposed)
+        return self.interval
+
+    def stats(self) -> dict[str, float]:
+        """現在の監視間隔と新規スレッド数の見積もり"""
+        return {
+            "interval": self.interval,
+            "new_threads_per_fetch": self.new_per_fetch,
+            "new_threads_per_second": self.rate or 0.0,
+        }
+
+
+class BoardScheduler:
+    """板ごとのタスクで監視処理を定期実行する
+
+    - 全ての板で1つのセッション（接続プール）を共有する
+    - 板ごとに独立したタスクで動くため、遅い板が他の板の監視を遅らせない
+    - 監視間隔は板ごとに設定でき、最初の開始時刻は 0〜jitter 秒、以降の各回は
+      ±jitter/2 秒のランダムな分だけずらす（平均の間隔は設定どおりになる）
+    - adaptive の場合は新規スレッドの増え方に合わせて板ごとに間隔を調整する
+    """
+
+    def __init__(
+        self,
+        boards: Iterable[Board],
+        handler: BoardHandler,
+        session: aiohttp.ClientSession | None = None,
+        adaptive: bool = MONITOR_ADAPTIVE,
+        min_interval: float = MONITOR_MIN_INTERVAL,
+        max_interval: float = MONITOR_MAX_INTERVAL,
+        catalog_socket: str | None = None,
+    ) -> None:
+        self.boards = list(boards)
+        # 指定した場合はカタログ配信サービスから受け取る（ふたばにはアクセスしない）
+        self.catalog_socket = catalog_socket
+        self.handler = handler
+        self.session = session
+        # 外部から渡されたセッションは閉じない
+        self._owns_session = session is None
+        self.monitors: dict[str, FutabaMonitor] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+        # 板ごとの実行回数（計測用）
+        self.runs: dict[str, int] = {board.name: 0 for board in self.boards}
+        # 板ごとの監視間隔の調整（adaptive でなければ空）
+        self.intervals: dict[str, AdaptiveInterval] = {}
+        if adaptive:
+            self.intervals = {
+                board.name: AdaptiveInterval(board.interval, min_interval, max_interval)
+                for board in self.boards
+            }
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """共有セッションを作成し、板ごとの監視タスクを起動
+
+        クライアントモード（catalog_socket を指定）ではセッションを作らない。
+        """
+        if self._tasks:
+            return
+        if self.session is None and not self.catalog_socket:
+            self.session = create_session()
+            self._owns_session = True
+
+        for board in self.boards:
+            monitor = FutabaMonitor(
+                session=self.session, board=board, catalog_socket=self.catalog_socket
+            )
+            self.monitors[board.name] = monitor
+            self._tasks.append(
+                asyncio.create_task(
+                    self._run_board(board, monitor), name=f"monitor-{board.name}"
+                )
+            )
+        logger.info(
+            "%s個の板の監視を開始: %s",
+            len(self.boards),
+            ", ".join(board.name for board in self.boards),
+        )
+
+    async def stop(self) -> None:
+        """監視タスクを停止し、所有しているセッションを閉じる"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for monitor in self.monitors.values():
+            await monitor.close()
+        if self.session and self._owns_session:
+            await self.session.close()
+            self.session = None
+
+    def interval(self, board: Board) -> float:
+        """板の現在の監視間隔"""
+        adaptive = self.intervals.get(board.name)
+        return adaptive.interval if adaptive else board.interval
+
+    def next_delay(self, board: Board, elapsed: float) -> float:
+        """次の監視までの待ち時間
+
+        処理にかかった時間を差し引いて開始時刻の間隔を保ち、±jitter/2 秒の
+        範囲でずらす（平均すると監視間隔は設定どおりになる）。
+        """
+        jitter = random.uniform(-board.jitter / 2, board.jitter / 2)
+        return max(0.0, self.interval(board) - elapsed + jitter)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """板ごとの実行回数・監視間隔・新規スレッド数の見積もり"""
+        stats: dict[str, dict[str, float]] = {}
+        for board in self.boards:
+            board_stats: dict[str, float] = {
+                "runs": self.runs[board.name],
+                "interval": self.interval(board),
+            }
+            adaptive = self.intervals.get(board.name)
+            if adaptive:
+                board_stats.update(adaptive.stats())
+            stats[board.name] = board_stats
+        return stats
+
+    async def _run_board(self, board: Board, monitor: FutabaMonitor) -> None:
+        """1つの板の監視を間隔を空けて繰り返す"""
+        await asyncio.sleep(random.uniform(0, board.jitter))
+        adaptive = self.intervals.get(board.name)
+        # 前回カタログを取得できた時刻（新規スレッド数の増え方の計算に使う）
+        last_fetched: float | None = None
+        while True:
+            started = time.monotonic()
+            new_threads: int | None = None
+            try:
+                new_threads = await self.handler(board, monitor)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    "%s: 監視中にエラーが発生: %s", board.name, e, exc_info=True
+                )
+            self.runs[board.name] += 1
+
+            if adaptive and new_threads is not None:
+                if last_fetched is not None:
+                    previous = adaptive.interval
+                    adaptive.observe(new_threads, started - last_fetched)
+                    if adaptive.interval != previous:
+                        logger.debug(
+                            "%s: 監視間隔を調整: %.1f秒 -> %.1f秒 (新規%s件)",
+                            board.name,
+                            previous,
+                            adaptive.interval,
+                            new_threads,
+                        )
+                last_fetched = started
+
+            await asyncio.sleep(self.next_delay(board, time.monotonic() - started))
@@ -0,0 +1,364 @@
+"""購読を複数のワーカープロセスに分けて処理するシャーディング
+
+--shards N を指定すると、親プロセス（コーディネーター）が板ごとのカタログを
+1回だけ取得し、解析済みのスレッドをパイプで全てのワーカーに送る。
+各ワーカーは Discord のシャード（shard_id / shard_count）として接続し、
+channel_id % N が自分の番号と一致するチャンネルの購読・ミュート状態・
+通知履歴だけをメモリに持ってマッチングと送信を行う。
+
+板への取得回数はワーカーの数によらず1板あたり1回のままになる。
+"""
+
+import asyncio
+import multiprocessing
+import pickle
+import threading
+from collections.abc import Awaitable, Callable, Coroutine, Iterable
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any
+
+from .boards import Board
+from .config import CATALOG_SOCKET, METRICS_HOST
+from .logging_config import get_logger
+from .metrics import REGISTRY, MetricsServer
+from .monitor import CatalogSource, FutabaMonitor
+from .scheduler import BoardScheduler
+from .thread import Thread
+
+logger = get_logger(__name__)
+
+# ワーカー側の監視処理（BoardScheduler の handler と同じ形）
+RelayHandler = Callable[[Board, CatalogSource], Awaitable[int | None]]
+
+# 停止時にワーカーの終了を待つ秒数（過ぎたら強制終了する）
+WORKER_STOP_TIMEOUT = 30.0
+
+RELAYED_TOTAL = REGISTRY.counter(
+    "futaba_shard_relayed_total",
+    "ワーカーに送ったカタログの数（not_modified は 304 の通知）",
+    ("board", "kind"),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """ワーカーの番号（0 から count - 1）とワーカーの総数"""
+
+    index: int
+    count: int
+
+    def __post_init__(self) -> None:
+        if not 0 <= self.index < self.count:
+            raise ValueError(f"シャード番号が不正です: {self.index}/{self.count}")
+
+    @property
+    def primary(self) -> bool:
+        """全体で1回だけ行う処理（コマンドの同期・検索対象の記録）を担当するか"""
+        return self.index == 0
+
+    def owns(self, channel_id: int) -> bool:
+        """チャンネルの購読・通知をこのワーカーが担当するか"""
+        return channel_id % self.count == self.index
+
+
+def shard_log_file(log_file: str | None, shard: Shard) -> str | None:
+    """ワーカーごとのログファイル（futaba_search.log → futaba_search.shard1.log）"""
+    if not log_file:
+        return None
+    path = Path(log_file)
+    return str(path.with_name(f"{path.stem}.shard{shard.index}{path.suffix}"))
+
+
+class RelayedCatalog:
+    """コーディネーターから届いたカタログを FutabaMonitor と同じ形で渡す
+
+    stream_threads は前回の呼び出し以降に届いた最新のカタログを返し、
+    届いていなければ 304 と同じく not_modified にして None を返す。
+    clear_validators の後は最後に届いたカタログをもう一度返す（全件の再評価用）。
+    """
+
+    def __init__(self, board: Board) -> None:
+        self.board = board
+        self.not_modified = False
+        self._latest: list[Thread] | None = None
+        self._pending = False
+
+    def push(self, threads: list[Thread] | None) -> None:
+        """届いたカタログを保持（None は取得側で変化がなかったことを表す）"""
+        if threads is not None:
+            self._latest = threads
+            self._pending = True
+
+    def clear_validators(self) -> None:
+        self._pending = self._latest is not None
+
+    async def stream_threads(self) -> list[Thread] | None:
+        if self._pending:
+            self._pending = False
+            self.not_modified = False
+            return self._latest
+        self.not_modified = self._latest is not None
+        return None
+
+
+class CatalogReceiver:
+    """コーディネーターから届いたカタログで板ごとの監視処理を実行する（ワーカー側）
+
+    BoardScheduler の代わりに使い、カタログが届くたびに板ごとのタスクで
+    handler を呼び出す。処理中に複数届いた場合は最新のものだけを評価する。
+    パイプの受信と展開は専用スレッドで行い、イベントループを止めない。
+    """
+
+    def __init__(
+        self,
+        boards: Iterable[Board],
+        handler: RelayHandler,
+        connection: Connection,
+        on_closed: Callable[[], Coroutine[Any, Any, None]] | None = None,
+    ) -> None:
+        self.boards = list(boards)
+        self.handler = handler
+        self.connection = connection
+        # コーディネーターがパイプを閉じたときに呼び出す（ボットの終了など）
+        self.on_closed = on_closed
+        self.catalogs = {board.name: RelayedCatalog(board) for board in self.boards}
+        self._events = {board.name: asyncio.Event() for board in self.boards}
+        self._tasks: list[asyncio.Task[None]] = []
+        self._reader: threading.Thread | None = None
+        self._closed_task: asyncio.Task[None] | None = None
+        # 板ごとの受信数と実行回数（計測用）
+        self.received: dict[str, int] = {board.name: 0 for board in self.boards}
+        self.runs: dict[str, int] = {board.name: 0 for board in self.boards}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """受信スレッドと板ごとの監視タスクを起動"""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        for board in self.boards:
+            self._tasks.append(
+                asyncio.create_task(self._run_board(board), name=f"relay-{board.name}")
+            )
+        self._reader = threading.Thread(
+            target=self._read, args=(loop,), name="futaba-relay", daemon=True
+        )
+        self._reader.start()
+        logger.info(
+            "%s個の板のカタログの受信を開始: %s",
+            len(self.boards),
+            ", ".join(board.name for board in self.boards),
+        )
+
+    async def stop(self) -> None:
+        """監視タスクを停止（受信スレッドはデーモンのためプロセスと共に終わる）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """板ごとの受信数・実行回数"""
+        return {
+            board.name: {
+                "received": self.received[board.name],
+                "runs": self.runs[board.name],
+            }
+            for board in self.boards
+        }
+
+    def _read(self, loop: asyncio.AbstractEventLoop) -> None:
+        """パイプからカタログを受け取り、イベントループに渡す（受信スレッド）"""
+        while True:
+            try:
+                board_name, threads = pickle.loads(self.connection.recv_bytes())
+            except (EOFError, OSError):
+                break
+            loop.call_soon_threadsafe(self._deliver, board_name, threads)
+        loop.call_soon_threadsafe(self._closed)
+
+    def _deliver(self, board_name: str, threads: list[Thread] | None) -> None:
+        catalog = self.catalogs.get(board_name)
+        if catalog is None:
+            return
+        catalog.push(threads)
+        self.received[board_name] += 1
+        self._events[board_name].set()
+
+    def _closed(self) -> None:
+        logger.info("コーディネーターとの接続が閉じられました")
+        if self.on_closed is not None and self._closed_task is None:
+            self._closed_task = asyncio.create_task(self.on_closed())
+
+    async def _run_board(self, board: Board) -> None:
+        """カタログが届くたびに1つの板の監視処理を実行"""
+        catalog = self.catalogs[board.name]
+        event = self._events[board.name]
+        while True:
+            await event.wait()
+            event.clear()
+            try:
+                await self.handler(board, catalog)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    "%s: 監視中にエラーが発生: %s", board.name, e, exc_info=True
+                )
+            self.runs[board.name] += 1
+
+
+class CatalogFanout:
+    """カタログを1回だけ取得し、全てのワーカーに送る（コーディネーター側）
+
+    BoardScheduler の handler として使う。解析済みのスレッドは1回だけ
+    pickle して全てのワーカーに同じバイト列を送る。304 の場合も None を送り、
+    ワーカーはミュート解除などの状態の変化をいつもの間隔で反映できる。
+    """
+
+    def __init__(self, connections: Iterable[Connection]) -> None:
+        self.connections = list(connections)
+        # 板ごとの前回のスレッドID（新規スレッド数の計算に使う）
+        self._previous: dict[str, set[int]] = {}
+        self.closed = asyncio.Event()
+
+    async def publish(self, board: Board, monitor: FutabaMonitor) -> int | None:
+        """カタログを取得してワーカーに送り、新規スレッド数を返す"""
+        threads = await monitor.stream_threads()
+        if threads is None and not monitor.not_modified:
+            logger.debug("%s: スレッドデータの取得に失敗、送信をスキップ", board.name)
+            return None
+
+        new_threads: int | None = 0
+        if threads is not None:
+            ids = {thread.id for thread in threads}
+            previous = self._previous.get(board.name)
+            new_threads = len(ids - previous) if previous is not None else None
+            self._previous[board.name] = ids
+        RELAYED_TOTAL.inc(
+            1, board.name, "catalog" if threads is not None else "not_modified"
+        )
+
+        payload = pickle.dumps((board.name, threads), pickle.HIGHEST_PROTOCOL)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(None, connection.send_bytes, payload)
+                for connection in self.connections
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, OSError):
+                logger.error("ワーカーにカタログを送れません: %s", result)
+                self.closed.set()
+            elif isinstance(result, BaseException):
+                raise result
+        return new_threads
+
+
+async def _coordinate(
+    boards: Iterable[Board],
+    processes: list[multiprocessing.process.BaseProcess],
+    connections: list[Connection],
+    metrics_port: int = 0,
+) -> None:
+    """いずれかのワーカーが終了するまでカタログの取得と送信を続ける"""
+    fanout = CatalogFanout(connections)
+    # カタログ配信サービスを指定した場合はコーディネーターもサービスから受け取る
+    scheduler = BoardScheduler(boards, fanout.publish, catalog_socket=CATALOG_SOCKET)
+    metrics_server: MetricsServer | None = None
+    if metrics_port:
+        REGISTRY.enabled = True
+        metrics_server = MetricsServer(REGISTRY, METRICS_HOST, metrics_port)
+
+    # ワーカーの終了はプロセスの sentinel が読み込み可能になることで検知する
+    loop = asyncio.get_running_loop()
+    exited: asyncio.Future[Any] = loop.create_future()
+
+    def on_exit(name: str) -> None:
+        if not exited.done():
+            exited.set_result(name)
+
+    for process in processes:
+        loop.add_reader(process.sentinel, on_exit, process.name)
+    closed: asyncio.Future[Any] = asyncio.ensure_future(fanout.closed.wait())
+    try:
+        if metrics_server:
+            try:
+                await metrics_server.start()
+            except OSError as e:
+                logger.error("計測値の公開を開始できません: %s", e)
+        await scheduler.start()
+        await asyncio.wait([exited, closed], return_when=asyncio.FIRST_COMPLETED)
+        if exited.done():
+            logger.warning(
+                "%s が終了したため全てのワーカーを停止します", exited.result()
+            )
+    finally:
+        for process in processes:
+            loop.remove_reader(process.sentinel)
+        closed.cancel()
+        await scheduler.stop()
+        if metrics_server:
+            await metrics_server.stop()
+
+
+def run_shards(
+    shard_count: int,
+    target: Callable[..., Any],
+    args: tuple[Any, ...] = (),
+    boards: Iterable[Board] = (),
+    metrics_port: int = 0,
+) -> int:
+    """ワーカープロセスを起動し、終了するまでカタログを配信する
+
+    各ワーカーでは target(Shard, Connection, *args) を実行する。
+    いずれかのワーカーが終了した場合は、パイプを閉じて残りのワーカーにも
+    終了を促す。metrics_port を指定するとコーディネーターの計測値
+    （カタログの取得・解析）を公開する。
+
+    Returns:
+        終了コード（異常終了したワーカーがあればその終了コード）
+    """
+    if shard_count < 1:
+        raise ValueError(f"ワーカーの数が不正です: {shard_count}")
+    context = multiprocessing.get_context("spawn")
+    processes: list[multiprocessing.process.BaseProcess] = []
+    connections: list[Connection] = []
+    for index in range(shard_count):
+        receiver, sender = context.Pipe(duplex=False)
+        worker = context.Process(
+            target=target,
+            args=(Shard(index, shard_count), receiver, *args),
+            name=f"futaba-shard-{index}",
+        )
+        worker.start()
+        receiver.close()
+        processes.append(worker)
+        connections.append(sender)
+    logger.info("%s個のワーカーを起動しました", shard_count)
+
+    try:
+        asyncio.run(_coordinate(boards, processes, connections, metrics_port))
+    finally:
+        # パイプを閉じるとワーカーは受信スレッドで検知して終了する
+        for connection in connections:
+            connection.close()
+        for process in processes:
+            process.join(WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                logger.warning("%s が終了しないため強制終了します", process.name)
+                process.terminate()
+                process.join()
+
+    exit_codes = [process.exitcode or 0 for process in processes]
+    for process, code in zip(processes, exit_codes, strict=True):
+        if code:
+            logger.error("%s が異常終了しました（終了コード %s）", process.name, code)
+    return next((code for code in exit_codes if code), 0)
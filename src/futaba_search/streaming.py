@@ -0,0 +1,160 @@
+"""futaba.php カタログJSONの逐次解析"""
+
+import codecs
+import json
+from enum import Enum, auto
+from typing import Any
+
+_WHITESPACE = " \t\n\r"
+# 完結した値の直後に現れうる文字
+_DELIMITERS = _WHITESPACE + ",:}]"
+
+
+class _State(Enum):
+    START = auto()
+    TOP_KEY = auto()
+    TOP_COLON = auto()
+    TOP_VALUE = auto()
+    RES_START = auto()
+    RES_KEY = auto()
+    RES_COLON = auto()
+    RES_VALUE = auto()
+    DONE = auto()
+
+
+class CatalogStreamParser:
+    """カタログJSONをチャンク単位で読み、res 内のスレッドを1件ずつ取り出す
+
+    レスポンス全体を文字列やネストした辞書として保持せず、
+    res 以外のトップレベルの値は読み捨てる。
+
+    使用例:
+        parser = CatalogStreamParser()
+        for chunk in chunks:
+            for thread_id, thread_data in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self, encoding: str = "utf-8") -> None:
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._buffer = ""
+        self._pos = 0
+        self._state = _State.START
+        self._key = ""
+
+    def feed(self, chunk: bytes) -> list[tuple[str, dict[str, Any]]]:
+        """チャンクを追加し、完結したスレッドを (スレッドID, データ) で返す"""
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._consume(final=False)
+
+    def close(self) -> list[tuple[str, dict[str, Any]]]:
+        """残りのデータを解析して終了する
+
+        Raises:
+            ValueError: JSONが途中で途切れている、または不正な場合
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        items = self._consume(final=True)
+        if self._state is not _State.DONE:
+            raise ValueError("カタログJSONが途中で終了しています")
+        return items
+
+    def _skip_whitespace(self) -> bool:
+        """空白を読み飛ばし、次の文字があれば True を返す"""
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _expect(self, char: str) -> None:
+        if self._buffer[self._pos] != char:
+            raise ValueError(
+                f"カタログJSONの解析に失敗: 位置{self._pos}で '{char}' が必要です"
+            )
+        self._pos += 1
+
+    def _decode_value(self, final: bool) -> tuple[bool, Any]:
+        """現在位置から値を1つデコード（データ不足なら (False, None)）"""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise ValueError("カタログJSONの値を解析できません") from None
+            return False, None
+        if not final and (
+            end == len(self._buffer) or self._buffer[end] not in _DELIMITERS
+        ):
+            # 数値は途中で途切れていても解析できてしまうため、区切り文字まで待つ
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _consume(self, final: bool) -> list[tuple[str, dict[str, Any]]]:
+        items: list[tuple[str, dict[str, Any]]] = []
+
+        while self._state is not _State.DONE and self._skip_whitespace():
+            char = self._buffer[self._pos]
+            state = self._state
+
+            if state is _State.START:
+                self._expect("{")
+                self._state = _State.TOP_KEY
+
+            elif state is _State.TOP_KEY or state is _State.RES_KEY:
+                if char == ",":
+                    self._pos += 1
+                    continue
+                if char == "}":
+                    self._pos += 1
+                    self._state = (
+                        _State.DONE if state is _State.TOP_KEY else _State.TOP_KEY
+                    )
+                    continue
+                complete, key = self._decode_value(final)
+                if not complete:
+                    break
+                self._key = str(key)
+                self._state = (
+                    _State.TOP_COLON if state is _State.TOP_KEY else _State.RES_COLON
+                )
+
+            elif state is _State.TOP_COLON:
+                self._expect(":")
+                self._state = (
+                    _State.RES_START if self._key == "res" else _State.TOP_VALUE
+                )
+
+            elif state is _State.RES_COLON:
+                self._expect(":")
+                self._state = _State.RES_VALUE
+
+            elif state is _State.RES_START:
+                if char == "{":
+                    self._pos += 1
+                    self._state = _State.RES_KEY
+                else:
+                    # スレッドがない場合は空配列が返ることがある
+                    self._state = _State.TOP_VALUE
+
+            elif state is _State.TOP_VALUE:
+                complete, _ = self._decode_value(final)
+                if not complete:
+                    break
+                self._state = _State.TOP_KEY
+
+            elif state is _State.RES_VALUE:
+                complete, value = self._decode_value(final)
+                if not complete:
+                    break
+                if isinstance(value, dict):
+                    items.append((self._key, value))
+                self._state = _State.RES_KEY
+
+        # 読み終えた部分を捨ててバッファを小さく保つ
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        return items
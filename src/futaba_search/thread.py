@@ -0,0 +1,83 @@
+"""カタログ内のスレッドを表すレコード"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from .boards import BOARDS, DEFAULT_BOARD
+from .logging_config import get_logger
+from .normalize import normalize_text
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Thread:
+    """スレッド1件分のコンパクトなレコード
+
+    キーワード照合用の正規化済みテキストは解析時に一度だけ計算し、
+    サムネイルURLは参照されたときに組み立てる。
+    """
+
+    id: int
+    title: str
+    subject: str
+    name: str
+    timestamp: str
+    thumb_path: str | None
+    search_text: str
+    board: str = DEFAULT_BOARD
+
+    @classmethod
+    def from_api(
+        cls, thread_id: str, thread_data: dict[str, Any], board: str = DEFAULT_BOARD
+    ) -> "Thread":
+        """APIのスレッド1件分からレコードを作成
+
+        Raises:
+            ValueError: スレッドIDが数値でない場合
+        """
+        com = thread_data.get("com", "")
+        sub = thread_data.get("sub", "")
+        return cls(
+            id=int(thread_id),
+            title=com,
+            subject=sub,
+            name=thread_data.get("name", ""),
+            timestamp=thread_data.get("now", ""),
+            thumb_path=thread_data.get("thumb") or thread_data.get("src") or None,
+            search_text=normalize_text(f"{com} {sub}"),
+            board=board,
+        )
+
+    @property
+    def key(self) -> str:
+        """通知履歴に記録するスレッドキー（板ごとに一意）"""
+        return BOARDS[self.board].thread_key(self.id)
+
+    @property
+    def thumb_url(self) -> str | None:
+        """サムネイル（なければ元画像）のURL"""
+        if not self.thumb_path:
+            return None
+        return f"{BOARDS[self.board].base_url}{self.thumb_path}"
+
+
+def threads_from_api(
+    entries: Iterable[tuple[str, Any]], board: str = DEFAULT_BOARD
+) -> list[Thread]:
+    """APIの res の (スレッドID, データ) からレコードを作成
+
+    スレッドIDが数値でない、データがオブジェクトでないなど不正な要素は
+    ログに記録して読み飛ばし、他のスレッドの監視を続ける。
+    """
+    threads: list[Thread] = []
+    for thread_id, thread_data in entries:
+        if isinstance(thread_data, dict):
+            try:
+                threads.append(Thread.from_api(thread_id, thread_data, board))
+                continue
+            except ValueError:
+                pass
+        logger.warning("%s: 不正なスレッドを読み飛ばしました: %r", board, thread_id)
+    return threads
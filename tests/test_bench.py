@@ -0,0 +1,110 @@
+"""オフライン再生ベンチマークのテスト"""
+
+import json
+import sys
+
+import pytest
+
+from src.futaba_search.bench import (
+    STAGES,
+    FakeSink,
+    ReplayBenchmark,
+    generate_snapshots,
+    load_snapshots,
+    run_bench,
+    write_snapshots,
+)
+from src.futaba_search.database import AsyncFutabaDatabase, FutabaDatabase
+from src.futaba_search.main import parse_args
+
+
+def test_generate_snapshots_churn():
+    """合成したスナップショットで毎ティック指定数のスレッドが入れ替わることのテスト"""
+    snapshots = [
+        json.loads(snapshot)["res"]
+        for snapshot in generate_snapshots(3, threads=20, new_per_tick=4, seed=1)
+    ]
+
+    assert [len(catalog) for catalog in snapshots] == [20, 20, 20]
+    assert len(snapshots[1].keys() - snapshots[0].keys()) == 4
+    assert generate_snapshots(2, threads=5, seed=1) == generate_snapshots(
+        2, threads=5, seed=1
+    )
+
+
+def test_write_and_load_snapshots(tmp_path):
+    """保存したスナップショットがファイル名順に読み込まれることのテスト"""
+    snapshots = generate_snapshots(3, threads=5)
+    write_snapshots(tmp_path, snapshots)
+
+    assert load_snapshots(tmp_path) == snapshots
+    with pytest.raises(ValueError):
+        load_snapshots(tmp_path / "empty")
+
+
+@pytest.mark.asyncio
+async def test_replay_notifies_each_match_once(tmp_path):
+    """監視処理に流したスナップショットを再生し直しても通知が重複しないことのテスト"""
+    catalog = {
+        "res": {
+            "100": {"com": "猫の画像", "sub": "無念"},
+            "101": {"com": "犬の画像", "sub": "無念"},
+        }
+    }
+    snapshot = json.dumps(catalog, ensure_ascii=False).encode()
+    db = AsyncFutabaDatabase(FutabaDatabase(tmp_path / "bench.db"))
+    sink = FakeSink()
+    benchmark = ReplayBenchmark(db, [(1, "猫"), (2, "画像")], sink=sink)
+
+    await benchmark.run([snapshot], repeat=3)
+    report = benchmark.report()
+    # 通知履歴はボットの送信処理が記録する
+    assert await db.is_thread_notified("100", "猫", 1)
+    assert await db.is_thread_notified("101", "画像", 2)
+    db.close()
+
+    assert report["ticks"] == 3
+    assert report["bytes"] == len(snapshot) * 3
+    assert report["threads"] == 6
+    assert report["keywords"] == 2
+    assert report["notified"] == 3
+    assert sink.keys == 3
+    assert list(report["stages"]) == list(STAGES)
+    assert report["stages"]["parse"]["items"] == 6
+    assert report["stages"]["deliver"]["items"] == sink.notifications
+    assert report["tick_ms"]["p50"] <= report["tick_ms"]["p99"]
+
+
+def test_bench_command_outputs_json(tmp_path, monkeypatch, capsys):
+    """bench サブコマンドの引数解析と JSON 出力のテスト"""
+    output = tmp_path / "result.json"
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "futaba-search",
+            "bench",
+            "--ticks",
+            "3",
+            "--threads",
+            "50",
+            "--subscriptions",
+            "200",
+            "--channels",
+            "5",
+            "--database",
+            str(tmp_path / "bench.db"),
+            "--output",
+            str(output),
+        ],
+    )
+    args = parse_args()
+    assert args.command == "bench"
+
+    result = run_bench(args)
+
+    assert json.loads(capsys.readouterr().out) == result
+    assert json.loads(output.read_text(encoding="utf-8")) == result
+    assert result["source"] == "synthetic"
+    assert result["ticks"] == 3
+    assert result["peak_rss_mb"] > 0
@@ -0,0 +1,63 @@
+"""ブルームフィルターのテスト"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from src.futaba_search.bloom import BloomFilter, TimeBucketedBloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """追加したキーは必ず含まれると判定されることのテスト"""
+    bloom = BloomFilter.for_memory(4096, 1000)
+    keys = [(str(i), "テスト", 12345) for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate_within_estimate():
+    """偽陽性率が見積もりから大きく外れないことのテスト"""
+    bloom = BloomFilter.for_memory(2048, 1000)
+    for i in range(1000):
+        bloom.add((str(i), "テスト", 12345))
+
+    trials = 20_000
+    false_positives = sum(
+        (str(i), "テスト", 12345) in bloom for i in range(1000, 1000 + trials)
+    )
+
+    estimate = bloom.estimated_false_positive_rate()
+    assert false_positives / trials < estimate * 2 + 0.001
+
+
+def test_bloom_filter_rejects_tiny_size():
+    """小さすぎるサイズを指定するとエラーになることのテスト"""
+    with pytest.raises(ValueError):
+        BloomFilter(4, 1)
+
+
+def test_time_bucketed_filter_candidate_days_and_expiry():
+    """通知日ごとにフィルターが分かれ、古い日から捨てられることのテスト"""
+    today = date.today()
+    bloom = TimeBucketedBloomFilter(
+        memory_bytes=8 * 4096, retention_days=7, expected_per_day=100
+    )
+    bloom.load(
+        [
+            (("1", "テスト", 12345), today - timedelta(days=9)),
+            (("2", "テスト", 12345), today),
+        ]
+    )
+
+    assert bloom.loaded is True
+    assert bloom.candidate_days(("1", "テスト", 12345)) == [today - timedelta(days=9)]
+    assert bloom.candidate_days(("2", "テスト", 12345)) == [today]
+
+    assert bloom.expire(today - timedelta(days=7)) == 1
+    assert bloom.candidate_days(("1", "テスト", 12345)) == []
+    assert len(bloom) == 1
+    # メモリ量は保存日数 + 1日で等分される
+    assert bloom.memory_bytes == 4096
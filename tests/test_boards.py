@@ -0,0 +1,41 @@
+"""板の定義のテスト"""
+
+import pytest
+
+from src.futaba_search.boards import BOARDS, get_board, parse_boards
+
+
+def test_parse_boards():
+    """板の指定と板ごとの監視間隔が解析されることのテスト"""
+    boards = parse_boards("may, img:120,")
+
+    assert [board.name for board in boards] == ["may", "img"]
+    assert boards[0].interval == BOARDS["may"].interval
+    assert boards[1].interval == 120
+    assert boards[1].host == "img.2chan.net"
+
+
+def test_parse_boards_rejects_unknown_board():
+    """未知の板が指定された場合のテスト"""
+    with pytest.raises(ValueError):
+        parse_boards("may,unknown")
+    with pytest.raises(ValueError):
+        get_board("unknown")
+
+
+def test_board_urls():
+    """板ごとのスレッドURLと保存先リンクのテスト"""
+    may = BOARDS["may"]
+    img = BOARDS["img"]
+
+    assert may.thread_url(123) == "https://may.2chan.net/b/res/123.htm"
+    assert img.thread_url(123) == "https://img.2chan.net/b/res/123.htm"
+    assert img.catalog_url == "https://img.2chan.net/b/futaba.php?mode=json"
+    assert may.archive_urls(123) == [
+        ("ふたばフォレスト", "http://futabaforest.net/b/res/123.htm"),
+        (
+            "FTBucket",
+            "https://may.ftbucket.info/may/cont/may.2chan.net_b_res_123/index.htm",
+        ),
+    ]
+    assert img.archive_urls(123) == []
@@ -0,0 +1,210 @@
+"""Discordボットの通知埋め込みと通知履歴の記録のテスト"""
+
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from src.futaba_search.boards import BOARDS
+from src.futaba_search.bot import (
+    MAX_EMBED_CHARS_PER_MESSAGE,
+    MAX_EMBED_TITLE_LENGTH,
+    FutabaBot,
+    truncate,
+)
+from src.futaba_search.database import AsyncFutabaDatabase, FutabaDatabase
+from src.futaba_search.dispatcher import Notification
+from src.futaba_search.thread import Thread
+
+
+class StubChannel:
+    """送信された埋め込みを記録するチャンネルの代わり"""
+
+    def __init__(self) -> None:
+        self.messages: list[list] = []
+
+    async def send(self, embeds: list) -> None:
+        self.messages.append(embeds)
+
+
+def test_truncate():
+    """上限を超える文字列だけを「…」付きで切り詰めることのテスト"""
+    assert truncate("あいう", 3) == "あいう"
+    assert truncate("あいうえ", 3) == "あい…"
+
+
+def test_build_embed_truncates_long_keywords():
+    """キーワードが多くてもタイトルが Discord の上限に収まることのテスト"""
+    thread = Thread.from_api("123", {"com": "猫スレ"}, "may")
+    keywords = tuple(f"とても長いキーワード{index:02d}です" for index in range(30))
+
+    embed = FutabaBot.build_embed(thread, keywords)
+
+    assert embed.title is not None
+    assert len(embed.title) == MAX_EMBED_TITLE_LENGTH
+    assert embed.title.startswith("キーワード『とても長いキーワード00です』")
+    assert embed.title.endswith("…")
+    assert embed.description is not None and "猫スレ" in embed.description
+
+
+@pytest.mark.asyncio
+async def test_send_notifications_counts_truncated_titles():
+    """切り詰めた後の長さで1メッセージの文字数の上限に収めることのテスト"""
+    keywords = tuple(f"とても長いキーワード{index:02d}です" for index in range(30))
+    notifications = [
+        Notification(
+            None, Thread.from_api(str(index), {"com": "猫スレ"}, "may"), keywords
+        )
+        for index in range(10)
+    ]
+    bot = SimpleNamespace(
+        build_embed=FutabaBot.build_embed, _send_message=FutabaBot._send_message
+    )
+    channel = StubChannel()
+
+    await FutabaBot.send_notifications(bot, channel, notifications)  # type: ignore[arg-type]
+
+    assert sum(len(embeds) for embeds in channel.messages) == 10
+    for embeds in channel.messages:
+        assert all(len(embed.title) <= MAX_EMBED_TITLE_LENGTH for embed in embeds)
+        assert sum(len(embed) for embed in embeds) <= MAX_EMBED_CHARS_PER_MESSAGE
+
+
+class StubMonitor:
+    """毎回同じカタログを返す FutabaMonitor の代わり"""
+
+    def __init__(self, threads: list[Thread]) -> None:
+        self.threads = threads
+        self.not_modified = False
+
+    def clear_validators(self) -> None:
+        pass
+
+    async def stream_threads(self) -> list[Thread] | None:
+        return self.threads
+
+
+def make_bot(tmp_path, monkeypatch, send_notifications) -> FutabaBot:
+    """Discord に接続せず、送信を差し替えたボットを作成"""
+    bot = FutabaBot(db=AsyncFutabaDatabase(FutabaDatabase(tmp_path / "bot.db")))
+    channel = discord.PartialMessageable(state=bot._connection, id=100)
+
+    async def update_presence(_active_channels: int) -> None:
+        pass
+
+    monkeypatch.setattr(bot, "send_notifications", send_notifications)
+    monkeypatch.setattr(bot, "update_presence", update_presence)
+    monkeypatch.setattr(bot, "resolve_channel", lambda _channel_id: channel)
+    bot.dispatcher.max_retries = 1
+    bot.dispatcher.backoff = 0.01
+    return bot
+
+
+def http_error(status: int) -> discord.HTTPException:
+    return discord.HTTPException(
+        SimpleNamespace(status=status, reason="", headers={}), "error"
+    )
+
+
+@pytest.mark.asyncio
+async def test_notification_is_recorded_only_after_delivery(tmp_path, monkeypatch):
+    """一時的なエラーで送れなかった通知は通知済みにせず、次のティックで送り直すことのテスト"""
+    sent: list[list[Notification]] = []
+    failures = [http_error(503), http_error(503)]
+
+    async def send_notifications(_channel, notifications: list[Notification]) -> None:
+        if failures:
+            raise failures.pop()
+        sent.append(notifications)
+
+    bot = make_bot(tmp_path, monkeypatch, send_notifications)
+    await bot.db.add_subscription(100, "猫", "may")
+    board = BOARDS["may"]
+    monitor = StubMonitor([Thread.from_api("1", {"com": "猫スレ"}, "may")])
+    bot.dispatcher.start()
+    try:
+        # 再送しても送れなかった通知は通知済みにならず、次回は全件を評価し直す
+        await bot.monitor_board(board, monitor)
+        await bot.dispatcher.join()
+        assert not await bot.db.is_thread_notified("1", "猫", 100)
+        assert bot.board_states["may"].full_scan_pending
+        assert not bot.in_flight
+
+        # 次のティックで送り直し、送信できた時点で通知済みになる
+        await bot.monitor_board(board, monitor)
+        await bot.dispatcher.join()
+        assert [len(notifications) for notifications in sent] == [1]
+        assert await bot.db.is_thread_notified("1", "猫", 100)
+
+        # 通知済みのスレッドは再評価しても送らない
+        bot.board_states["may"].full_scan_pending = True
+        await bot.monitor_board(board, monitor)
+        await bot.dispatcher.join()
+        assert len(sent) == 1
+    finally:
+        await bot.dispatcher.stop()
+        bot.db.close()
+
+
+@pytest.mark.asyncio
+async def test_permanent_failure_is_not_resent(tmp_path, monkeypatch):
+    """403 など再送しても送れない通知は通知済みにして毎回送り直さないことのテスト"""
+    attempts: list[list[Notification]] = []
+
+    async def send_notifications(_channel, notifications: list[Notification]) -> None:
+        attempts.append(notifications)
+        raise http_error(403)
+
+    bot = make_bot(tmp_path, monkeypatch, send_notifications)
+    await bot.db.add_subscription(100, "猫", "may")
+    board = BOARDS["may"]
+    monitor = StubMonitor([Thread.from_api("1", {"com": "猫スレ"}, "may")])
+    bot.dispatcher.start()
+    try:
+        await bot.monitor_board(board, monitor)
+        await bot.dispatcher.join()
+        assert await bot.db.is_thread_notified("1", "猫", 100)
+        assert not bot.board_states["may"].full_scan_pending
+        assert not bot.in_flight
+
+        bot.board_states["may"].full_scan_pending = True
+        await bot.monitor_board(board, monitor)
+        await bot.dispatcher.join()
+        assert len(attempts) == 1
+    finally:
+        await bot.dispatcher.stop()
+        bot.db.close()
+
+
+@pytest.mark.asyncio
+async def test_partial_failure_records_sent_messages(tmp_path):
+    """複数メッセージの途中で失敗しても送信できた分は通知済みにすることのテスト"""
+
+    class FailingChannel(StubChannel):
+        id = 100
+
+        async def send(self, embeds: list) -> None:
+            if self.messages:
+                raise ConnectionError("down")
+            await super().send(embeds)
+
+    bot = FutabaBot(db=AsyncFutabaDatabase(FutabaDatabase(tmp_path / "bot.db")))
+    channel = FailingChannel()
+    notifications = [
+        Notification(
+            channel, Thread.from_api(str(index), {"com": "猫"}, "may"), ("猫",)
+        )
+        for index in range(11)
+    ]
+    try:
+        with pytest.raises(ConnectionError):
+            await bot._send_dispatched(notifications)
+
+        assert [len(embeds) for embeds in channel.messages] == [10]
+        assert [notification.delivered for notification in notifications] == [
+            True
+        ] * 10 + [False]
+        assert await bot.db.is_thread_notified("9", "猫", 100)
+        assert not await bot.db.is_thread_notified("10", "猫", 100)
+    finally:
+        bot.db.close()
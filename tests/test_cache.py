@@ -0,0 +1,120 @@
+"""インメモリキャッシュのテスト"""
+
+from datetime import datetime, timedelta
+
+from src.futaba_search.cache import MuteTable, NotifiedIndex, SubscriptionRegistry
+
+
+def test_notified_index_expire_in_order():
+    """通知日時の古い順に期限切れになることのテスト"""
+    now = datetime.now()
+    index = NotifiedIndex()
+    index.load(
+        [
+            ("1", "a", 10, now - timedelta(days=9)),
+            ("2", "a", 10, now - timedelta(days=8)),
+            ("3", "a", 10, now - timedelta(days=1)),
+        ]
+    )
+
+    expired = index.expire(now - timedelta(days=7))
+
+    assert expired == 2
+    assert ("1", "a", 10) not in index
+    assert ("2", "a", 10) not in index
+    assert ("3", "a", 10) in index
+
+
+def test_notified_index_add_is_idempotent():
+    """同じキーを二重に追加しても1件として扱われることのテスト"""
+    index = NotifiedIndex()
+    index.add(("1", "a", 10), datetime.now())
+    index.add(("1", "a", 10), datetime.now())
+
+    assert len(index) == 1
+    assert index.expire(datetime.now()) == 1
+
+
+def test_mute_table_is_muted():
+    """ミュート期限前後の判定のテスト"""
+    now = datetime.now()
+    table = MuteTable()
+    table.load([(10, now + timedelta(hours=1)), (20, now - timedelta(minutes=1))])
+
+    assert table.is_muted(10, now) is True
+    assert table.get(10, now) == now + timedelta(hours=1)
+    # 期限を過ぎていれば期限切れ処理の前でもミュート扱いにしない
+    assert table.is_muted(20, now) is False
+    assert table.is_muted(30, now) is False
+
+
+def test_mute_table_expire_in_order():
+    """期限の早い順に期限切れになり、延長・解除済みの要素は無視されることのテスト"""
+    now = datetime.now()
+    table = MuteTable()
+    table.set(10, now - timedelta(hours=2))
+    table.set(20, now - timedelta(hours=1))
+    table.set(30, now - timedelta(minutes=30))
+    table.set(40, now + timedelta(hours=1))
+    # 延長したチャンネルと解除したチャンネル
+    table.set(20, now + timedelta(hours=2))
+    assert table.remove(30) is True
+    assert table.remove(30) is False
+
+    assert table.expire(now) == [10]
+    assert table.expire(now) == []
+    assert len(table) == 2
+    assert table.is_muted(20, now) is True
+
+    assert table.expire(now + timedelta(hours=3)) == [40, 20]
+    assert len(table) == 0
+
+
+def test_subscription_registry_maps_both_ways():
+    """キーワード→チャンネル、チャンネル→キーワードの対応のテスト"""
+    registry = SubscriptionRegistry()
+    registry.load([(10, "猫", "may"), (10, "犬", "may"), (20, "猫", "may")])
+
+    assert registry.loaded is True
+    assert len(registry) == 3
+    assert registry.channels("猫") == {10, 20}
+    assert registry.keywords(10) == ["猫", "犬"]
+    assert registry.channel_ids() == {10, 20}
+
+    assert registry.remove(20, "猫") is True
+    assert registry.channels("猫") == {10}
+    assert registry.channel_ids() == {10}
+    assert registry.keywords(20) == []
+
+
+def test_subscription_registry_version_changes_only_on_update():
+    """購読が実際に変化したときだけ version が進むことのテスト"""
+    registry = SubscriptionRegistry()
+    registry.load([(10, "猫", "may")])
+    version = registry.version
+
+    assert registry.add(10, "猫") is False
+    assert registry.remove(10, "犬") is False
+    assert registry.version == version
+
+    assert registry.add(10, "犬") is True
+    assert registry.version == version + 1
+    assert registry.snapshot() == (version + 1, [(10, "猫"), (10, "犬")])
+
+
+def test_subscription_registry_separates_boards():
+    """同じキーワードでも板ごとに別の購読として扱われることのテスト"""
+    registry = SubscriptionRegistry()
+    registry.load([(10, "猫", "may"), (20, "猫", "img")])
+
+    assert registry.add(10, "猫", "img") is True
+    assert registry.channels("猫") == {10}
+    assert registry.channels("猫", "img") == {10, 20}
+    assert registry.keywords(10, "img") == ["猫"]
+    assert registry.channel_ids("img") == {10, 20}
+    assert registry.channel_ids("dat") == set()
+    assert registry.snapshot("img")[1] == [(10, "猫"), (20, "猫")]
+
+    assert registry.remove(20, "猫") is False
+    assert registry.remove(20, "猫", "img") is True
+    assert registry.channel_ids() == {10}
@@ -0,0 +1,197 @@
+"""カタログ配信サービスとクライアントモードのテスト"""
+
+import asyncio
+import sys
+
+import pytest
+
+from src.futaba_search.boards import BOARDS
+from src.futaba_search.catalog_service import (
+    CatalogService,
+    encode_frame,
+    read_frame,
+)
+from src.futaba_search.main import parse_args
+from src.futaba_search.monitor import FutabaMonitor
+from src.futaba_search.thread import Thread
+
+
+def make_thread(thread_id: int, text: str = "本文") -> Thread:
+    return Thread(thread_id, text, "", "", "", f"/thumb/{thread_id}s.jpg", text)
+
+
+class StubMonitor:
+    """決まったカタログを返す FutabaMonitor の代わり（None は 304）"""
+
+    def __init__(self, catalogs: list[list[Thread] | None]) -> None:
+        self.catalogs = catalogs
+        self.not_modified = False
+
+    async def stream_threads(self) -> list[Thread] | None:
+        threads = self.catalogs.pop(0)
+        self.not_modified = threads is None
+        return threads
+
+
+def ids(threads: list[Thread] | None) -> list[int] | None:
+    return None if threads is None else sorted(thread.id for thread in threads)
+
+
+async def settle() -> None:
+    """配信したフレームがクライアントに届くまで待つ"""
+    await asyncio.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_frame_roundtrip():
+    """長さ付き JSON フレームの読み書きのテスト"""
+    reader = asyncio.StreamReader()
+    reader.feed_data(encode_frame({"type": "delta", "removed": [1]}))
+    reader.feed_data(encode_frame({"type": "snapshot", "threads": []}))
+    reader.feed_eof()
+
+    assert await read_frame(reader) == {"type": "delta", "removed": [1]}
+    assert (await read_frame(reader))["type"] == "snapshot"
+    with pytest.raises(asyncio.IncompleteReadError):
+        await read_frame(reader)
+
+
+@pytest.mark.asyncio
+async def test_client_mode_receives_snapshot_and_deltas(tmp_path):
+    """クライアントモードの FutabaMonitor がサービスからカタログを受け取ることのテスト"""
+    board = BOARDS["may"]
+    path = tmp_path / "c.sock"
+    service = CatalogService(path)
+    await service.start()
+    source = StubMonitor(
+        [
+            [make_thread(1), make_thread(2)],
+            None,
+            [make_thread(2, "変更"), make_thread(3)],
+        ]
+    )
+    monitor = FutabaMonitor(board=board, catalog_socket=str(path))
+    try:
+        # サービスがまだ取得していない間は待たずに失敗として扱う
+        assert await monitor.stream_threads() is None
+        assert not monitor.not_modified
+        assert service.clients("may") == 1
+
+        # 最初の取得より前に接続したクライアントにも snapshot が届く
+        assert await service.publish(board, source) is None
+        await settle()
+        threads = await monitor.stream_threads()
+        assert ids(threads) == [1, 2]
+        assert threads is not None and threads[0].thumb_url is not None
+
+        # 304 の間は not_modified になる
+        assert await service.publish(board, source) == 0
+        await settle()
+        assert await monitor.stream_threads() is None
+        assert monitor.not_modified
+
+        # 差分（新規・変更・消滅）が反映される
+        assert await service.publish(board, source) == 1
+        await settle()
+        threads = await monitor.stream_threads()
+        assert ids(threads) == [2, 3]
+        assert threads is not None
+        assert {thread.id: thread.title for thread in threads}[2] == "変更"
+        assert await monitor.stream_threads() is None
+
+        # clear_validators の後は最新のカタログ全体をもう一度返す
+        monitor.clear_validators()
+        assert ids(await monitor.stream_threads()) == [2, 3]
+
+        # 後から接続したクライアントは現在のカタログを snapshot で受け取る
+        late = FutabaMonitor(board=board, catalog_socket=str(path))
+        assert ids(await late.stream_threads()) == [2, 3]
+        await late.close()
+    finally:
+        await monitor.close()
+        await service.stop()
+
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_client_mode_without_service(tmp_path):
+    """サービスに接続できない場合は取得の失敗として扱うことのテスト"""
+    monitor = FutabaMonitor(board=BOARDS["may"], catalog_socket=str(tmp_path / "x"))
+
+    assert await monitor.stream_threads() is None
+    assert not monitor.not_modified
+    await monitor.close()
+
+
+@pytest.mark.asyncio
+async def test_client_mode_fails_fast_for_unserved_board(tmp_path):
+    """サービスが配信していない板はタイムアウトを待たずに失敗とすることのテスト"""
+    path = tmp_path / "c.sock"
+    service = CatalogService(path, ["may"])
+    await service.start()
+    monitor = FutabaMonitor(board=BOARDS["img"], catalog_socket=str(path))
+    await monitor.start()
+    try:
+        # クライアントモードではふたばへのセッションを作らない
+        assert monitor.session is None
+        threads = await asyncio.wait_for(monitor.stream_threads(), 1)
+        assert threads is None
+        assert not monitor.not_modified
+        assert service.clients("img") == 0
+    finally:
+        await monitor.close()
+        await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_service_reconnects_after_restart(tmp_path):
+    """サービスが再起動しても接続し直して受け取れることのテスト"""
+    board = BOARDS["may"]
+    path = tmp_path / "c.sock"
+    monitor = FutabaMonitor(board=board, catalog_socket=str(path))
+
+    service = CatalogService(path)
+    await service.start()
+    await service.publish(board, StubMonitor([[make_thread(1)]]))
+    assert ids(await monitor.stream_threads()) == [1]
+    await service.stop()
+    await settle()
+
+    service = CatalogService(path)
+    await service.start()
+    await service.publish(board, StubMonitor([[make_thread(1), make_thread(2)]]))
+    try:
+        assert ids(await monitor.stream_threads()) == [1, 2]
+    finally:
+        await monitor.close()
+        await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_service_refuses_running_socket(tmp_path):
+    """既に待ち受け中のソケットは奪わず、残ったソケットは作り直すことのテスト"""
+    path = tmp_path / "c.sock"
+    service = CatalogService(path)
+    await service.start()
+    with pytest.raises(RuntimeError):
+        await CatalogService(path).start()
+    await service.stop()
+
+    (tmp_path / "plain").write_text("")
+    with pytest.raises(RuntimeError):
+        await CatalogService(tmp_path / "plain").start()
+
+
+def test_catalog_service_command_requires_socket(monkeypatch):
+    """catalog-service サブコマンドの引数解析のテスト"""
+    monkeypatch.setattr(
+        sys, "argv", ["futaba-search", "catalog-service", "--socket", "/tmp/c.sock"]
+    )
+    args = parse_args()
+    assert args.command == "catalog-service"
+    assert args.socket == "/tmp/c.sock"
+
+    monkeypatch.setattr(sys, "argv", ["futaba-search", "catalog-service"])
+    with pytest.raises(SystemExit):
+        parse_args()
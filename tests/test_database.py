@@ -1,11 +1,19 @@
 """データベース機能のテスト"""
 
+import asyncio
+import sqlite3
+import threading
+import time
+
 import pytest
 import tempfile
 from pathlib import Path
 from datetime import datetime, timedelta
 
-from src.futaba_search.database import FutabaDatabase
+from sqlalchemy import event
+
+from src.futaba_search.database import AsyncFutabaDatabase, FutabaDatabase
+from src.futaba_search.thread import Thread
 
 
 @pytest.fixture
@@ -17,9 +25,11 @@ def temp_db():
     db = FutabaDatabase(db_path)
     yield db
     
-    # クリーンアップ
-    if db_path.exists():
-        db_path.unlink()
+    # クリーンアップ（WALモードの -wal / -shm ファイルも削除）
+    db.engine.dispose()
+    for path in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")):
+        if path.exists():
+            path.unlink()
 
 
 def test_add_subscription(temp_db):
@@ -135,4 +145,488 @@ def test_cleanup_expired_mutes(temp_db):
     temp_db.cleanup_expired_mutes()
     
     # ミュートが自動的に解除されていることを確認
-    assert temp_db.is_channel_muted(channel_id) is False
\ No newline at end of file
+    assert temp_db.is_channel_muted(channel_id) is False
+
+def test_notified_index_loaded_on_startup(temp_db):
+    """再起動時に通知履歴がインメモリ索引に読み込まれることのテスト"""
+    temp_db.mark_thread_notified("123456789", "テスト", 12345)
+
+    reopened = FutabaDatabase(temp_db.db_path)
+    assert reopened.notified_index.loaded is True
+    assert len(reopened.notified_index) == 1
+    assert reopened.is_thread_notified("123456789", "テスト", 12345) is True
+    assert reopened.is_thread_notified("987654321", "テスト", 12345) is False
+
+    stats = reopened.notified_index.stats()
+    assert stats["hits"] == 2
+    assert stats["db_fallbacks"] == 0
+
+
+def test_notified_index_disabled_falls_back_to_db(temp_db):
+    """索引を無効にした場合にDBへ問い合わせることのテスト"""
+    temp_db.mark_thread_notified("123456789", "テスト", 12345)
+
+    db = FutabaDatabase(temp_db.db_path, use_notified_index=False)
+    assert db.is_thread_notified("123456789", "テスト", 12345) is True
+    assert db.notified_index.stats()["db_fallbacks"] == 1
+    assert db.notified_index.stats()["hits"] == 0
+
+
+def test_cleanup_old_notifications_expires_index(temp_db):
+    """古い通知のクリーンアップが索引にも反映されることのテスト"""
+    temp_db.mark_thread_notified("123456789", "テスト", 12345)
+
+    temp_db.cleanup_old_notifications(days=-1)
+
+    assert len(temp_db.notified_index) == 0
+    assert temp_db.is_thread_notified("123456789", "テスト", 12345) is False
+
+
+def test_mark_threads_notified_bulk(temp_db):
+    """複数の通知を一括で記録するテスト"""
+    temp_db.mark_thread_notified("1", "テスト", 12345)
+
+    # 既に記録済みのものを含めても重複エラーにならない
+    temp_db.mark_threads_notified(
+        [("1", "テスト", 12345), ("2", "テスト", 12345), ("2", "別", 67890)]
+    )
+
+    reopened = FutabaDatabase(temp_db.db_path, use_notified_index=False)
+    assert reopened.is_thread_notified("1", "テスト", 12345) is True
+    assert reopened.is_thread_notified("2", "テスト", 12345) is True
+    assert reopened.is_thread_notified("2", "別", 67890) is True
+    assert temp_db.is_thread_notified("2", "別", 67890) is True
+
+
+def test_mark_threads_notified_empty(temp_db):
+    """空の入力では何もしないことのテスト"""
+    temp_db.mark_threads_notified([])
+    assert len(temp_db.notified_index) == 0
+
+
+def test_filter_unnotified(temp_db):
+    """未通知のものだけが返ることのテスト（索引あり・なし）"""
+    temp_db.mark_thread_notified("1", "テスト", 12345)
+    entries = [("1", "テスト", 12345), ("2", "テスト", 12345), ("1", "別", 12345)]
+
+    assert temp_db.filter_unnotified(entries) == entries[1:]
+
+    db = FutabaDatabase(temp_db.db_path, use_notified_index=False)
+    assert db.filter_unnotified(entries) == entries[1:]
+    assert db.notified_index.stats()["db_fallbacks"] == 3
+
+
+@pytest.mark.asyncio
+async def test_async_database_runs_on_db_thread(temp_db):
+    """非同期ラッパーが専用スレッドでDB処理を行うことのテスト"""
+    adb = AsyncFutabaDatabase(temp_db)
+    try:
+        assert await adb.add_subscription(12345, "テスト") is True
+        assert await adb.get_subscriptions(12345) == ["テスト"]
+        await adb.mark_threads_notified([("1", "テスト", 12345)])
+        assert await adb.is_thread_notified("1", "テスト", 12345) is True
+
+        thread_name = await adb._run(lambda: threading.current_thread().name)
+        assert thread_name.startswith("futaba-db")
+    finally:
+        adb.close()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_responsive_during_large_cleanup(temp_db):
+    """大量の通知履歴のクリーンアップ中もイベントループが止まらないことのテスト"""
+    temp_db.mark_threads_notified(
+        (str(i), f"キーワード{i % 100}", i % 1000) for i in range(100_000)
+    )
+    adb = AsyncFutabaDatabase(temp_db)
+
+    gaps: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    async def cleanup() -> float:
+        start = time.perf_counter()
+        await adb.cleanup_old_notifications(days=-1)
+        elapsed = time.perf_counter() - start
+        done.set()
+        return elapsed
+
+    try:
+        _, elapsed = await asyncio.gather(ticker(), cleanup())
+    finally:
+        adb.close()
+
+    assert len(temp_db.notified_index) == 0
+    # クリーンアップ中もティッカーが動き続けている
+    assert len(gaps) >= 3
+    assert max(gaps) < elapsed / 2
+
+
+def test_performance_profile_pragmas(temp_db):
+    """performance プロファイルでPRAGMAが接続ごとに設定されることのテスト"""
+    with temp_db.engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+        cache_size = connection.exec_driver_sql("PRAGMA cache_size").scalar()
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert cache_size == -65536
+
+
+def test_unknown_profile_rejected(temp_db):
+    """不明なプロファイルを指定するとエラーになることのテスト"""
+    with pytest.raises(ValueError):
+        FutabaDatabase(temp_db.db_path, profile="fastest")
+
+
+def test_migration_upgrades_existing_database(tmp_path):
+    """既存データベースにインデックスが追加され、通知履歴が日ごとに分割されることのテスト"""
+    db_path = tmp_path / "legacy.db"
+    connection = sqlite3.connect(db_path)
+    connection.executescript(
+        """
+        CREATE TABLE notified_threads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            thread_id VARCHAR NOT NULL,
+            keyword VARCHAR NOT NULL,
+            channel_id INTEGER NOT NULL,
+            notified_at DATETIME,
+            UNIQUE (thread_id, keyword, channel_id)
+        );
+        CREATE TABLE muted_channels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id INTEGER NOT NULL UNIQUE,
+            muted_until DATETIME NOT NULL,
+            muted_at DATETIME
+        );
+        INSERT INTO notified_threads (thread_id, keyword, channel_id, notified_at)
+        VALUES ('123456789', 'テスト', 12345, '2024-01-01 00:00:00.000000');
+        """
+    )
+    connection.close()
+
+    db = FutabaDatabase(db_path)
+    # 2回目の起動でも失敗しない
+    db = FutabaDatabase(db_path)
+
+    with db.engine.connect() as connection:
+        indexes = {
+            row[1]
+            for row in connection.exec_driver_sql("PRAGMA index_list(muted_channels)")
+        }
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN DELETE FROM muted_channels WHERE muted_until <= ?",
+            ("2024-01-08 00:00:00",),
+        ).fetchall()
+        tables = set(
+            connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).scalars()
+        )
+
+    assert "ix_muted_channels_muted_until" in indexes
+    assert any("ix_muted_channels_muted_until" in str(row) for row in plan)
+    # 分割前の通知履歴は日ごとのテーブルに移行される
+    assert "notified_threads" not in tables
+    assert "notified_threads_20240101" in tables
+    assert db.is_thread_notified("123456789", "テスト", 12345) is True
+    db.engine.dispose()
+
+
+def test_mute_table_loaded_on_startup(temp_db):
+    """再起動時にミュート状態がインメモリ表に読み込まれることのテスト"""
+    muted_until = datetime.now() + timedelta(hours=1)
+    temp_db.mute_channel(12345, muted_until)
+
+    reopened = FutabaDatabase(temp_db.db_path)
+    assert len(reopened.mute_table) == 1
+    assert reopened.is_channel_muted(12345) is True
+    assert reopened.get_mute_status(12345) == muted_until
+
+
+def test_cleanup_expired_mutes_skips_db_when_nothing_expired(temp_db):
+    """期限切れのミュートがなければDBを更新しないことのテスト"""
+    temp_db.mute_channel(12345, datetime.now() + timedelta(hours=1))
+    temp_db.mute_channel(67890, datetime.now() - timedelta(seconds=1))
+
+    statements: list[str] = []
+    event.listen(
+        temp_db.engine,
+        "before_cursor_execute",
+        lambda _conn, _cursor, statement, *_args: statements.append(statement),
+    )
+
+    temp_db.cleanup_expired_mutes()
+    assert any(statement.startswith("DELETE") for statement in statements)
+
+    statements.clear()
+    temp_db.cleanup_expired_mutes()
+    assert statements == []
+
+    reopened = FutabaDatabase(temp_db.db_path)
+    assert len(reopened.mute_table) == 1
+    assert reopened.is_channel_muted(12345) is True
+
+
+def test_subscription_registry_synced_with_database(temp_db):
+    """購読の追加・削除が登録簿に反映され、再起動時に読み込まれることのテスト"""
+    temp_db.add_subscription(12345, "テスト1")
+    temp_db.add_subscription(12345, "テスト2")
+    temp_db.add_subscription(67890, "テスト1")
+    temp_db.remove_subscription(12345, "テスト2")
+
+    registry = temp_db.subscriptions
+    assert registry.channels("テスト1") == {12345, 67890}
+    assert registry.keywords(12345) == ["テスト1"]
+
+    reopened = FutabaDatabase(temp_db.db_path)
+    assert reopened.subscriptions.snapshot()[1] == registry.snapshot()[1]
+
+
+def test_subscriptions_separated_by_board(temp_db):
+    """同じキーワードを板ごとに購読でき、板ごとに取得・削除されることのテスト"""
+    assert temp_db.add_subscription(12345, "テスト") is True
+    assert temp_db.add_subscription(12345, "テスト", "img") is True
+    assert temp_db.add_subscription(12345, "テスト", "img") is False
+
+    assert temp_db.get_all_subscriptions() == [(12345, "テスト")]
+    assert temp_db.get_all_subscriptions("img") == [(12345, "テスト")]
+    assert temp_db.remove_subscription(12345, "テスト", "img") is True
+    assert temp_db.get_subscriptions(12345, "img") == []
+    assert temp_db.get_subscriptions(12345) == ["テスト"]
+
+
+def test_migration_adds_board_to_subscriptions(tmp_path):
+    """板の列がない購読テーブルが移行され、既存の購読が既定の板になることのテスト"""
+    db_path = tmp_path / "legacy.db"
+    connection = sqlite3.connect(db_path)
+    connection.executescript(
+        """
+        CREATE TABLE subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id INTEGER NOT NULL,
+            keyword VARCHAR NOT NULL,
+            UNIQUE (channel_id, keyword)
+        );
+        INSERT INTO subscriptions (channel_id, keyword) VALUES (12345, 'テスト');
+        """
+    )
+    connection.close()
+
+    FutabaDatabase(db_path).engine.dispose()
+    # 2回目の起動でも失敗しない
+    db = FutabaDatabase(db_path)
+
+    assert db.get_subscriptions(12345) == ["テスト"]
+    assert db.add_subscription(12345, "テスト", "img") is True
+    assert db.add_subscription(12345, "テスト") is False
+    db.engine.dispose()
+
+
+def test_get_all_subscriptions_does_not_query_database(temp_db):
+    """全購読の取得がDBを参照しないことのテスト"""
+    temp_db.add_subscription(12345, "テスト")
+
+    statements: list[str] = []
+    event.listen(
+        temp_db.engine,
+        "before_cursor_execute",
+        lambda _conn, _cursor, statement, *_args: statements.append(statement),
+    )
+
+    assert temp_db.get_all_subscriptions() == [(12345, "テスト")]
+    assert temp_db.get_subscriptions(12345) == ["テスト"]
+    assert statements == []
+
+
+def test_notifications_partitioned_by_day(temp_db):
+    """通知履歴が通知日ごとのテーブルに保存されることのテスト"""
+    now = datetime.now()
+    temp_db.mark_threads_notified([("1", "テスト", 12345)], now - timedelta(days=1))
+    temp_db.mark_threads_notified([("2", "テスト", 12345)], now)
+
+    assert temp_db.notified_days() == [(now - timedelta(days=1)).date(), now.date()]
+
+    db = FutabaDatabase(temp_db.db_path, use_notified_index=False)
+    assert db.notified_days() == temp_db.notified_days()
+    assert db.filter_unnotified(
+        [("1", "テスト", 12345), ("2", "テスト", 12345), ("3", "テスト", 12345)]
+    ) == [("3", "テスト", 12345)]
+
+
+def test_cleanup_drops_expired_partitions(temp_db):
+    """保存期間を過ぎた日のテーブルだけが削除されることのテスト"""
+    now = datetime.now()
+    temp_db.mark_threads_notified([("1", "テスト", 12345)], now - timedelta(days=10))
+    temp_db.mark_threads_notified([("2", "テスト", 12345)], now - timedelta(days=3))
+    temp_db.mark_threads_notified([("3", "テスト", 12345)], now)
+
+    temp_db.cleanup_old_notifications(days=7)
+
+    assert temp_db.notified_days() == [(now - timedelta(days=3)).date(), now.date()]
+    assert temp_db.is_thread_notified("1", "テスト", 12345) is False
+    assert temp_db.is_thread_notified("2", "テスト", 12345) is True
+
+    reopened = FutabaDatabase(temp_db.db_path)
+    assert len(reopened.notified_index) == 2
+    assert reopened.is_thread_notified("1", "テスト", 12345) is False
+
+
+def test_notified_filter_skips_db_for_negatives(temp_db):
+    """ブルームフィルターで未通知と分かる照会はDBを参照しないことのテスト"""
+    temp_db.mark_thread_notified("1", "テスト", 12345)
+
+    db = FutabaDatabase(temp_db.db_path, use_notified_filter=True)
+    assert db.notified_filter.loaded is True
+    assert db.notified_index.loaded is False
+
+    statements: list[str] = []
+    event.listen(
+        db.engine,
+        "before_cursor_execute",
+        lambda _conn, _cursor, statement, *_args: statements.append(statement),
+    )
+
+    assert db.is_thread_notified("2", "テスト", 12345) is False
+    assert statements == []
+
+    # 含まれる可能性がある場合はDBで正確に照合する
+    assert db.is_thread_notified("1", "テスト", 12345) is True
+    assert len(statements) == 1
+
+    stats = db.dedup_stats()
+    assert stats["negatives"] == 1
+    assert stats["positives"] == 1
+    assert stats["false_positives"] == 0
+
+
+def test_notified_filter_tracks_marks_and_cleanup(temp_db):
+    """ブルームフィルターが通知の記録と期限切れに追従することのテスト"""
+    now = datetime.now()
+    db = FutabaDatabase(temp_db.db_path, use_notified_filter=True)
+    db.mark_threads_notified([("1", "テスト", 12345)], now - timedelta(days=10))
+    db.mark_threads_notified([("2", "テスト", 12345)], now)
+
+    assert db.filter_unnotified(
+        [("1", "テスト", 12345), ("2", "テスト", 12345), ("3", "テスト", 12345)]
+    ) == [("3", "テスト", 12345)]
+
+    db.cleanup_old_notifications(days=7)
+    assert db.dedup_stats()["buckets"] == 1
+    assert db.is_thread_notified("1", "テスト", 12345) is False
+    assert db.is_thread_notified("2", "テスト", 12345) is True
+    db.engine.dispose()
+
+
+def make_observed(thread_id: int, text: str, board: str = "may") -> Thread:
+    """検索用に記録するスレッドを作成"""
+    return Thread.from_api(str(thread_id), {"com": text}, board)
+
+
+def test_search_threads_fulltext_and_short_queries(temp_db):
+    """3文字以上は索引、それより短い語は走査で部分一致検索できることのテスト"""
+    temp_db.ingest_threads(
+        [
+            make_observed(1, "ふたば猫スレ"),
+            make_observed(2, "犬の画像"),
+            make_observed(3, "Cat Photos"),
+        ]
+    )
+
+    assert temp_db.fulltext_available
+    assert [t.id for t, _ in temp_db.search_threads("猫スレ").hits] == [1]
+    assert [t.id for t, _ in temp_db.search_threads("cat p").hits] == [3]
+    assert [t.id for t, _ in temp_db.search_threads("犬").hits] == [2]
+    assert temp_db.search_threads("猫犬").hits == []
+    assert temp_db.search_threads("  ").hits == []
+
+    # 索引を使わない場合も同じ結果になる
+    temp_db.fulltext_available = False
+    assert [t.id for t, _ in temp_db.search_threads("猫スレ").hits] == [1]
+
+
+def test_search_threads_pagination_and_filters(temp_db):
+    """新しい順のページ分割、板・期間での絞り込みのテスト"""
+    now = datetime.now()
+    temp_db.ingest_threads(
+        [make_observed(i, f"実況スレ{i}") for i in range(5)],
+        seen_at=now - timedelta(days=5),
+    )
+    temp_db.ingest_threads(
+        [make_observed(i, f"実況スレ{i}") for i in range(5, 10)]
+        + [make_observed(1, "実況スレ", "img")],
+        seen_at=now,
+    )
+
+    first = temp_db.search_threads("実況スレ", page_size=4)
+    assert [t.key for t, _ in first.hits] == ["img:1", "9", "8", "7"]
+    assert first.has_next
+    last = temp_db.search_threads("実況スレ", page=3, page_size=4)
+    assert [t.id for t, _ in last.hits] == [2, 1, 0]
+    assert not last.has_next
+
+    assert [t.board for t, _ in temp_db.search_threads("実況", board="img").hits] == [
+        "img"
+    ]
+    recent = temp_db.search_threads("実況スレ", since=now - timedelta(days=1))
+    assert len(recent.hits) == 6
+
+
+def test_ingest_threads_updates_index(temp_db):
+    """本文の変更が索引に反映され、最初に取得した日時は変わらないことのテスト"""
+    first_seen = datetime(2024, 1, 1)
+    temp_db.ingest_threads([make_observed(1, "変更前の本文")], seen_at=first_seen)
+    temp_db.ingest_threads([make_observed(1, "変更後の本文")])
+
+    assert temp_db.search_threads("変更前").hits == []
+    hits = temp_db.search_threads("変更後").hits
+    assert [(t.id, seen) for t, seen in hits] == [(1, first_seen)]
+
+
+def test_cleanup_observed_threads(temp_db):
+    """保存期間を過ぎたスレッドが検索対象から削除されることのテスト"""
+    temp_db.ingest_threads(
+        [make_observed(1, "古いスレッド")], seen_at=datetime.now() - timedelta(days=10)
+    )
+    temp_db.ingest_threads([make_observed(2, "新しいスレッド")])
+
+    assert temp_db.cleanup_observed_threads(days=7) == 1
+    assert [t.id for t, _ in temp_db.search_threads("スレッド").hits] == [2]
+    assert temp_db.search_threads("古いスレ").hits == []
+
+
+def test_migration_escapes_prefixed_keywords(tmp_path):
+    """接頭辞で始まる既存の購読と通知履歴が部分一致のまま扱われるよう移行されることのテスト"""
+    db_path = tmp_path / "legacy.db"
+    db = FutabaDatabase(db_path)
+    db.mark_threads_notified([("1", "re:ゼロ", 12345)])
+    db.engine.dispose()
+    connection = sqlite3.connect(db_path)
+    connection.executescript(
+        """
+        INSERT INTO subscriptions (channel_id, keyword, board)
+        VALUES (12345, 're:ゼロ', 'may'), (12345, '猫', 'may'), (12345, 'expr:a', 'may');
+        PRAGMA user_version = 0;
+        """
+    )
+    connection.close()
+
+    db = FutabaDatabase(db_path)
+    expected = ["\\re:ゼロ", "猫", "\\expr:a"]
+    assert db.get_subscriptions(12345) == expected
+    assert db.is_thread_notified("1", "\\re:ゼロ", 12345)
+    # 移行後に登録した正規表現はそのまま残る
+    assert db.add_subscription(12345, "re:ね+こ")
+    db.engine.dispose()
+
+    db = FutabaDatabase(db_path)
+    assert db.get_subscriptions(12345) == [*expected, "re:ね+こ"]
+    db.engine.dispose()
@@ -0,0 +1,269 @@
+"""通知ディスパッチャーのテスト"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from src.futaba_search.dispatcher import (
+    Notification,
+    NotificationDispatcher,
+    TokenBucket,
+)
+from src.futaba_search.thread import Thread
+
+
+def make_notification(channel_id: int, thread_id: int = 1) -> Notification:
+    """テスト用の通知を作成"""
+    return Notification(
+        SimpleNamespace(id=channel_id), Thread.from_api(str(thread_id), {}), ("テスト",)
+    )
+
+
+def test_token_bucket_limits_rate():
+    """トークンを使い切ると待ち時間が返ることのテスト"""
+    bucket = TokenBucket(rate=2, per=1.0)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0 < bucket.reserve() <= 0.5
+
+    bucket.block(10)
+    assert bucket.reserve() > 9
+
+
+@pytest.mark.asyncio
+async def test_slow_channel_does_not_block_others():
+    """遅いチャンネルが他のチャンネルの送信を待たせないことのテスト"""
+    sent: list[tuple[int, float]] = []
+    start = time.monotonic()
+
+    async def send(batch: list[Notification]) -> None:
+        if batch[0].channel_id == 1:
+            await asyncio.sleep(0.3)
+        sent.append((batch[0].channel_id, time.monotonic() - start))
+
+    dispatcher = NotificationDispatcher(send, workers=2)
+    dispatcher.start()
+    dispatcher.submit(make_notification(1))
+    dispatcher.submit(make_notification(2, 1))
+    dispatcher.submit(make_notification(2, 2))
+    await dispatcher.join()
+    await dispatcher.stop()
+
+    fast = [elapsed for channel_id, elapsed in sent if channel_id == 2]
+    assert len(fast) == 2
+    assert max(fast) < 0.2
+    assert dispatcher.stats()["sent"] == 3
+
+
+@pytest.mark.asyncio
+async def test_per_channel_order_is_preserved():
+    """同じチャンネルへの通知が順番どおりに送られることのテスト"""
+    order: list[int] = []
+
+    async def send(batch: list[Notification]) -> None:
+        await asyncio.sleep(0)
+        order.extend(notification.thread.id for notification in batch)
+
+    dispatcher = NotificationDispatcher(send, workers=4)
+    dispatcher.start()
+    for thread_id in range(5):
+        dispatcher.submit(make_notification(1, thread_id))
+    await dispatcher.join()
+    await dispatcher.stop()
+
+    assert order == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_spaces_sends():
+    """チャンネルごとのレート制限で送信間隔が空くことのテスト"""
+    times: list[float] = []
+
+    async def send(_batch: list[Notification]) -> None:
+        times.append(time.monotonic())
+
+    dispatcher = NotificationDispatcher(send, workers=2, rate=2, per=0.2)
+    dispatcher.start()
+    for thread_id in range(4):
+        dispatcher.submit(make_notification(1, thread_id))
+    await dispatcher.join()
+    await dispatcher.stop()
+
+    # 2件目までは即時、3件目以降はトークンの回復を待つ
+    assert times[2] - times[0] >= 0.09
+    assert times[3] - times[0] >= 0.19
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_then_success():
+    """一時的なエラーの後に再送して成功することのテスト"""
+    attempts = 0
+
+    async def send(_batch: list[Notification]) -> None:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ConnectionError("temporary")
+
+    dispatcher = NotificationDispatcher(send, backoff=0.01)
+    dispatcher.start()
+    dispatcher.submit(make_notification(1))
+    await asyncio.wait_for(dispatcher.join(), 2)
+    await dispatcher.stop()
+
+    stats = dispatcher.stats()
+    assert attempts == 3
+    assert stats["sent"] == 1
+    assert stats["retries"] == 2
+    assert stats["failed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries():
+    """再送上限を超えると失敗として数え、on_failed に渡すことのテスト"""
+    failed: list[Notification] = []
+    errors: list[Exception] = []
+
+    async def send(_batch: list[Notification]) -> None:
+        raise ConnectionError("down")
+
+    async def on_failed(batch: list[Notification], error: Exception) -> None:
+        failed.extend(batch)
+        errors.append(error)
+
+    dispatcher = NotificationDispatcher(
+        send, max_retries=2, backoff=0.01, on_failed=on_failed
+    )
+    dispatcher.start()
+    notification = make_notification(1)
+    dispatcher.submit(notification)
+    await asyncio.wait_for(dispatcher.join(), 2)
+    await dispatcher.stop()
+
+    assert failed == [notification]
+    assert [type(error) for error in errors] == [ConnectionError]
+    assert notification.keys == [("1", "テスト", 1)]
+    stats = dispatcher.stats()
+    assert stats["failed"] == 1
+    assert stats["retries"] == 2
+    assert stats["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_retries_only_undelivered_notifications():
+    """途中で送信に失敗した場合に送信済みの通知を再送しないことのテスト"""
+    sent: list[list[int]] = []
+
+    async def send(batch: list[Notification]) -> None:
+        if len(sent) == 0:
+            # 1件目だけ送れたところで失敗する
+            batch[0].delivered = True
+            sent.append([batch[0].thread.id])
+            raise ConnectionError("down")
+        sent.append([notification.thread.id for notification in batch])
+
+    dispatcher = NotificationDispatcher(send, batch_size=10, backoff=0.01)
+    for thread_id in range(3):
+        dispatcher.submit(make_notification(1, thread_id))
+    dispatcher.start()
+    await asyncio.wait_for(dispatcher.join(), 2)
+    await dispatcher.stop()
+
+    assert sent == [[0], [1, 2]]
+    stats = dispatcher.stats()
+    assert stats["sent"] == 3
+    assert stats["retries"] == 1
+    assert stats["failed"] == 0
+
+
+def test_permanent_errors():
+    """429 以外の 4xx だけを再送しても成功しないエラーとすることのテスト"""
+
+    def error(status: int) -> discord.HTTPException:
+        return discord.HTTPException(
+            SimpleNamespace(status=status, reason="", headers={}), "error"
+        )
+
+    assert NotificationDispatcher.is_permanent(error(403))
+    assert NotificationDispatcher.is_permanent(error(404))
+    assert not NotificationDispatcher.is_permanent(error(429))
+    assert not NotificationDispatcher.is_permanent(error(503))
+    assert not NotificationDispatcher.is_permanent(ConnectionError("down"))
+
+
+@pytest.mark.asyncio
+async def test_drops_when_queue_is_full():
+    """待ち行列が満杯のときに破棄することのテスト"""
+
+    async def send(_batch: list[Notification]) -> None:
+        pass
+
+    dispatcher = NotificationDispatcher(send, max_queue=2)
+
+    assert dispatcher.submit(make_notification(1, 1)) is True
+    assert dispatcher.submit(make_notification(1, 2)) is True
+    assert dispatcher.submit(make_notification(1, 3)) is False
+    assert dispatcher.stats()["dropped"] == 1
+    assert dispatcher.queue_depth == 2
+
+    dispatcher.start()
+    await dispatcher.join()
+    await dispatcher.stop()
+    assert dispatcher.stats()["sent"] == 2
+
+
+def test_retry_delay_classifies_discord_errors():
+    """Discordのエラー種別に応じた再送判定のテスト"""
+
+    async def send(_batch: list[Notification]) -> None:
+        pass
+
+    dispatcher = NotificationDispatcher(send, backoff=1.0)
+    forbidden = discord.Forbidden(
+        SimpleNamespace(status=403, reason="Forbidden", headers={}), "missing access"
+    )
+    server_error = discord.HTTPException(
+        SimpleNamespace(status=503, reason="Unavailable", headers={}), "unavailable"
+    )
+    rate_limited = discord.HTTPException(
+        SimpleNamespace(status=429, reason="Too Many", headers={"Retry-After": "2.5"}),
+        "rate limited",
+    )
+
+    assert dispatcher._retry_delay(forbidden, 1) is None
+    assert dispatcher._retry_delay(server_error, 1) == 1.0
+    assert dispatcher._retry_delay(server_error, 3) == 4.0
+    assert dispatcher._retry_delay(rate_limited, 1) == 2.5
+    assert dispatcher._retry_delay(server_error, 4) is None
+
+
+@pytest.mark.asyncio
+async def test_batches_per_channel_up_to_batch_size():
+    """同じチャンネルの通知が最大batch_size件ずつまとめて送られることのテスト"""
+    batches: list[tuple[int, list[int]]] = []
+
+    async def send(batch: list[Notification]) -> None:
+        batches.append(
+            (batch[0].channel_id, [notification.thread.id for notification in batch])
+        )
+
+    dispatcher = NotificationDispatcher(send, batch_size=10)
+    for thread_id in range(25):
+        dispatcher.submit(make_notification(1, thread_id))
+    dispatcher.submit(make_notification(2, 100))
+    dispatcher.start()
+    await dispatcher.join()
+    await dispatcher.stop()
+
+    channel_1 = [ids for channel_id, ids in batches if channel_id == 1]
+    assert [len(ids) for ids in channel_1] == [10, 10, 5]
+    assert sum(channel_1, []) == list(range(25))
+    assert [ids for channel_id, ids in batches if channel_id == 2] == [[100]]
+
+    stats = dispatcher.stats()
+    assert stats["messages"] == 4
+    assert stats["sent"] == 26
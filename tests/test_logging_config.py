@@ -0,0 +1,139 @@
+"""ロギング設定のテスト"""
+
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+from src.futaba_search.logging_config import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    setup_logging,
+    stop_logging,
+)
+
+
+@pytest.fixture
+def restore_logging():
+    """テストで変更したルートロガーの設定を元に戻す"""
+    root_logger = logging.getLogger()
+    handlers, level = root_logger.handlers[:], root_logger.level
+    yield
+    stop_logging()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    for handler in handlers:
+        root_logger.addHandler(handler)
+    root_logger.setLevel(level)
+
+
+def make_record(message: str, *args: object) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, args, None)
+
+
+def test_queue_pipeline_writes_in_background(tmp_path, restore_logging):
+    """待ち行列経由のログが書き込みスレッドでファイルに書き出されることのテスト"""
+    log_file = tmp_path / "bot.log"
+    setup_logging(level="DEBUG", log_file=str(log_file), queue_size=100)
+
+    logging.getLogger("test").debug("%s: %d件のスレッド", "may", 42)
+    stop_logging()
+
+    assert "may: 42件のスレッド" in log_file.read_text(encoding="utf-8")
+
+
+def test_queue_handler_formats_on_enqueue():
+    """記録時点のメッセージとトレースバックを文字列にして渡すことのテスト"""
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue()
+    handler = DroppingQueueHandler(log_queue)
+    threads = ["may"]
+
+    handler.handle(make_record("%s件: %s", 3, threads))
+    threads.append("img")
+    try:
+        raise RuntimeError("失敗")
+    except RuntimeError:
+        failed = make_record("失敗")
+        failed.exc_info = sys.exc_info()
+    handler.handle(failed)
+
+    record = log_queue.get_nowait()
+    assert record.args is None
+    assert record.getMessage() == "3件: ['may']"
+
+    record = log_queue.get_nowait()
+    assert record.exc_info is None
+    assert record.exc_text is not None and "RuntimeError: 失敗" in record.exc_text
+    assert "RuntimeError: 失敗" in logging.Formatter().format(record)
+    assert (
+        "RuntimeError: 失敗" in json.loads(JsonFormatter().format(record))["exc_info"]
+    )
+
+
+@pytest.mark.parametrize(
+    ("policy", "kept"), [("drop_new", ["0", "1"]), ("drop_old", ["3", "4"])]
+)
+def test_queue_handler_drop_policy(policy, kept):
+    """満杯の待ち行列では方針に従ってレコードを破棄し、後で件数を報告することのテスト"""
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue, policy)
+
+    for i in range(5):
+        handler.handle(make_record(str(i)))
+
+    assert handler.dropped == 3
+    assert [log_queue.get_nowait().getMessage() for _ in range(2)] == kept
+
+    handler.handle(make_record("5"))
+    notice = log_queue.get_nowait()
+    assert notice.levelno == logging.WARNING
+    assert "3件のログを破棄" in notice.getMessage()
+    assert log_queue.get_nowait().getMessage() == "5"
+
+    with pytest.raises(ValueError):
+        DroppingQueueHandler(log_queue, "block")
+
+
+def test_json_formatter():
+    """1行の JSON に extra の属性と例外が含まれることのテスト"""
+    formatter = JsonFormatter()
+    record = make_record("%s: キーワード %s がマッチ", "may", ["猫"])
+    record.board = "may"
+    try:
+        raise RuntimeError("失敗")
+    except RuntimeError:
+        record.exc_info = sys.exc_info()
+
+    line = formatter.format(record)
+    entry = json.loads(line)
+
+    assert "\n" not in line
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+    assert entry["message"] == "may: キーワード ['猫'] がマッチ"
+    assert entry["board"] == "may"
+    assert "RuntimeError: 失敗" in entry["exc_info"]
+    assert "msg" not in entry
+
+
+def test_size_rotation(tmp_path, restore_logging):
+    """サイズを超えたログファイルが切り替えられることのテスト"""
+    log_file = tmp_path / "bot.log"
+    setup_logging(
+        log_file=str(log_file),
+        rotation="size",
+        max_bytes=200,
+        backup_count=2,
+        queue_size=0,
+        log_format="json",
+    )
+
+    for i in range(20):
+        logging.getLogger("test").info("ローテーションのテスト %d", i)
+
+    assert (tmp_path / "bot.log.1").exists()
+    assert not (tmp_path / "bot.log.3").exists()
+    for line in log_file.read_text(encoding="utf-8").splitlines():
+        assert json.loads(line)["logger"] == "test"
@@ -0,0 +1,124 @@
+"""キーワードマッチャーのテスト"""
+
+from src.futaba_search.matcher import KeywordMatcher
+from src.futaba_search.monitor import FutabaMonitor
+from src.futaba_search.thread import Thread
+
+
+def test_match_returns_channels_per_keyword():
+    """マッチしたキーワードごとに購読チャンネルが返ることのテスト"""
+    matcher = KeywordMatcher([(1, "東方"), (2, "東方"), (2, "猫"), (3, "犬")])
+
+    result = matcher.match("東方の猫スレ")
+    assert result == {"東方": {1, 2}, "猫": {2}}
+
+    assert matcher.match("関係ないスレ") == {}
+
+
+def test_match_overlapping_keywords():
+    """重なり合うキーワードが全て検出されることのテスト"""
+    matcher = KeywordMatcher([(1, "he"), (1, "she"), (2, "hers"), (3, "his")])
+
+    result = matcher.match("ushers")
+    assert set(result) == {"he", "she", "hers"}
+
+
+def test_match_is_case_insensitive():
+    """大文字小文字を区別しないマッチングのテスト"""
+    matcher = KeywordMatcher([(1, "Python")])
+
+    assert matcher.match("i love python") == {"Python": {1}}
+
+
+def test_match_agrees_with_check_keyword_match():
+    """従来のcheck_keyword_matchと同じ結果になることのテスト"""
+    monitor = FutabaMonitor()
+    subscriptions = [(1, "abc"), (2, "bc"), (3, "c"), (4, "ab"), (5, "xyz")]
+    threads = [
+        Thread.from_api("1", {"com": "xabcx", "sub": ""}),
+        Thread.from_api("2", {"com": "AB", "sub": "C"}),
+        Thread.from_api("3", {"com": "", "sub": "xy z"}),
+    ]
+    matcher = KeywordMatcher(subscriptions)
+
+    for thread in threads:
+        expected = {
+            keyword
+            for _, keyword in subscriptions
+            if monitor.check_keyword_match(thread, keyword)
+        }
+        assert set(matcher.match(thread.search_text)) == expected
+
+
+def test_match_ignores_notation_variants():
+    """全角・半角やカタカナ・ひらがなの違いがあってもマッチすることのテスト"""
+    matcher = KeywordMatcher([(1, "ネコ"), (2, "ABC")])
+    thread = Thread.from_api("1", {"com": "ﾈｺと&lt;ｂ&gt;ａｂｃ<br>", "sub": ""})
+
+    assert matcher.match(thread.search_text) == {"ネコ": {1}, "ABC": {2}}
+
+
+def test_match_regex_and_expressions():
+    """正規表現・式の購読が部分一致の購読と一緒に判定されることのテスト"""
+    matcher = KeywordMatcher(
+        [
+            (1, "猫"),
+            (2, "re:ね+こ"),
+            (3, "re:(犬)\\1"),
+            (4, "expr:猫 AND NOT 実況"),
+            (5, "expr:NOT 猫"),
+            (6, "expr:犬 OR 鳥"),
+            (7, "re:("),
+        ]
+    )
+
+    assert matcher.match("猫の画像") == {"猫": {1}, "expr:猫 AND NOT 実況": {4}}
+    assert matcher.match("ねねこ 犬犬") == {
+        "re:ね+こ": {2},
+        "re:(犬)\\1": {3},
+        "expr:NOT 猫": {5},
+        "expr:犬 OR 鳥": {6},
+    }
+    assert matcher.match("猫の実況") == {"猫": {1}}
+
+
+def test_match_existing_literal_keywords():
+    """演算子のような語を含む既存の購読が部分一致のまま判定されることのテスト"""
+    matcher = KeywordMatcher(
+        [(1, "WAR AND PEACE"), (2, "NOT FOUND"), (3, "NOT"), (4, "OR"), (5, "猫 re:犬")]
+    )
+    thread = Thread.from_api("1", {"com": "war and peace or 404 not found 猫 re:犬"})
+
+    assert matcher.match(thread.search_text) == {
+        "WAR AND PEACE": {1},
+        "NOT FOUND": {2},
+        "NOT": {3},
+        "OR": {4},
+        "猫 re:犬": {5},
+    }
+    assert matcher.match("war or peace") == {"OR": {4}}
+
+
+def test_match_expressions_agree_with_check_keyword_match():
+    """式・正規表現の判定が check_keyword_match と同じになることのテスト"""
+    monitor = FutabaMonitor()
+    subscriptions = [
+        (1, "expr:猫 AND (画像 OR 動画)"),
+        (2, "re:が.ぞう"),
+        (3, "expr:NOT 画像"),
+        (4, "expr:猫 NOT 犬"),
+    ]
+    threads = [
+        Thread.from_api("1", {"com": "猫の画像", "sub": ""}),
+        Thread.from_api("2", {"com": "猫と犬の動画", "sub": ""}),
+        Thread.from_api("3", {"com": "ガゾウ", "sub": "無念"}),
+    ]
+    matcher = KeywordMatcher(subscriptions)
+
+    for thread in threads:
+        expected = {
+            keyword
+            for _, keyword in subscriptions
+            if monitor.check_keyword_match(thread, keyword)
+        }
+        assert set(matcher.match(thread.search_text)) == expected
@@ -0,0 +1,147 @@
+"""計測値の登録簿と公開エンドポイントのテスト"""
+
+import threading
+
+import aiohttp
+import pytest
+
+from src.futaba_search.database import DB_SECONDS, AsyncFutabaDatabase, FutabaDatabase
+from src.futaba_search.metrics import REGISTRY, MetricsRegistry, MetricsServer
+
+
+def test_disabled_registry_records_nothing():
+    """無効な登録簿では計測しても値が増えないことのテスト"""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "テスト", ("board",))
+    histogram = registry.histogram("test_seconds", "テスト")
+
+    counter.inc(1, "may")
+    histogram.observe(0.1)
+    with histogram.time():
+        pass
+
+    assert counter.value("may") == 0
+    assert histogram.count() == 0
+    assert "test_total{" not in registry.render()
+
+
+def test_render_prometheus_text():
+    """カウンター・ゲージ・ヒストグラムが Prometheus のテキスト形式で出力されることのテスト"""
+    registry = MetricsRegistry(enabled=True)
+    counter = registry.counter("fetch_total", "取得回数", ("board", "status"))
+    gauge = registry.gauge("queue_depth", "送信待ち")
+    histogram = registry.histogram("fetch_seconds", "取得時間", ("board",), (0.1, 1))
+
+    counter.inc(1, "may", "200")
+    counter.inc(2, "may", "200")
+    counter.inc(1, "img", "304")
+    gauge.set(5)
+    histogram.observe(0.05, "may")
+    histogram.observe(0.5, "may")
+    histogram.observe(3, "may")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE fetch_total counter" in lines
+    assert 'fetch_total{board="may",status="200"} 3' in lines
+    assert 'fetch_total{board="img",status="304"} 1' in lines
+    assert "# TYPE queue_depth gauge" in lines
+    assert "queue_depth 5" in lines
+    assert "# TYPE fetch_seconds histogram" in lines
+    assert 'fetch_seconds_bucket{board="may",le="0.1"} 1' in lines
+    assert 'fetch_seconds_bucket{board="may",le="1"} 2' in lines
+    assert 'fetch_seconds_bucket{board="may",le="+Inf"} 3' in lines
+    assert 'fetch_seconds_sum{board="may"} 3.55' in lines
+    assert 'fetch_seconds_count{board="may"} 3' in lines
+
+
+def test_labels_are_escaped_and_checked():
+    """ラベル値のエスケープとラベル数の検査のテスト"""
+    registry = MetricsRegistry(enabled=True)
+    counter = registry.counter("errors_total", "エラー", ("method",))
+
+    counter.inc(1, 'a"b\\c')
+    assert 'errors_total{method="a\\"b\\\\c"} 1' in registry.render()
+
+    with pytest.raises(ValueError):
+        counter.inc(1)
+
+
+def test_render_while_other_thread_adds_labels():
+    """別スレッドがラベルの組を追加している間も出力できることのテスト"""
+    registry = MetricsRegistry(enabled=True)
+    counter = registry.counter("db_errors_total", "エラー", ("method",))
+    histogram = registry.histogram("db_seconds", "処理時間", ("method",))
+    done = threading.Event()
+
+    def record() -> None:
+        for index in range(20000):
+            counter.inc(1, f"m{index}")
+            histogram.observe(0.01, f"m{index}")
+        done.set()
+
+    worker = threading.Thread(target=record)
+    worker.start()
+    try:
+        while not done.is_set():
+            registry.render()
+    finally:
+        worker.join()
+
+    assert counter.value("m19999") == 1
+    assert histogram.count("m19999") == 1
+
+
+def test_register_returns_existing_metric():
+    """同じ名前の登録は既存の計測値を返し、種類が違えばエラーになることのテスト"""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "テスト")
+
+    assert registry.counter("test_total", "テスト") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "テスト")
+
+
+def test_collectors_run_before_render():
+    """公開の直前に collector が呼ばれ、失敗しても出力が続くことのテスト"""
+    registry = MetricsRegistry(enabled=True)
+    gauge = registry.gauge("interval", "監視間隔", ("board",))
+
+    def broken() -> None:
+        raise RuntimeError("収集失敗")
+
+    registry.add_collector(broken)
+    registry.add_collector(lambda: gauge.set(42.5, "may"))
+
+    assert 'interval{board="may"} 42.5' in registry.render()
+
+
+@pytest.mark.asyncio
+async def test_database_calls_are_measured(tmp_path, monkeypatch):
+    """データベース処理の時間がメソッドごとに記録されることのテスト"""
+    monkeypatch.setattr(REGISTRY, "enabled", True)
+    db = AsyncFutabaDatabase(FutabaDatabase(tmp_path / "test.db"))
+    before = DB_SECONDS.count("add_subscription")
+
+    await db.add_subscription(123, "テスト")
+    db.close()
+
+    assert DB_SECONDS.count("add_subscription") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_serves_registry():
+    """/metrics で登録簿の内容が公開されることのテスト"""
+    registry = MetricsRegistry(enabled=True)
+    registry.counter("ticks_total", "監視回数").inc()
+    server = MetricsServer(registry, port=0)
+    await server.start()
+    try:
+        assert server.port != 0
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{server.port}/metrics") as resp:
+                assert resp.status == 200
+                assert resp.headers["Content-Type"].startswith("text/plain")
+                assert "ticks_total 1" in await resp.text()
+    finally:
+        await server.stop()
+    assert not server.running
@@ -0,0 +1,167 @@
+"""ふたば監視機能のテスト"""
+
+import json
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.futaba_search.monitor import CatalogSnapshot, FutabaMonitor
+from src.futaba_search.thread import Thread
+
+CATALOG = {"res": {"100": {"com": "本文", "sub": "無念", "now": "x"}}}
+
+
+class StandInServer:
+    """futaba.php の代わりに ETag 付きでカタログを返すローカルサーバー"""
+
+    def __init__(self) -> None:
+        self.body = json.dumps(CATALOG).encode()
+        self.etag = '"v1"'
+        self.last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+        self.transports: set[int] = set()
+        self.requests = 0
+        self.bytes_served = 0
+
+        app = web.Application()
+        app.router.add_get("/b/futaba.php", self.handle)
+        self.server = TestServer(app)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.transports.add(id(request.transport))
+        if (
+            request.headers.get("If-None-Match") == self.etag
+            or request.headers.get("If-Modified-Since") == self.last_modified
+        ):
+            return web.Response(status=304)
+
+        self.bytes_served += len(self.body)
+        return web.Response(
+            body=self.body,
+            content_type="application/json",
+            headers={"ETag": self.etag, "Last-Modified": self.last_modified},
+        )
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("/b/futaba.php?mode=json"))
+
+
+def make_thread(thread_id: str, title: str, subject: str = "") -> Thread:
+    """テスト用のスレッドデータを作成"""
+    return Thread.from_api(thread_id, {"com": title, "sub": subject})
+
+
+def test_parse_threads():
+    """APIレスポンスの解析テスト"""
+    monitor = FutabaMonitor()
+    data = {
+        "res": {
+            "100": {"com": "本文", "sub": "無念", "name": "としあき", "now": "x"},
+            "101": {"com": "画像", "thumb": "/b/thumb/1s.jpg"},
+            "ad": {"com": "広告"},
+        }
+    }
+
+    threads = monitor.parse_threads(data)
+
+    assert [thread.id for thread in threads] == [100, 101]
+    assert threads[0].title == "本文"
+    assert threads[0].search_text == "本文 無念"
+    assert threads[0].thumb_url is None
+    assert threads[1].thumb_url == "https://may.2chan.net/b/thumb/1s.jpg"
+    assert monitor.parse_threads({}) == []
+
+
+def test_catalog_snapshot_returns_only_new_or_changed():
+    """新規・変更のあったスレッドのみが返ることのテスト"""
+    snapshot = CatalogSnapshot()
+
+    first = [make_thread("1", "a"), make_thread("2", "b")]
+    assert snapshot.diff(first) == first
+    assert snapshot.last_stats.new == 2
+
+    second = [make_thread("1", "a"), make_thread("2", "b2"), make_thread("3", "c")]
+    delta = snapshot.diff(second)
+
+    assert [thread.id for thread in delta] == [2, 3]
+    stats = snapshot.last_stats
+    assert (stats.new, stats.changed, stats.unchanged, stats.removed) == (1, 1, 1, 0)
+
+
+def test_catalog_snapshot_tracks_removed_and_reset():
+    """消滅したスレッドの集計とリセットのテスト"""
+    snapshot = CatalogSnapshot()
+    snapshot.diff([make_thread("1", "a"), make_thread("2", "b")])
+
+    snapshot.diff([make_thread("2", "b")])
+    assert snapshot.last_stats.removed == 1
+    assert len(snapshot) == 1
+
+    snapshot.reset()
+    assert snapshot.diff([make_thread("2", "b")]) == [make_thread("2", "b")]
+
+
+@pytest.mark.asyncio
+async def test_fetch_threads_reuses_connection_and_honors_304():
+    """接続が再利用され、変化がなければ本文を再取得しないことのテスト"""
+    stand_in = StandInServer()
+    await stand_in.server.start_server()
+    try:
+        async with FutabaMonitor(api_url=stand_in.url) as monitor:
+            data = await monitor.fetch_threads()
+            assert data == CATALOG
+            assert monitor.not_modified is False
+            assert monitor.etag == stand_in.etag
+
+            for _ in range(3):
+                assert await monitor.fetch_threads() is None
+                assert monitor.not_modified is True
+
+            # カタログが更新されれば再び本文を取得する
+            stand_in.etag = '"v2"'
+            stand_in.last_modified = "Tue, 02 Jan 2024 00:00:00 GMT"
+            assert await monitor.fetch_threads() == CATALOG
+            assert monitor.not_modified is False
+    finally:
+        await stand_in.server.close()
+
+    assert stand_in.requests == 5
+    assert len(stand_in.transports) == 1
+    assert stand_in.bytes_served == 2 * len(stand_in.body)
+
+
+@pytest.mark.asyncio
+async def test_clear_validators_forces_full_fetch():
+    """バリデータを破棄すると無条件に取得し直すことのテスト"""
+    stand_in = StandInServer()
+    await stand_in.server.start_server()
+    try:
+        async with FutabaMonitor(api_url=stand_in.url) as monitor:
+            await monitor.fetch_threads()
+            monitor.clear_validators()
+            assert await monitor.fetch_threads() == CATALOG
+    finally:
+        await stand_in.server.close()
+
+    assert stand_in.bytes_served == 2 * len(stand_in.body)
+
+
+@pytest.mark.asyncio
+async def test_stream_threads_matches_fetch_and_parse():
+    """逐次解析の結果が fetch_threads + parse_threads と一致することのテスト"""
+    stand_in = StandInServer()
+    await stand_in.server.start_server()
+    try:
+        async with FutabaMonitor(api_url=stand_in.url) as monitor:
+            streamed = await monitor.stream_threads()
+            monitor.clear_validators()
+            data = await monitor.fetch_threads()
+            assert streamed == monitor.parse_threads(data)
+
+            # 変化がなければ None を返す
+            assert await monitor.stream_threads() is None
+            assert monitor.not_modified is True
+    finally:
+        await stand_in.server.close()
@@ -0,0 +1,40 @@
+"""テキスト正規化のテスト"""
+
+from src.futaba_search.normalize import normalize_text
+
+
+def test_width_and_case_folded():
+    """全角・半角と大文字・小文字の違いがそろうことのテスト"""
+    assert normalize_text("ＡＢＣ１２３") == "abc123"
+    assert normalize_text("Ｐｙｔｈｏｎ") == normalize_text("python")
+
+
+def test_kana_folded_to_hiragana():
+    """カタカナ・半角カナがひらがなにそろうことのテスト"""
+    assert normalize_text("ネコ") == "ねこ"
+    assert normalize_text("ﾈｺ") == "ねこ"
+    assert normalize_text("ｶﾞｰﾃﾞﾝ") == "がーでん"
+    assert normalize_text("ヴァイオリン") == "ゔぁいおりん"
+
+
+def test_html_removed():
+    """<br> が空白になり、タグが除かれ、エンティティが戻ることのテスト"""
+    assert normalize_text("一行目<br>二行目<BR />三行目") == "一行目 二行目 三行目"
+    assert normalize_text('<font color="#789922">&gt;引用</font>') == ">引用"
+    assert normalize_text("猫&amp;犬") == "猫&犬"
+
+
+def test_whitespace_collapsed():
+    """連続する空白（全角空白を含む）が1つにまとまることのテスト"""
+    assert normalize_text("  猫　　犬 \n") == "猫 犬"
+
+
+def test_result_is_cached():
+    """同じテキストの正規化結果がキャッシュされることのテスト"""
+    normalize_text.cache_clear()
+    normalize_text("キャッシュ")
+    normalize_text("キャッシュ")
+
+    info = normalize_text.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
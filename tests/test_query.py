@@ -0,0 +1,108 @@
+"""購読キーワードの解析のテスト"""
+
+import pytest
+
+from src.futaba_search.query import (
+    And,
+    Not,
+    Or,
+    Pattern,
+    Term,
+    evaluate,
+    literal_prefix,
+    normalize_keyword,
+    parse_subscription,
+    required_terms,
+)
+
+
+def test_plain_keyword_is_normalized_term():
+    """通常のキーワードは正規化された部分一致の語になることのテスト"""
+    assert parse_subscription("ネコ 画像") == Term("ねこ 画像")
+    # 小文字の and/or/not は演算子として扱わない
+    assert parse_subscription("rock and roll") == Term("rock and roll")
+    assert normalize_keyword("ＡＢＣ") == "abc"
+
+
+def test_regex_keyword():
+    """re: で始まるキーワードが正規表現として扱われることのテスト"""
+    node = parse_subscription("re:ネコ|イヌ")
+
+    assert isinstance(node, Pattern)
+    assert evaluate(node, set(), "いぬの画像")
+    assert not evaluate(node, set(), "とりの画像")
+    assert normalize_keyword("re:ネコ|イヌ") == "re:ネコ|イヌ"
+
+
+def test_expression_precedence():
+    """NOT > AND > OR の優先順位と括弧、省略した AND のテスト"""
+    assert parse_subscription("expr:猫 OR 犬 AND NOT 鳥") == Or(
+        (Term("猫"), And((Term("犬"), Not(Term("鳥")))))
+    )
+    assert parse_subscription('expr:(猫 OR 犬) "画像 スレ"') == And(
+        (Or((Term("猫"), Term("犬"))), Term("画像 すれ"))
+    )
+
+
+def test_expression_evaluation():
+    """式の評価のテスト"""
+    node = parse_subscription('expr:猫 AND (画像 OR re:"動+画") AND NOT 実況')
+
+    assert evaluate(node, {"猫", "画像"}, "猫の画像")
+    assert evaluate(node, {"猫"}, "猫の動動画")
+    assert not evaluate(node, {"猫", "画像", "実況"}, "猫の画像実況")
+    assert not evaluate(node, {"画像"}, "犬の画像")
+
+
+def test_literal_keywords_without_prefix():
+    """接頭辞のないキーワードは AND / OR / NOT や re: を含んでも部分一致になることのテスト"""
+    assert parse_subscription("WAR AND PEACE") == Term("war and peace")
+    assert parse_subscription("NOT FOUND") == Term("not found")
+    assert parse_subscription("NOT") == Term("not")
+    assert parse_subscription("OR") == Term("or")
+    assert parse_subscription("猫 re:犬") == Term("猫 re:犬")
+    assert parse_subscription("\\re:ゼロ") == Term("re:ぜろ")
+    # 正規化で接頭辞の形になる語は \\ を付けて登録し、読み込み直しても部分一致になる
+    assert normalize_keyword("Re：ゼロ") == "\\re:ぜろ"
+    assert parse_subscription(normalize_keyword("Re：ゼロ")) == Term("re:ぜろ")
+    assert normalize_keyword("expr:猫 OR 犬") == "expr:猫 OR 犬"
+
+
+@pytest.mark.parametrize(
+    "keyword",
+    [
+        "",
+        "re:",
+        "re:(",
+        "expr:",
+        "expr:猫 AND",
+        "expr:(猫 OR 犬",
+        "expr:猫 OR OR 犬",
+        'expr:NOT "猫',
+        "expr:NOT",
+    ],
+)
+def test_invalid_keywords_rejected(keyword):
+    """解釈できないキーワードが ValueError になることのテスト"""
+    with pytest.raises(ValueError):
+        parse_subscription(keyword)
+
+
+def test_required_terms():
+    """式が真になるために必要な語の集合のテスト"""
+    assert required_terms(parse_subscription("expr:猫 AND 犬")) in ({"猫"}, {"犬"})
+    assert required_terms(parse_subscription("expr:猫 OR 犬")) == {"猫", "犬"}
+    assert required_terms(parse_subscription("expr:NOT 猫")) is None
+    assert required_terms(parse_subscription("expr:猫 OR re:犬")) == {"猫", "犬"}
+    assert required_terms(parse_subscription('expr:猫 OR re:"犬|鳥"')) is None
+    assert required_terms(parse_subscription('expr:re:"犬|鳥" AND 猫')) == {"猫"}
+
+
+def test_literal_prefix():
+    """正規表現の先頭の文字列のテスト"""
+    assert literal_prefix("ねこ.*いぬ") == "ねこ"
+    assert literal_prefix("ABc+") == "abc"
+    assert literal_prefix("ねこ?") == "ね"
+    assert literal_prefix("ねこ{0,2}") == "ね"
+    assert literal_prefix("ねこ|いぬ") == ""
+    assert literal_prefix("^ねこ") == ""
@@ -0,0 +1,173 @@
+"""板ごとの監視スケジューラーのテスト"""
+
+import asyncio
+import json
+from dataclasses import replace
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.futaba_search.boards import BOARDS, Board
+from src.futaba_search.monitor import FutabaMonitor
+from src.futaba_search.scheduler import AdaptiveInterval, BoardScheduler
+from src.futaba_search.thread import Thread
+
+
+class BoardServer:
+    """板1つ分のカタログを返すローカルサーバー（delay 秒遅れて応答する）"""
+
+    def __init__(self, thread_id: str, delay: float = 0.0) -> None:
+        self.body = json.dumps({"res": {thread_id: {"com": "本文"}}}).encode()
+        self.delay = delay
+        self.requests = 0
+
+        app = web.Application()
+        app.router.add_get("/b/futaba.php", self.handle)
+        self.server = TestServer(app)
+
+    async def handle(self, _request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        return web.Response(body=self.body, content_type="application/json")
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("/b/futaba.php?mode=json"))
+
+
+def make_board(name: str, server: BoardServer) -> Board:
+    return replace(BOARDS[name], interval=0.05, jitter=0, api_url=server.url)
+
+
+@pytest.mark.asyncio
+async def test_slow_board_does_not_delay_others():
+    """遅い板があっても他の板は監視間隔どおりに取得されることのテスト"""
+    servers = {
+        "may": BoardServer("100"),
+        "img": BoardServer("200"),
+        "dat": BoardServer("300", delay=5.0),
+    }
+    for server in servers.values():
+        await server.server.start_server()
+
+    fetched: dict[str, list[Thread]] = {name: [] for name in servers}
+
+    async def handler(board: Board, monitor: FutabaMonitor) -> None:
+        threads = await monitor.stream_threads()
+        fetched[board.name].extend(threads or [])
+
+    scheduler = BoardScheduler(
+        [make_board(name, server) for name, server in servers.items()], handler
+    )
+    try:
+        await scheduler.start()
+        await asyncio.sleep(0.5)
+
+        # 全ての板で1つのセッションを共有する
+        assert {id(monitor.session) for monitor in scheduler.monitors.values()} == {
+            id(scheduler.session)
+        }
+        assert scheduler.runs["may"] >= 3
+        assert scheduler.runs["img"] >= 3
+        assert scheduler.runs["dat"] == 0
+        assert servers["dat"].requests == 1
+    finally:
+        await scheduler.stop()
+        for server in servers.values():
+            await server.server.close()
+
+    assert scheduler.session is None
+    assert {thread.key for thread in fetched["may"]} == {"100"}
+    assert {thread.key for thread in fetched["img"]} == {"img:200"}
+    assert {thread.board for thread in fetched["img"]} == {"img"}
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_do_not_stop_board():
+    """監視処理で例外が発生しても次の回が実行されることのテスト"""
+    server = BoardServer("100")
+    await server.server.start_server()
+    calls = 0
+
+    async def handler(_board: Board, _monitor: FutabaMonitor) -> None:
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("失敗")
+
+    scheduler = BoardScheduler([make_board("may", server)], handler)
+    try:
+        await scheduler.start()
+        await asyncio.sleep(0.2)
+    finally:
+        await scheduler.stop()
+        await server.server.close()
+
+    assert calls >= 2
+    assert scheduler.runs["may"] == calls
+
+
+def test_adaptive_interval_follows_churn():
+    """新規スレッドが多いと間隔が縮み、少ないと延びることのテスト"""
+    adaptive = AdaptiveInterval(60, minimum=15, maximum=300, target=5)
+
+    # 60秒で30件（目標の6倍）: 1回の変化は半分まで
+    assert adaptive.observe(30, 60) == 30
+    assert adaptive.observe(30, 30) == 15
+    # 下限より短くはならない
+    assert adaptive.observe(30, 15) == 15
+
+    # 新規スレッドがなくなると延び、上限で止まる
+    intervals = [adaptive.observe(0, adaptive.interval) for _ in range(20)]
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == 300
+
+    stats = adaptive.stats()
+    assert stats["interval"] == 300
+    assert stats["new_threads_per_fetch"] < 1
+
+
+def test_adaptive_interval_rejects_invalid_bounds():
+    """監視間隔の下限・上限が不正な場合のテスト"""
+    with pytest.raises(ValueError):
+        AdaptiveInterval(60, minimum=300, maximum=15)
+
+
+@pytest.mark.asyncio
+async def test_adaptive_scheduler_shortens_interval_on_burst():
+    """新規スレッドが多い板だけ監視間隔が短くなることのテスト"""
+    server = BoardServer("100")
+    await server.server.start_server()
+    new_threads = {"may": 50, "img": 0}
+
+    async def handler(board: Board, _monitor: FutabaMonitor) -> int:
+        return new_threads[board.name]
+
+    boards = [replace(make_board(name, server), interval=0.1) for name in new_threads]
+    scheduler = BoardScheduler(
+        boards, handler, adaptive=True, min_interval=0.02, max_interval=0.2
+    )
+    try:
+        await scheduler.start()
+        await asyncio.sleep(0.5)
+    finally:
+        await scheduler.stop()
+        await server.server.close()
+
+    stats = scheduler.stats()
+    assert stats["may"]["interval"] == 0.02
+    assert stats["may"]["new_threads_per_fetch"] == 50
+    assert stats["img"]["interval"] == 0.2
+    assert scheduler.runs["may"] > scheduler.runs["img"]
+
+
+def test_jitter_keeps_average_interval():
+    """毎回のずれが ±jitter/2 の範囲に収まり、平均の間隔が変わらないことのテスト"""
+    board = replace(BOARDS["may"], interval=60, jitter=5)
+    scheduler = BoardScheduler([board], handler=None)  # type: ignore[arg-type]
+
+    delays = [scheduler.next_delay(board, elapsed=1.0) for _ in range(5000)]
+
+    assert all(56.5 <= delay <= 61.5 for delay in delays)
+    assert sum(delays) / len(delays) == pytest.approx(59.0, abs=0.2)
+    assert scheduler.next_delay(board, elapsed=100.0) == 0.0
@@ -0,0 +1,174 @@
+"""購読のシャーディングのテスト"""
+
+import asyncio
+import multiprocessing
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.futaba_search.boards import BOARDS
+from src.futaba_search.database import FutabaDatabase
+from src.futaba_search.sharding import (
+    CatalogFanout,
+    CatalogReceiver,
+    RelayedCatalog,
+    Shard,
+    run_shards,
+    shard_log_file,
+)
+from src.futaba_search.thread import Thread
+
+
+def make_thread(thread_id: int, text: str = "本文") -> Thread:
+    return Thread(thread_id, text, "", "", "", None, text)
+
+
+class StubMonitor:
+    """決まったカタログを返す FutabaMonitor の代わり（None は 304）"""
+
+    def __init__(self, catalogs: list[list[Thread] | None]) -> None:
+        self.catalogs = catalogs
+        self.not_modified = False
+
+    async def stream_threads(self) -> list[Thread] | None:
+        threads = self.catalogs.pop(0)
+        self.not_modified = threads is None
+        return threads
+
+
+def exit_worker(shard: Shard, connection, code: int) -> None:
+    """番号 1 のワーカーだけが指定した終了コードですぐに終了する"""
+    if shard.index == 1:
+        sys.exit(code)
+    try:
+        connection.recv_bytes()
+    except EOFError:
+        pass
+
+
+def test_shard_partitions_channels():
+    """全てのチャンネルがちょうど1つのワーカーに割り当てられることのテスト"""
+    shards = [Shard(index, 3) for index in range(3)]
+
+    for channel_id in range(1000, 1100):
+        assert sum(shard.owns(channel_id) for shard in shards) == 1
+    assert [shard.primary for shard in shards] == [True, False, False]
+    with pytest.raises(ValueError):
+        Shard(3, 3)
+
+
+def test_shard_log_file():
+    """ワーカーごとにログファイルが分かれることのテスト"""
+    assert shard_log_file("logs/futaba_search.log", Shard(1, 2)) == (
+        "logs/futaba_search.shard1.log"
+    )
+    assert shard_log_file(None, Shard(0, 2)) is None
+
+
+@pytest.mark.asyncio
+async def test_relayed_catalog():
+    """届いたカタログを1回だけ返し、clear_validators で再び返すことのテスト"""
+    catalog = RelayedCatalog(BOARDS["may"])
+    assert await catalog.stream_threads() is None
+    assert not catalog.not_modified
+
+    threads = [make_thread(1)]
+    catalog.push(threads)
+    catalog.push(None)
+    assert await catalog.stream_threads() == threads
+    assert await catalog.stream_threads() is None
+    assert catalog.not_modified
+
+    catalog.clear_validators()
+    assert await catalog.stream_threads() == threads
+
+
+def test_database_partitions_state(tmp_path):
+    """ワーカーが担当するチャンネルの状態だけを持ち、他の変更を読み込み直すことのテスト"""
+    db_path = tmp_path / "shared.db"
+    even = FutabaDatabase(db_path, shard=Shard(0, 2))
+    odd = FutabaDatabase(db_path, shard=Shard(1, 2))
+    even.refresh_shared_state()
+    odd.refresh_shared_state()
+
+    # 偶数のワーカーが受け付けた奇数チャンネルの購読は奇数のワーカーが担当する
+    assert even.add_subscription(11, "猫")
+    assert even.add_subscription(12, "犬")
+    assert even.subscriptions.channel_ids() == {12}
+    assert even.get_subscriptions(11) == ["猫"]
+    assert odd.subscriptions.channel_ids() == set()
+    assert odd.refresh_shared_state() == ["subscriptions"]
+    assert odd.subscriptions.channel_ids() == {11}
+    assert odd.refresh_shared_state() == []
+    # 自分の変更も更新回数を進めるため1回は読み込み直す
+    assert even.refresh_shared_state() == ["subscriptions"]
+    assert even.subscriptions.channel_ids() == {12}
+
+    odd.mute_channel(12, datetime.now() + timedelta(hours=1))
+    assert odd.is_channel_muted(12)
+    assert len(odd.mute_table) == 0
+    assert even.refresh_shared_state() == ["mutes"]
+    assert even.mute_table.is_muted(12)
+
+    even.mark_threads_notified([("1", "犬", 12)])
+    odd.mark_threads_notified([("1", "猫", 11)])
+    assert len(FutabaDatabase(db_path, shard=Shard(1, 2)).notified_index) == 1
+
+    even.engine.dispose()
+    odd.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_fanout_delivers_catalog_to_receivers():
+    """1回取得したカタログが全てのワーカーの監視処理に届くことのテスト"""
+    board = BOARDS["may"]
+    pipes = [multiprocessing.Pipe(duplex=False) for _ in range(2)]
+    fanout = CatalogFanout(sender for _, sender in pipes)
+    results: list[list[list[int] | None]] = [[], []]
+    closed = asyncio.Event()
+
+    def make_handler(index: int):
+        async def handler(_board, catalog):
+            threads = await catalog.stream_threads()
+            results[index].append(
+                [thread.id for thread in threads] if threads is not None else None
+            )
+            return 0
+
+        return handler
+
+    async def wait_results(count: int) -> None:
+        while any(len(result) < count for result in results):
+            await asyncio.sleep(0.01)
+
+    async def on_closed() -> None:
+        closed.set()
+
+    receivers = [
+        CatalogReceiver([board], make_handler(index), receiver, on_closed)
+        for index, (receiver, _) in enumerate(pipes)
+    ]
+    for receiver in receivers:
+        await receiver.start()
+
+    monitor = StubMonitor([[make_thread(1), make_thread(2)], None])
+    assert await fanout.publish(board, monitor) is None
+    await asyncio.wait_for(wait_results(1), 5)
+    # 304 でもワーカーの監視処理は実行される
+    assert await fanout.publish(board, monitor) == 0
+    await asyncio.wait_for(wait_results(2), 5)
+
+    assert results == [[[1, 2], None], [[1, 2], None]]
+    assert receivers[0].received["may"] == 2
+
+    for _, sender in pipes:
+        sender.close()
+    await asyncio.wait_for(closed.wait(), 5)
+    for receiver in receivers:
+        await receiver.stop()
+
+
+def test_run_shards_stops_when_worker_exits():
+    """ワーカーが1つ終了すると残りも止めて終了コードを返すことのテスト"""
+    assert run_shards(2, exit_worker, (3,)) == 3
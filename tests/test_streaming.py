@@ -0,0 +1,55 @@
+"""カタログJSONの逐次解析のテスト"""
+
+import json
+
+import pytest
+
+from src.futaba_search.streaming import CatalogStreamParser
+
+CATALOG = {
+    "die": "10:00頃消えます",
+    "maxres": 12345,
+    "nowtime": 1.5e3,
+    "old": True,
+    "res": {
+        str(100 + i): {"com": f'本文{i}"<br>&gt;', "sub": "無念", "now": "x"}
+        for i in range(20)
+    },
+    "tail": [1, 2, {"a": None}],
+}
+
+
+def parse_in_chunks(raw: bytes, size: int) -> list[tuple[str, dict]]:
+    """指定サイズのチャンクに分けて解析"""
+    parser = CatalogStreamParser()
+    items = []
+    for i in range(0, len(raw), size):
+        items.extend(parser.feed(raw[i : i + size]))
+    items.extend(parser.close())
+    return items
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 16])
+def test_parse_in_chunks_matches_json_loads(size):
+    """どの位置でチャンクが分割されても同じ結果になることのテスト"""
+    raw = json.dumps(CATALOG, ensure_ascii=False).encode()
+
+    items = parse_in_chunks(raw, size)
+
+    assert dict(items) == CATALOG["res"]
+    assert [thread_id for thread_id, _ in items] == list(CATALOG["res"])
+
+
+def test_parse_empty_res_array():
+    """スレッドがない場合の空配列のテスト"""
+    assert parse_in_chunks(b'{"res": [], "maxres": 1}', 4) == []
+
+
+def test_truncated_input_raises():
+    """途中で途切れたJSONはエラーになることのテスト"""
+    raw = json.dumps(CATALOG, ensure_ascii=False).encode()
+    parser = CatalogStreamParser()
+    parser.feed(raw[: len(raw) // 2])
+
+    with pytest.raises(ValueError):
+        parser.close()
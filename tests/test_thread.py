@@ -0,0 +1,63 @@
+"""スレッドレコードのテスト"""
+
+import dataclasses
+
+import pytest
+
+from src.futaba_search.thread import Thread, threads_from_api
+
+
+def test_from_api():
+    """APIデータからのレコード作成のテスト"""
+    thread = Thread.from_api(
+        "1234", {"com": "Hello", "sub": "World", "name": "としあき", "now": "x"}
+    )
+
+    assert thread.id == 1234
+    assert thread.search_text == "hello world"
+    assert thread.name == "としあき"
+    assert thread.timestamp == "x"
+
+
+def test_thumb_url_falls_back_to_src():
+    """サムネイルがなければ元画像のURLを使うことのテスト"""
+    assert Thread.from_api("1", {"thumb": "/b/thumb/1s.jpg"}).thumb_url == (
+        "https://may.2chan.net/b/thumb/1s.jpg"
+    )
+    assert Thread.from_api("1", {"src": "/b/src/1.jpg"}).thumb_url == (
+        "https://may.2chan.net/b/src/1.jpg"
+    )
+    assert Thread.from_api("1", {"thumb": ""}).thumb_url is None
+
+
+def test_record_is_slotted_and_immutable():
+    """__slots__ を持ち変更不可であることのテスト"""
+    thread = Thread.from_api("1", {})
+
+    assert not hasattr(thread, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        thread.title = "x"  # type: ignore[misc]
+
+
+def test_board_specific_key_and_urls():
+    """板ごとにスレッドキーと画像URLが変わることのテスト"""
+    may = Thread.from_api("1", {"thumb": "/b/thumb/1s.jpg"})
+    img = Thread.from_api("1", {"thumb": "/b/thumb/1s.jpg"}, "img")
+
+    # 既定の板は既存の通知履歴と互換性のあるキーを使う
+    assert may.key == "1"
+    assert img.key == "img:1"
+    assert img.thumb_url == "https://img.2chan.net/b/thumb/1s.jpg"
+
+
+def test_threads_from_api_skips_malformed_entries(caplog):
+    """スレッドIDが数値でない要素などを読み飛ばして残りを解析することのテスト"""
+    entries = [("1", {"com": "猫"}), ("abc", {"com": "犬"}), ("2", []), ("3", {})]
+
+    threads = threads_from_api(entries, "img")
+
+    assert [thread.id for thread in threads] == [1, 3]
+    assert all(thread.board == "img" for thread in threads)
+    assert "'abc'" in caplog.text and "'2'" in caplog.text
+    with pytest.raises(ValueError):
+        Thread.from_api("abc", {})